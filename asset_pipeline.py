@@ -0,0 +1,179 @@
+"""Post-render asset optimisation for the Cloudflare deploy of docs/.
+
+Three stages, used by build_site.py --optimize-assets:
+
+- minify():      strip indentation and blank lines from generated HTML (never
+                 inside <pre>/<textarea>, which hold raw manifests) and
+                 re-serialise generated JSON without whitespace. Applied as
+                 pages are written, so the build cache sees the final bytes.
+- precompress(): write deterministic .gz (and .br, if the optional `brotli`
+                 module is installed) siblings for large text assets.
+- write_headers(): emit a Cloudflare `_headers` file giving immutable,
+                 versioned manifests (e.g. databio/pepatac_1.0.13.yaml) a
+                 content-hash ETag and a one-year immutable Cache-Control,
+                 within Cloudflare's limit of 100 rules.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+import profiling
+
+try:
+    import brotli
+except ImportError:  # optional; only .gz siblings are written without it
+    brotli = None
+
+COMPRESSIBLE = {".html", ".json", ".yaml", ".css", ".svg"}
+MIN_COMPRESS_SIZE = 1024
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Cloudflare applies at most this many rules from a _headers file
+MAX_HEADER_RULES = 100
+
+_PRESERVE_RE = re.compile(r"(<(pre|textarea)\b.*?</\2>)", re.DOTALL | re.IGNORECASE)
+
+
+def minify_html(text: str) -> str:
+    """Drop indentation, trailing space and blank lines outside <pre>/<textarea>.
+
+    Newlines are kept, so inline scripts that rely on them are unaffected.
+    """
+    out = []
+    chunks = _PRESERVE_RE.split(text)
+    for i, chunk in enumerate(chunks):
+        # split() with two groups yields: text, whole match, tag name, text, ...
+        kind = i % 3
+        if kind == 1:
+            out.append(chunk)
+        elif kind == 0:
+            lines = [line.strip() for line in chunk.split("\n")]
+            kept = "\n".join(line for line in lines if line)
+            # Keep the line break that separated this text from a preserved block
+            if out and len(lines) > 1 and not lines[0]:
+                kept = "\n" + kept
+            if i + 1 < len(chunks) and len(lines) > 1 and not lines[-1] and kept.strip():
+                kept += "\n"
+            out.append(kept)
+    return "".join(out) + "\n"
+
+
+def minify_json(text: str) -> str:
+    return json.dumps(json.loads(text), separators=(",", ":"))
+
+
+def minify(path: Path, text: str) -> str:
+    """Minify generated text by file type; other types pass through."""
+    if path.suffix == ".html":
+        return minify_html(text)
+    if path.suffix == ".json":
+        return minify_json(text)
+    return text
+
+
+def _write_bytes_if_changed(path: Path, data: bytes) -> bool:
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    path.write_bytes(data)
+    profiling.record_write(len(data))
+    return True
+
+
+def precompress(docs: Path, min_size: int = MIN_COMPRESS_SIZE) -> int:
+    """Write .gz/.br siblings for compressible files of at least min_size bytes.
+
+    Each sibling is stamped with its source's mtime; a sibling whose mtime
+    still matches is left alone, so unchanged assets (whose mtimes the build
+    preserves) are not recompressed. Returns the number of files written.
+    """
+    written = 0
+    encoders = [(".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        encoders.append((".br", lambda data: brotli.compress(data, quality=11)))
+    for path in sorted(docs.rglob("*")):
+        if path.suffix not in COMPRESSIBLE or not path.is_file():
+            continue
+        stat = path.stat()
+        for suffix, encode in encoders:
+            sibling = path.with_name(path.name + suffix)
+            if stat.st_size < min_size:
+                sibling.unlink(missing_ok=True)
+                continue
+            if sibling.exists() and sibling.stat().st_mtime_ns == stat.st_mtime_ns:
+                continue
+            written += _write_bytes_if_changed(sibling, encode(path.read_bytes()))
+            os.utime(sibling, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    return written
+
+
+def _etag(path: Path) -> str:
+    return '"' + hashlib.sha256(path.read_bytes()).hexdigest()[:32] + '"'
+
+
+def write_headers(docs: Path, immutable: dict[str, str]) -> tuple[int, int]:
+    """Write docs/_headers for immutable files, given as {docs-relative path: crate}.
+
+    Each immutable file gets its own rule with a content-hash ETag. If that
+    would exceed Cloudflare's rule limit, each crate's files are grouped into
+    one splat rule, `/<ns>/<crate>_*` (Cache-Control only; Cloudflare still
+    sends its own content-based ETag). A crate keeps per-file rules where its
+    splat would also match anything mutable in the namespace directory: the
+    latest pointer, page or version-page directory of a crate whose name
+    extends it (`lab` and `lab_geofetch`). Derived files such as resolved
+    manifests are published outside the namespace directories, so they never
+    block a splat.
+
+    If the rules still exceed the limit, the ones covering the fewest files
+    are left out and those files keep Cloudflare's default revalidation.
+    Returns (rules written, immutable files left without a rule).
+    """
+    paths = sorted(immutable)
+    rules: list[tuple[str, list[str]]] = []
+    uncovered = 0
+    if len(paths) <= MAX_HEADER_RULES:
+        for rel in paths:
+            rules.append((f"/{rel}", [f"Cache-Control: {IMMUTABLE_CACHE_CONTROL}",
+                                      f"ETag: {_etag(docs / rel)}"]))
+    else:
+        groups: dict[str, list[str]] = {}
+        for rel in paths:
+            ns, name = rel.split("/", 1)
+            crate = immutable[rel]
+            # A file not named <crate>_<tag>.yaml can only have its own rule
+            groups.setdefault(f"{ns}/{crate}_" if name.startswith(f"{crate}_") else rel,
+                              []).append(rel)
+        entries = {
+            ns: [p.name for p in (docs / ns).iterdir()
+                 if not p.name.startswith(".") and p.suffix not in (".gz", ".br")]
+            for ns in sorted({rel.split("/", 1)[0] for rel in paths})
+        }
+        candidates: list[tuple[int, str]] = []  # (files covered, pattern)
+        for prefix, members in groups.items():
+            ns, stem = prefix.split("/", 1)
+            clash = prefix in immutable or any(
+                name.startswith(stem) and f"{ns}/{name}" not in immutable
+                for name in entries[ns]
+            )
+            if clash:
+                candidates.extend((1, f"/{rel}") for rel in members)
+            else:
+                candidates.append((len(members), f"/{prefix}*"))
+        candidates.sort(key=lambda c: (-c[0], c[1]))
+        kept = candidates[:MAX_HEADER_RULES]
+        uncovered = len(paths) - sum(count for count, _ in kept)
+        for _, pattern in sorted(kept, key=lambda c: c[1]):
+            rules.append((pattern, [f"Cache-Control: {IMMUTABLE_CACHE_CONTROL}"]))
+
+    lines = ["# Generated by build_site.py --optimize-assets; do not edit."]
+    for pattern, headers in rules:
+        lines.append(pattern)
+        lines.extend(f"  {h}" for h in headers)
+    _write_bytes_if_changed(docs / "_headers", ("\n".join(lines) + "\n").encode())
+    return len(rules), uncovered
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Generate a synthetic bulker registry for benchmarking.
+
+Writes namespace directories of manifests shaped like the real ones: every
+crate has several versioned tags (`name_1.3.0.yaml`), and commands pin
+biocontainers-style image tags that drift between versions. Namespace 0
+holds a `base` crate with many commands (like bulker/biobase), imported
+through its default pointer by most other crates (like databio/pepatac);
+some crates keep a bare-name symlink to their latest version.
+
+Usage:
+    python benchmarks/generate_registry.py OUT_DIR --namespaces 10 --crates 30 \\
+        --tags 5 --commands 20
+
+The output tree has no _templates/; run_benchmarks.py points build_site.py at
+it while keeping the repo's templates.
+"""
+
+import argparse
+import random
+from pathlib import Path
+
+BASE_COMMANDS = 80     # bulker/biobase carries ~80 commands
+TOOL_POOL = 400        # distinct command names across the registry
+IMPORT_BASE = 0.6      # share of crates importing ns00/base:default
+SYMLINK_LATEST = 0.2   # share of crates with a name.yaml -> latest symlink
+HOST_COMMANDS = 0.3    # share of crates declaring host_commands
+
+
+def _image(rng: random.Random, tool: str, version: int) -> str:
+    build = "".join(rng.choice("0123456789abcdef") for _ in range(7))
+    return f"quay.io/biocontainers/{tool}:1.{version}--h{build}_{rng.randint(0, 3)}"
+
+
+def _manifest(namespace: str, crate: str, version: str, commands: list[dict],
+              imports: list[str], host_commands: list[str], description: str) -> str:
+    lines = [
+        "manifest:",
+        f"  name: {namespace}/{crate}",
+        f"  version: {version}",
+        f"  description: {description}",
+    ]
+    if imports:
+        lines.append("  imports:")
+        lines.extend(f"  - {ref}" for ref in imports)
+    if host_commands:
+        lines.append("  host_commands:")
+        lines.extend(f"  - {cmd}" for cmd in host_commands)
+    lines.append("  commands:")
+    for cmd in commands:
+        lines.append(f"  - command: {cmd['command']}")
+        lines.append(f"    docker_image: {cmd['docker_image']}")
+        if cmd.get("docker_args"):
+            lines.append(f"    docker_args: \"{cmd['docker_args']}\"")
+    return "\n".join(lines) + "\n"
+
+
+def generate(out: Path, namespaces: int = 3, crates: int = 10, tags: int = 5,
+             commands: int = 20, seed: int = 0) -> int:
+    """Write a synthetic registry under `out`; returns the number of manifest files.
+
+    `crates` is per namespace, `tags` per crate and `commands` per manifest
+    (the ns00/base crate always has BASE_COMMANDS).
+    """
+    rng = random.Random(seed)
+    count = 0
+    for n in range(namespaces):
+        ns_name = f"ns{n:02d}"
+        ns_dir = out / ns_name
+        ns_dir.mkdir(parents=True, exist_ok=True)
+        for c in range(crates):
+            crate = "base" if (n, c) == (0, 0) else f"crate{c:03d}"
+            n_commands = BASE_COMMANDS if crate == "base" else commands
+            # Command names overlap across crates, as real tool names do
+            tools = [f"tool{k:03d}" for k in sorted(rng.sample(range(TOOL_POOL), n_commands))]
+            imports = []
+            if crate != "base" and rng.random() < IMPORT_BASE:
+                imports.append("ns00/base:default")
+            host_commands = ["python3", "perl"] if rng.random() < HOST_COMMANDS else []
+            description = f"Synthetic crate {ns_name}/{crate} with {n_commands} commands."
+            for t in range(tags):
+                version = f"1.{t}.0"
+                cmds = [
+                    {
+                        "command": tool,
+                        "docker_image": _image(rng, tool, t),
+                        "docker_args": "-i" if i % 4 == 0 else "",
+                    }
+                    for i, tool in enumerate(tools)
+                ]
+                text = _manifest(ns_name, crate, version, cmds, imports,
+                                 host_commands, description)
+                (ns_dir / f"{crate}_{version}.yaml").write_text(text)
+                count += 1
+            if rng.random() < SYMLINK_LATEST:
+                link = ns_dir / f"{crate}.yaml"
+                link.unlink(missing_ok=True)
+                link.symlink_to(f"{crate}_1.{tags - 1}.0.yaml")
+                count += 1
+    return count
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate a synthetic bulker registry.")
+    ap.add_argument("out", type=Path, help="directory to write namespace folders into")
+    ap.add_argument("--namespaces", type=int, default=3)
+    ap.add_argument("--crates", type=int, default=10, help="crates per namespace")
+    ap.add_argument("--tags", type=int, default=5, help="versioned tags per crate")
+    ap.add_argument("--commands", type=int, default=20, help="commands per manifest")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    count = generate(args.out, args.namespaces, args.crates, args.tags, args.commands, args.seed)
+    print(f"Wrote {count} manifest files under {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""Benchmark build_site.py and validate_manifests.py on synthetic registries.
+
+Each scenario generates a registry (see generate_registry.py) in a temporary
+directory, then runs the build pipeline in-process, phase by phase:
+
+    discover        find and read manifest files (manifest_loader)
+    parse           YAML-parse every manifest
+    validate        validate_manifests.validate(), structural checks only
+    records         build_site.discover_manifests()
+    data structure  build_site.build_data_structure()
+    resolve imports import graph, closures, reverse dependencies, image
+                    lists, per-version changes
+    write indexes   index.yaml/json, search, commands, resolved manifests,
+                    image lists and deltas, changelogs
+    render          build_site.render_site() (every page, empty docs/)
+    publish         publish_manifests() + prune_published()
+
+Wall times are the median of --repeat runs, each into a fresh docs/. A
+separate run under tracemalloc records the peak traced memory per phase.
+
+Each run compares against a baseline in benchmarks/baseline.json; a phase
+that gets slower (or hungrier) than the baseline by more than --tolerance
+fails the run with exit code 1. Baselines are machine-specific, so none is
+committed (the file is git-ignored): the first run of a scenario on a
+machine saves its results as that scenario's baseline, and --save-baseline
+replaces it later.
+
+Usage:
+    python benchmarks/run_benchmarks.py                          # "small"
+    python benchmarks/run_benchmarks.py --scenario 10x --repeat 3
+    python benchmarks/run_benchmarks.py --scenario small --scenario 10x --save-baseline
+    python benchmarks/run_benchmarks.py --scenario 10x           # saves, then compares
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).parent.resolve()
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+import build_site  # noqa: E402
+from generate_registry import generate  # noqa: E402
+from manifest_loader import discover_manifest_files, load_manifests  # noqa: E402
+from manifest_graph import ImportGraph  # noqa: E402
+from validate_manifests import validate  # noqa: E402
+
+BASELINE = BENCH_DIR / "baseline.json"
+
+# (namespaces, crates per namespace, tags per crate, commands per manifest)
+SCENARIOS = {
+    "small": (3, 10, 5, 20),        # about the size of this repo today
+    "10x": (10, 30, 5, 20),         # ~1,500 manifests
+    "deep-tags": (3, 10, 20, 20),   # every crate with pepatac's ~20 versions
+    "wide": (3, 10, 5, 80),         # every manifest as big as biobase
+}
+
+# Ignore slowdowns smaller than this many seconds, whatever the ratio
+MIN_DELTA = 0.02
+
+
+@contextlib.contextmanager
+def _build_root(root: Path):
+    """Point build_site's ROOT and DOCS at a generated registry."""
+    saved = build_site.ROOT, build_site.DOCS
+    build_site.ROOT, build_site.DOCS = root, root / "docs"
+    try:
+        yield
+    finally:
+        build_site.ROOT, build_site.DOCS = saved
+
+
+def run_pipeline(root: Path, jobs: int, measure) -> None:
+    """Run every phase once; `measure(name)` returns a context manager per phase."""
+    docs = root / "docs"
+    shutil.rmtree(docs, ignore_errors=True)
+    docs.mkdir()
+    with _build_root(root), contextlib.redirect_stdout(io.StringIO()):
+        with measure("discover"):
+            loaded = load_manifests(root, discover_manifest_files(root))
+        with measure("parse"):
+            for m in loaded:
+                m.data
+        with measure("validate"):
+            validate(loaded)
+        with measure("records"):
+            manifests = build_site.discover_manifests(root, None, loaded)
+        with measure("data structure"):
+            namespaces = build_site.build_data_structure(manifests)
+        with measure("resolve imports"):
+            graph = ImportGraph(loaded)
+            flattened, errors = build_site.resolve_imports(graph)
+            build_site.attach_reverse_deps(namespaces, graph)
+            build_site.attach_images(namespaces, flattened)
+            build_site.attach_changes(namespaces)
+        if errors:
+            raise RuntimeError(f"synthetic registry has import errors: {errors[:3]}")
+        with measure("write indexes"):
+            build_site.write_index_yaml(manifests, docs / "index.yaml")
+            build_site.write_index_json(manifests, docs / "index.json")
+            build_site.write_search_index(namespaces, docs / "search")
+            commands = build_site.build_command_index(namespaces)
+            build_site.write_command_index(commands, docs / "commands.json", docs / "commands")
+            resolved = build_site.write_resolved_manifests(flattened, namespaces, docs)
+            build_site.write_reverse_deps(build_site.build_reverse_deps(graph),
+                                          docs / "reverse_deps.json")
+            build_site.write_image_lists(namespaces, docs / "images")
+            build_site.write_changelogs(namespaces, docs / "changes")
+            # As build_site.build() does before rendering
+            del graph, flattened
+            for m in loaded:
+                m.release()
+        with measure("render"):
+            build_site.render_site(namespaces, manifests, [], jobs=jobs, commands=commands)
+        with measure("publish"):
+            published = build_site.publish_manifests(namespaces, manifests)
+            build_site.prune_published(docs, published | resolved)
+
+
+def time_phases(root: Path, jobs: int, repeat: int) -> dict[str, float]:
+    runs: list[dict[str, float]] = []
+    for _ in range(repeat):
+        times: dict[str, float] = {}
+
+        @contextlib.contextmanager
+        def measure(name):
+            start = time.perf_counter()
+            yield
+            times[name] = time.perf_counter() - start
+
+        run_pipeline(root, jobs, measure)
+        runs.append(times)
+    phases = {name: statistics.median(r[name] for r in runs) for name in runs[0]}
+    phases["total"] = statistics.median(sum(r.values()) for r in runs)
+    return phases
+
+
+def peak_memory(root: Path) -> dict[str, int]:
+    """Peak traced memory (bytes) reached during each phase, in one serial run."""
+    peaks: dict[str, int] = {}
+
+    @contextlib.contextmanager
+    def measure(name):
+        tracemalloc.reset_peak()
+        yield
+        peaks[name] = tracemalloc.get_traced_memory()[1]
+
+    tracemalloc.start()
+    try:
+        run_pipeline(root, 1, measure)
+    finally:
+        tracemalloc.stop()
+    peaks["total"] = max(peaks.values())
+    return peaks
+
+
+def run_scenario(name: str, params: tuple, jobs: int, repeat: int, keep: bool) -> dict:
+    namespaces, crates, tags, commands = params
+    root = Path(tempfile.mkdtemp(prefix=f"bulker-bench-{name}-"))
+    try:
+        files = generate(root, namespaces, crates, tags, commands)
+        print(f"{name}: {files} manifest files "
+              f"({namespaces} namespaces x {crates} crates x {tags} tags, "
+              f"{commands} commands) in {root}")
+        return {
+            "params": {"namespaces": namespaces, "crates": crates, "tags": tags,
+                       "commands": commands, "jobs": jobs, "files": files},
+            "seconds": time_phases(root, jobs, repeat),
+            "peak_memory": peak_memory(root),
+        }
+    finally:
+        if not keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def print_result(name: str, result: dict, base: dict | None):
+    print(f"  {'phase':<16} {'seconds':>9} {'baseline':>9} {'peak MiB':>9} {'baseline':>9}")
+    for phase, seconds in result["seconds"].items():
+        mib = result["peak_memory"].get(phase, 0) / 2**20
+        row = f"  {phase:<16} {seconds:9.3f}"
+        if base:
+            b_sec = base["seconds"].get(phase)
+            b_mib = base["peak_memory"].get(phase, 0) / 2**20
+            row += f" {b_sec:9.3f}" if b_sec is not None else f" {'-':>9}"
+            row += f" {mib:9.1f} {b_mib:9.1f}"
+        else:
+            row += f" {'-':>9} {mib:9.1f} {'-':>9}"
+        print(row)
+
+
+def regressions(result: dict, base: dict, tolerance: float) -> list[str]:
+    """Phases slower or using more memory than the baseline allows."""
+    found = []
+    for phase, seconds in result["seconds"].items():
+        b_sec = base["seconds"].get(phase)
+        if b_sec is not None and seconds > b_sec * (1 + tolerance) and seconds - b_sec > MIN_DELTA:
+            found.append(f"{phase}: {seconds:.3f}s vs baseline {b_sec:.3f}s")
+    for phase, peak in result["peak_memory"].items():
+        b_peak = base["peak_memory"].get(phase)
+        if b_peak and peak > b_peak * (1 + tolerance):
+            found.append(f"{phase}: peak {peak / 2**20:.1f} MiB vs baseline "
+                         f"{b_peak / 2**20:.1f} MiB")
+    return found
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the site build on synthetic registries.")
+    ap.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                    help="scenario to run (repeatable; default: small)")
+    ap.add_argument("--repeat", type=int, default=3, help="timed runs per scenario (median)")
+    ap.add_argument("--jobs", type=int, default=1, help="render processes, as build_site --jobs")
+    ap.add_argument("--baseline", type=Path, default=BASELINE,
+                    help=f"baseline file to compare with (default: {BASELINE.name})")
+    ap.add_argument("--save-baseline", action="store_true",
+                    help="replace the baseline with these results instead of comparing")
+    ap.add_argument("--tolerance", type=float, default=0.25,
+                    help="allowed slowdown/growth over the baseline (default: 0.25 = 25%%)")
+    ap.add_argument("--json", type=Path, metavar="PATH", help="also write results to PATH")
+    ap.add_argument("--keep", action="store_true", help="keep the generated registries")
+    args = ap.parse_args()
+
+    baselines = {}
+    if args.baseline.exists():
+        baselines = json.loads(args.baseline.read_text())
+
+    results = {}
+    failed = []
+    for name in args.scenario or ["small"]:
+        result = run_scenario(name, SCENARIOS[name], max(1, args.jobs), args.repeat, args.keep)
+        results[name] = result
+        base = None if args.save_baseline else baselines.get(name)
+        if base and base["params"] != result["params"]:
+            print(f"  (baseline for {name} used different parameters; not comparing)")
+            base = None
+        print_result(name, result, base)
+        if base:
+            for problem in regressions(result, base, args.tolerance):
+                print(f"  REGRESSION {problem}")
+                failed.append(f"{name}: {problem}")
+        print()
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    # The first run of a scenario on this machine becomes its baseline
+    saved = [name for name in results if args.save_baseline or name not in baselines]
+    if saved:
+        baselines.update({name: results[name] for name in saved})
+        args.baseline.write_text(json.dumps(baselines, indent=2) + "\n")
+        print(f"Saved baseline for {', '.join(saved)} to {args.baseline}")
+    if failed:
+        print(f"{len(failed)} regressions against {args.baseline}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Persistent content-hash cache for incremental builds of hub.bulker.io.
+
+The cache lives in .build_cache/build_cache.json and records three things:
+
+- manifests: repo-relative manifest path -> content hash and the parsed record
+  build_site.py derived from it, so unchanged manifests are not re-parsed.
+- outputs:   docs-relative output path -> hash of every input that produced it
+  (template sources, manifest hashes, data derived from them) plus the size,
+  mtime and content hash the file had when written, so pages whose inputs are
+  unchanged are neither re-rendered nor rewritten, and a file changed by
+  anything else is rebuilt. Size and mtime are the quick check; when the
+  mtime differs (a fresh checkout of docs/ in CI) the content hash decides.
+- owned:     every docs-relative path the last build wrote (or found already
+  up to date), so the next build can delete what it no longer produces --
+  the pages, image lists and changelogs of a deleted crate.
+
+Manifests and outputs are discarded when the generator (build_site.py or any
+repo module it imports) changes, since a code change can alter any output
+without any input changing; the owned list is kept regardless, since it
+describes what is on disk.
+"""
+
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+CACHE_VERSION = 2
+
+
+def file_digest(path: Path) -> str:
+    """Return the sha256 hex digest of a file's bytes."""
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def bytes_digest(data: bytes) -> str:
+    """Return the sha256 hex digest of a byte string."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def inputs_key(*parts) -> str:
+    """Hash an arbitrary JSON-serialisable description of a page's inputs."""
+    blob = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class BuildCache:
+    def __init__(self, path: Path, generator: str):
+        self.path = path
+        self.generator = generator
+        self.manifests: dict[str, dict] = {}
+        self.outputs: dict[str, list] = {}
+        self.owned: set[str] = set()
+
+    @classmethod
+    def load(cls, path: Path, generator: str, reuse: bool = True) -> "BuildCache":
+        """Load the cache from disk; start empty if missing, corrupt or stale.
+
+        With reuse=False only the owned list is loaded, for a full rebuild that
+        must still prune what the previous build left behind.
+        """
+        cache = cls(path, generator)
+        if not path.exists():
+            return cache
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError) as e:
+            print(f"  WARNING: ignoring unreadable build cache {path}: {e}", file=sys.stderr)
+            return cache
+        if data.get("version") != CACHE_VERSION:
+            return cache
+        cache.owned = set(data.get("owned") or ())
+        if not reuse or data.get("generator") != generator:
+            return cache
+        cache.manifests = data.get("manifests") or {}
+        cache.outputs = data.get("outputs") or {}
+        return cache
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": CACHE_VERSION,
+            "generator": self.generator,
+            "manifests": self.manifests,
+            "outputs": self.outputs,
+            "owned": sorted(self.owned),
+        }
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, sort_keys=True))
+        tmp.replace(self.path)
+
+    def lookup_manifest(self, rel: str, digest: str) -> dict | None:
+        """Return the cached parsed record for a manifest if its hash matches."""
+        entry = self.manifests.get(rel)
+        if entry and entry.get("digest") == digest:
+            return entry["record"]
+        return None
+
+    def store_manifest(self, rel: str, digest: str, record: dict):
+        self.manifests[rel] = {"digest": digest, "record": record}
+
+    def prune_manifests(self, live: set[str]):
+        """Forget manifests that no longer exist in the tree."""
+        for rel in set(self.manifests) - live:
+            del self.manifests[rel]
+
+    def is_fresh(self, rel: str, key: str, dest: Path) -> bool:
+        """True if `dest` is exactly the file we last produced from `key`."""
+        entry = self.outputs.get(rel)
+        if not entry or entry[0] != key:
+            return False
+        try:
+            st = dest.stat()
+        except FileNotFoundError:
+            return False
+        if [st.st_size, st.st_mtime_ns] == entry[1:3]:
+            return True
+        if st.st_size != entry[1] or file_digest(dest) != entry[3]:
+            return False
+        # Same bytes under a new mtime: remember it, so the next check is quick
+        entry[2] = st.st_mtime_ns
+        return True
+
+    def record_output(self, rel: str, key: str, dest: Path):
+        data = dest.read_bytes()
+        st = dest.stat()
+        self.outputs[rel] = [key, st.st_size, st.st_mtime_ns, bytes_digest(data)]
@@ -7,37 +7,130 @@ Walks all namespace directories, parses YAML manifest files, and generates:
 - docs/<ns>/<crate>.html   -- per-crate detail page (one per crate name, all tags)
 - docs/channels.html       -- registered channels page
 - docs/index.yaml          -- machine-readable manifest index
-- docs/index.json          -- same data as JSON (for client-side search)
+- docs/index.json          -- same data as JSON (full listing, every tag)
+- docs/search/index.json   -- compact search index: latest tag per crate plus
+                              an inverted index from name/command/description
+                              tokens to crates (what the homepage fetches)
+- docs/search/<ns>/<crate>.json -- per-crate search detail, loaded on demand
+- docs/search/federated.json -- the same rows for this site and every remote
+                              channel in channels.yaml, each row tagged with
+                              its channel (see channel_client.py)
+- docs/commands.json       -- reverse index: command -> every (ns, crate, tag, image)
+- docs/commands/<cmd>.json -- the same, one file per command
+- docs/commands.html       -- command browser
+- docs/reverse_deps.json   -- imported crate:tag -> direct importers and all
+                              transitive dependents
+- docs/resolved/<ns>/<file> -- each manifest with its transitive imports
+                              flattened in (plus <crate>.yaml for the latest
+                              tag), so a client needs one fetch
+- docs/images/<ns>/<crate>/<tag>.json -- unique container images a tag needs,
+                              import closure included; <tag>.delta.json lists
+                              those added/removed since the previous tag
+- docs/changes/<ns>/<crate>/<tag>.json -- commands added, removed and re-pinned
+                              since the previous tag (see manifest_diff.py)
 - docs/style.css           -- stylesheet (copied from _templates/)
 
+With --optimize-assets, generated HTML/JSON are minified, large text assets
+get precompressed .gz/.br siblings, and docs/_headers marks versioned
+manifests immutable for Cloudflare (see asset_pipeline.py).
+
+Usage:
+    python build_site.py                # full rebuild
+    python build_site.py --incremental  # re-render only pages whose inputs changed
+    python build_site.py --jobs 4       # render crate/version pages in 4 processes
+    python build_site.py --check-tags   # validate (incl. registry tags), then build
+    python build_site.py --fetch-channels  # refresh remote channel indexes for search
+    python build_site.py --optimize-assets  # minify, precompress, write _headers
+    python build_site.py --profile --timings-json timings.json  # where the time goes
+    python build_site.py --compile-templates  # precompile templates (used while current)
+    python build_site.py --watch        # rebuild affected pages on every edit
+    python build_site.py --serve        # same, serving docs/ with live reload (dev_server.py)
+
+Template bytecode is cached in .build_cache/jinja/ between builds, and the
+last good index of each remote channel in .build_cache/channels.json; builds
+without --fetch-channels federate from that cache and never touch the network.
+
 Requires: PyYAML, Jinja2 (stdlib otherwise).
 """
 
+import argparse
+import compileall
+import contextlib
+import io
 import json
 import os
 import re
 import shutil
 import sys
+import time
+import traceback
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import jinja2
 import yaml
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, ModuleLoader
+from markupsafe import Markup
+
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeDumper
 
-# Directories to skip when scanning for manifests
-SKIP_DIRS = {"docs", "_templates", ".git", ".github", "__pycache__"}
+import asset_pipeline
+import channel_client
+import dev_server
+import profiling
+import versioning
+from build_cache import BuildCache, file_digest, inputs_key
+from manifest_diff import command_changes
+from manifest_graph import ImportCycleError, ImportGraph, parse_import
+from manifest_loader import SKIP_DIRS, LoadedManifest, load_manifests, parse_yaml
+from manifest_record import Command, ManifestRecord
 
 ROOT = Path(__file__).parent.resolve()
 DOCS = ROOT / "docs"
 TEMPLATES = ROOT / "_templates"
+BUILD_CACHE = ROOT / ".build_cache" / "build_cache.json"
+# Compiled template bytecode, reused while a template's source is unchanged
+JINJA_CACHE = ROOT / ".build_cache" / "jinja"
+# Written by --compile-templates: every template as a byte-compiled Python
+# module, plus the template digests and Jinja version they were compiled from
+COMPILED_TEMPLATES = ROOT / ".build_cache" / "templates"
+COMPILED_TEMPLATES_INFO = ROOT / ".build_cache" / "templates.json"
+# Last good index.json of each remote channel, with its ETag/Last-Modified
+CHANNEL_CACHE = ROOT / ".build_cache" / "channels.json"
 
+# Set by --optimize-assets: generated HTML/JSON are minified as they are written
+_minify = False
 
-def parse_manifest_file(filepath: Path) -> dict | None:
-    """Parse a single manifest YAML file and extract metadata."""
-    try:
-        with open(filepath) as f:
-            data = yaml.safe_load(f)
-    except Exception as e:
-        print(f"  WARNING: could not parse {filepath}: {e}", file=sys.stderr)
+# Set by --watch/--serve: keep the text last serialised per output and reuse it
+# while its data is unchanged, since each rebuild repeats nearly all of it
+_keep_serialised = False
+_serialised: dict[str, tuple[str, str]] = {}
+
+# Every file the current build writes or finds up to date; what the previous
+# build owned and this one did not produce is pruned (see prune_outputs)
+_outputs: set[Path] = set()
+
+
+class BuildError(Exception):
+    """The tree cannot be built: validation or import resolution failed."""
+
+
+def parse_manifest_file(filepath: Path,
+                        loaded: LoadedManifest | None = None) -> ManifestRecord | None:
+    """Extract metadata from a manifest file.
+
+    `loaded` is the shared loader's record for `filepath`; when given, its
+    already-read text and already-parsed document are reused.
+    """
+    if loaded is None:
+        loaded = load_manifests(filepath.parent.parent, [filepath])[0]
+    data = loaded.data
+    if loaded.error is not None:
+        print(f"  WARNING: could not parse {filepath}: {loaded.error}", file=sys.stderr)
         return None
 
     if not data or "manifest" not in data:
@@ -45,10 +138,7 @@ def parse_manifest_file(filepath: Path) -> dict | None:
         return None
 
     manifest = data["manifest"]
-    name = manifest.get("name", filepath.stem)
-    # Strip namespace prefix if present (e.g. "databio/pepatac" -> "pepatac")
-    if "/" in name:
-        name = name.rsplit("/", 1)[-1]
+    name = loaded.crate
     version = manifest.get("version", "")
     description = manifest.get("description", "")
 
@@ -56,71 +146,72 @@ def parse_manifest_file(filepath: Path) -> dict | None:
     namespace = filepath.parent.name
 
     # Determine tag from filename convention: name_tag.yaml or name.yaml = default
-    stem = filepath.stem
-    if "_" in stem:
-        # e.g. pepatac_1.0.13 -> tag = 1.0.13
-        parts = stem.split("_", 1)
-        tag = parts[1]
-    else:
-        tag = "default"
+    tag = loaded.tag
 
     # Extract commands
     commands_raw = manifest.get("commands") or []
-    commands = []
-    for cmd in commands_raw:
-        if isinstance(cmd, dict):
-            commands.append({
-                "command": cmd.get("command", ""),
-                "docker_image": cmd.get("docker_image", ""),
-                "docker_args": cmd.get("docker_args", ""),
-                "docker_command": cmd.get("docker_command", ""),
-            })
+    commands = [Command.from_yaml(cmd) for cmd in commands_raw if isinstance(cmd, dict)]
 
     # Extract other fields
     imports = manifest.get("imports") or []
     host_commands = manifest.get("host_commands") or []
 
-    return {
-        "namespace": namespace,
-        "name": name,
-        "tag": tag,
-        "version": str(version) if version else "",
-        "description": description or "",
-        "path": f"{namespace}/{filepath.name}",
-        "filename": filepath.name,
-        "commands": commands,
-        "command_names": [c["command"] for c in commands],
-        "command_count": len(commands),
-        "imports": imports,
-        "host_commands": host_commands,
-        "host_command_count": len(host_commands),
-        "raw_yaml": filepath.read_text(),
-    }
+    return ManifestRecord(
+        namespace=namespace,
+        name=name,
+        tag=tag,
+        version=str(version) if version else "",
+        description=description or "",
+        path=f"{namespace}/{filepath.name}",
+        filename=filepath.name,
+        commands=commands,
+        imports=imports,
+        host_commands=host_commands,
+        source=filepath,
+    )
 
 
-def discover_manifests(root: Path) -> list[dict]:
-    """Walk the repo and find all manifest YAML files."""
+def discover_manifests(root: Path, cache: BuildCache | None = None,
+                       loaded: list[LoadedManifest] | None = None) -> list[ManifestRecord]:
+    """Walk the repo and find all manifest YAML files.
+
+    `loaded` lets a caller that already read the tree (e.g. for validation)
+    share it. With a build cache, manifests whose content hash is unchanged
+    reuse the cached record instead of being parsed at all.
+    """
+    if loaded is None:
+        loaded = load_manifests(root)
     manifests = []
-    for entry in sorted(root.iterdir()):
-        if not entry.is_dir() or entry.name in SKIP_DIRS or entry.name.startswith("."):
-            continue
-        namespace_dir = entry
-        for yaml_file in sorted(namespace_dir.glob("*.yaml")):
-            if yaml_file.is_symlink():
-                continue  # skip symlinks, they duplicate a versioned file
-            parsed = parse_manifest_file(yaml_file)
-            if parsed:
-                manifests.append(parsed)
+    live = set()
+    for m in loaded:
+        if m.is_symlink:
+            continue  # skip symlinks, they duplicate a versioned file
+        live.add(m.rel)
+        cached = cache.lookup_manifest(m.rel, m.digest) if cache else None
+        if cached is None:
+            parsed = parse_manifest_file(m.path, m)
+            if parsed and cache:
+                cache.store_manifest(m.rel, m.digest, parsed.to_cache())
+        else:
+            parsed = ManifestRecord.from_cache(cached, m.path)
+        if parsed:
+            parsed.digest = m.digest
+            manifests.append(parsed)
+    if cache:
+        cache.prune_manifests(live)
     return manifests
 
 
-def build_data_structure(manifests: list[dict]) -> dict:
-    """Organize manifests into namespaces -> crates -> tags hierarchy."""
+def build_data_structure(manifests: list[ManifestRecord]) -> dict:
+    """Organize manifests into namespaces -> crates -> tags hierarchy.
+
+    Each crate also gets `ordered_tags` (newest first) and `latest_tag`, both
+    from versioning, so templates and indexes never re-sort tags.
+    """
     namespaces = {}
     for m in manifests:
         ns = m["namespace"]
         crate_name = m["name"]
-        tag = m["tag"]
 
         if ns not in namespaces:
             namespaces[ns] = {"name": ns, "crates": {}}
@@ -131,48 +222,84 @@ def build_data_structure(manifests: list[dict]) -> dict:
                 "name": crate_name,
                 "namespace": ns,
                 "tags": {},
-                "latest_tag": tag,
                 "description": m["description"],
             }
+        ns_data["crates"][crate_name]["tags"][m["tag"]] = m
 
-        crate_data = ns_data["crates"][crate_name]
-        crate_data["tags"][tag] = m
-
-        # Update latest_tag: prefer highest version-like tag, else most recent
-        if m["version"]:
-            current_latest = crate_data["tags"].get(crate_data["latest_tag"], {})
-            current_version = current_latest.get("version", "")
-            if _version_gt(m["version"], current_version):
-                crate_data["latest_tag"] = tag
-                if m["description"]:
-                    crate_data["description"] = m["description"]
+    for ns_data in namespaces.values():
+        for crate_data in ns_data["crates"].values():
+            tags = crate_data["tags"]
+            crate_data["ordered_tags"] = versioning.sort_tags(tags)
+            crate_data["latest_tag"] = versioning.latest_tag(
+                {tag: m["version"] for tag, m in tags.items()})
+            # Describe the crate by its latest tag, if that has a description
+            if tags[crate_data["latest_tag"]]["description"]:
+                crate_data["description"] = tags[crate_data["latest_tag"]]["description"]
 
     return namespaces
 
 
-def _version_parts(v: str) -> list:
-    """Split a version string into comparable parts (ints where possible)."""
-    return [int(x) if x.isdigit() else x for x in re.split(r'[._-]', v)]
+def _serialise(key: str, data, dump) -> str:
+    """dump(data), reusing the text last produced for `key` if data is unchanged.
+
+    Only in watch mode; a one-shot build would just hold every output's text.
+    Data is compared by its compact JSON encoding, which is C-accelerated
+    (unlike YAML or indented JSON) and, unlike ==, tells 1 from 1.0 and True.
+    """
+    if not _keep_serialised:
+        return dump(data)
+    fingerprint = json.dumps(data, separators=(",", ":"),
+                             default=lambda o: f"{type(o).__name__}:{o}")
+    previous = _serialised.get(key)
+    if previous is not None and previous[0] == fingerprint:
+        return previous[1]
+    text = dump(data)
+    _serialised[key] = (fingerprint, text)
+    return text
+
 
+def _yaml_text(data) -> str:
+    return yaml.dump(data, Dumper=SafeDumper, sort_keys=False, default_flow_style=False)
 
-def _version_gt(a: str, b: str) -> bool:
-    """Compare two version strings. Returns True if a > b."""
+
+def _json_text(data) -> str:
+    return json.dumps(data, indent=2)
+
+
+def _write_if_changed(path: Path, text: str) -> bool:
+    """Write text to path unless it already holds exactly those bytes.
+
+    Leaving identical files alone keeps their mtimes stable, so downstream
+    sync steps only see files that really changed. Returns True if written.
+    """
+    _outputs.add(path)
+    if _minify:
+        text = asset_pipeline.minify(path, text)
+    data = text.encode()
     try:
-        return _version_parts(a) > _version_parts(b)
-    except (TypeError, ValueError):
-        return a > b
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    path.write_bytes(data)
+    profiling.record_write(len(data))
+    return True
 
 
-def _semver_sort_tags(tags_dict: dict, reverse: bool = True) -> list:
-    """Sort a tags dict by semver order, returning list of (tag_name, tag_data) tuples."""
-    def sort_key(item):
-        parts = re.split(r'[._-]', item[0])
-        # Pad to ensure consistent length; use (0, num) for ints, (1, str) for strings
-        return [(0, int(p)) if p.isdigit() else (1, p) for p in parts]
-    return sorted(tags_dict.items(), key=sort_key, reverse=reverse)
+def _copy_if_changed(src: Path, dest: Path) -> bool:
+    """Copy src to dest (with metadata) unless dest already has the same bytes."""
+    _outputs.add(dest)
+    try:
+        if dest.stat().st_size == src.stat().st_size and dest.read_bytes() == src.read_bytes():
+            return False
+    except FileNotFoundError:
+        pass
+    shutil.copy2(src, dest)
+    profiling.record_write(dest.stat().st_size)
+    return True
 
 
-def write_index_yaml(manifests: list[dict], output: Path):
+def write_index_yaml(manifests: list[ManifestRecord], output: Path):
     """Write the machine-readable index.yaml."""
     entries = []
     for m in manifests:
@@ -180,17 +307,19 @@ def write_index_yaml(manifests: list[dict], output: Path):
             "namespace": m["namespace"],
             "name": m["name"],
             "tag": m["tag"],
+            "version": m["version"],
             "path": m["path"],
             "commands": m["command_names"],
             "command_count": m["command_count"],
             "imports": m["imports"],
         })
-    with open(output, "w") as f:
-        yaml.dump({"manifests": entries}, f, default_flow_style=False, sort_keys=False)
+    text = _serialise("index.yaml", {"manifests": entries},
+                      lambda d: yaml.dump(d, default_flow_style=False, sort_keys=False))
+    _write_if_changed(output, text)
     print(f"  Wrote {output}")
 
 
-def write_index_json(manifests: list[dict], output: Path):
+def write_index_json(manifests: list[ManifestRecord], output: Path):
     """Write index.json for client-side search."""
     entries = []
     for m in manifests:
@@ -198,6 +327,7 @@ def write_index_json(manifests: list[dict], output: Path):
             "namespace": m["namespace"],
             "name": m["name"],
             "tag": m["tag"],
+            "version": m["version"],
             "path": m["path"],
             "commands": m["command_names"],
             "command_count": m["command_count"],
@@ -205,28 +335,689 @@ def write_index_json(manifests: list[dict], output: Path):
             "description": m["description"],
             "host_commands": m["host_commands"],
         })
-    with open(output, "w") as f:
-        json.dump({"manifests": entries}, f, indent=2)
+    _write_if_changed(output, _serialise("index.json", {"manifests": entries}, _json_text))
     print(f"  Wrote {output}")
 
 
+SEARCH_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9._+-]*")
+SEARCH_FIELDS = ["namespace", "name", "tag", "command_count", "description"]
+# search/federated.json rows also carry the channel, and the version a remote
+# channel's latest tag was chosen by
+FEDERATED_FIELDS = ["channel", "namespace", "name", "tag", "version", "command_count",
+                    "description"]
+
+
+def _search_tokens(*texts: str) -> set[str]:
+    """Lower-cased search tokens: names kept whole, descriptions split into words."""
+    tokens = set()
+    for text in texts:
+        tokens.update(SEARCH_TOKEN_RE.findall((text or "").lower()))
+    return tokens
+
+
+def write_search_index(namespaces: dict, output_dir: Path):
+    """Write the compact, sharded client-side search index.
+
+    index.json holds one row per crate (its latest tag only) and a map from
+    every token to the crates it occurs in, so the browser matches the query
+    against the token list instead of scanning every manifest of every
+    version. Per-crate shards carry the command list for displaying matches
+    and are only fetched for crates that actually appear in results.
+    """
+    crates = []
+    postings: dict[str, list[int]] = {}
+    for ns_name, ns_data in sorted(namespaces.items()):
+        shard_dir = output_dir / ns_name
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        for crate_name, crate_data in sorted(ns_data["crates"].items()):
+            latest = crate_data["tags"][crate_data["latest_tag"]]
+            crate_id = len(crates)
+            crates.append([ns_name, crate_name, crate_data["latest_tag"],
+                           latest["command_count"], crate_data["description"]])
+            tokens = _search_tokens(ns_name, crate_name, crate_data["description"],
+                                    *latest["command_names"])
+            for token in sorted(tokens):
+                postings.setdefault(token, []).append(crate_id)
+            shard = {
+                "namespace": ns_name,
+                "name": crate_name,
+                "tag": crate_data["latest_tag"],
+                "tags": list(crate_data["tags"]),
+                "commands": latest["command_names"],
+                "host_commands": latest["host_commands"],
+            }
+            _write_if_changed(shard_dir / f"{crate_name}.json",
+                              json.dumps(shard, separators=(",", ":")))
+    index = {"fields": SEARCH_FIELDS, "crates": crates, "tokens": dict(sorted(postings.items()))}
+    _write_if_changed(output_dir / "index.json", json.dumps(index, separators=(",", ":")))
+    print(f"  Wrote {output_dir / 'index.json'} ({len(crates)} crates, {len(postings)} tokens)")
+
+
+def build_command_index(namespaces: dict) -> dict[str, list[dict]]:
+    """Map every command name to the crates and tags that provide it.
+
+    Providers are ordered by namespace, crate, then newest tag first; `latest`
+    marks the ones provided by a crate's latest tag.
+    """
+    index: dict[str, list[dict]] = {}
+    for ns_name, ns_data in sorted(namespaces.items()):
+        for crate_name, crate_data in sorted(ns_data["crates"].items()):
+            for tag_name in crate_data["ordered_tags"]:
+                tag_data = crate_data["tags"][tag_name]
+                for cmd in tag_data["commands"]:
+                    if not cmd["command"]:
+                        continue
+                    index.setdefault(cmd["command"], []).append({
+                        "namespace": ns_name,
+                        "crate": crate_name,
+                        "tag": tag_name,
+                        "docker_image": cmd["docker_image"],
+                        "latest": tag_name == crate_data["latest_tag"],
+                    })
+    return dict(sorted(index.items()))
+
+
+def write_command_index(commands: dict[str, list[dict]], output: Path, output_dir: Path):
+    """Write commands.json plus one commands/<command>.json per command."""
+    fields = ["namespace", "crate", "tag", "docker_image"]
+    table = {
+        name: [[p[f] for f in fields] for p in providers]
+        for name, providers in commands.items()
+    }
+    _write_if_changed(output, json.dumps({"fields": fields, "commands": table},
+                                         separators=(",", ":")))
+    output_dir.mkdir(exist_ok=True)
+    for name, providers in commands.items():
+        _write_if_changed(output_dir / f"{name}.json",
+                          _serialise(f"commands/{name}.json",
+                                     {"command": name, "providers": providers}, _json_text))
+    print(f"  Wrote {output} and {len(commands)} files in {output_dir}")
+
+
+def resolve_imports(graph: ImportGraph) -> tuple[dict[str, dict], list[str]]:
+    """Flatten every manifest's import closure; returns (flattened, errors).
+
+    Keys are repo-relative manifest paths. Dangling imports and import cycles
+    are errors: a pre-resolved manifest missing part of its closure would
+    silently give users fewer commands than `bulker load` of the original.
+    """
+    errors = [
+        f"{rel}: import '{ref}' does not match any published manifest"
+        for rel, refs in sorted(graph.dangling.items()) for ref in refs
+    ]
+    flattened = {}
+    cycles: dict[tuple, list[str]] = {}  # each cycle once, however many reach it
+    for rel in sorted(graph.manifests):
+        try:
+            flattened[rel] = graph.flatten(rel)
+        except ImportCycleError as e:
+            loop = e.cycle[:-1]
+            start = loop.index(min(loop))
+            cycles.setdefault(tuple(loop[start:] + loop[:start]), []).append(rel)
+    for loop, rels in cycles.items():
+        errors.append(f"import cycle: {' -> '.join(loop + (loop[0],))}"
+                      f" (reached from {len(rels)} manifests)")
+    return flattened, errors
+
+
+def write_resolved_manifests(flattened: dict[str, dict], namespaces: dict,
+                             output: Path) -> set[Path]:
+    """Write resolved/<ns>/<file> for each published manifest <ns>/<file>.
+
+    Crates also get resolved/<ns>/<crate>.yaml, flattened from the latest
+    tag, mirroring the <crate>.yaml latest pointer. They are kept out of the
+    namespace directories, where a `/<ns>/<crate>_*` immutable-cache rule
+    would match them (see asset_pipeline.write_headers), since a closure
+    changes whenever an imported default pointer moves. Returns the paths
+    written.
+    """
+    def dump(rel: str) -> str:
+        return _serialise(f"resolved:{rel}", flattened[rel], _yaml_text)
+
+    latest_paths = {crate_data["tags"][crate_data["latest_tag"]]["path"]
+                    for ns_data in namespaces.values()
+                    for crate_data in ns_data["crates"].values()}
+    latest_text = {}  # the pointers repeat these; one per crate, not per tag
+    written = set()
+    for rel in flattened:
+        dest = output / "resolved" / rel
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        text = dump(rel)
+        if rel in latest_paths:
+            latest_text[rel] = text
+        _write_if_changed(dest, text)
+        written.add(dest)
+    pointers = 0
+    for ns_name, ns_data in namespaces.items():
+        for crate_name, crate_data in ns_data["crates"].items():
+            latest = crate_data["tags"][crate_data["latest_tag"]]["path"]
+            dest = output / "resolved" / ns_name / f"{crate_name}.yaml"
+            if latest in flattened and dest != output / "resolved" / latest:
+                _write_if_changed(dest, latest_text[latest])
+                written.add(dest)
+                pointers += 1
+    print(f"  Wrote {len(flattened)} resolved manifests (+{pointers} latest pointers)")
+    return written
+
+
+def build_reverse_deps(graph: ImportGraph) -> dict[str, dict]:
+    """Map every imported `ns/crate:tag` to the manifests that depend on it.
+
+    Keys are the concrete ref of each imported file, plus `ns/crate:default`
+    for crates imported through their default pointer (whose dependents are
+    what moves when the crate's latest tag changes). Values list the direct
+    importers (`used_by`) and the full transitive set (`dependents`).
+    """
+    keys = {graph.ref(rel) for rel, importers in graph.importers.items() if importers}
+    for refs in graph.imports.values():
+        for ref in refs:
+            parts = parse_import(ref)
+            if parts and parts[2] == "default" and graph.resolve(ref):
+                keys.add(f"{parts[0]}/{parts[1]}:default")
+    index = {}
+    for key in sorted(keys):
+        direct = graph.direct_dependents(key)
+        index[key] = {
+            "path": graph.resolve(key),
+            "used_by": sorted(graph.ref(rel) for rel in direct),
+            "dependents": sorted(graph.ref(rel) for rel in direct | graph.dependents(direct)),
+        }
+    return index
+
+
+def attach_reverse_deps(namespaces: dict, graph: ImportGraph):
+    """Add `used_by` to every tag (importing manifests) and crate (importing crates)."""
+    for ns_data in namespaces.values():
+        for crate_data in ns_data["crates"].values():
+            crates: dict[tuple[str, str], int] = {}
+            for tag_data in crate_data["tags"].values():
+                importers = [graph.manifests[rel] for rel in graph.importers.get(tag_data["path"], ())]
+                tag_data["used_by"] = sorted(
+                    ({"namespace": m.namespace, "name": m.crate, "tag": m.tag,
+                      "ref": f"{m.namespace}/{m.crate}:{m.tag}"} for m in importers),
+                    key=lambda d: d["ref"],
+                )
+                for m in importers:
+                    crates[(m.namespace, m.crate)] = crates.get((m.namespace, m.crate), 0) + 1
+            crate_data["used_by"] = [
+                {"namespace": ns, "name": name, "count": count}
+                for (ns, name), count in sorted(crates.items())
+            ]
+
+
+def write_reverse_deps(index: dict[str, dict], output: Path):
+    _write_if_changed(output, json.dumps(index, indent=2))
+    print(f"  Wrote {output} ({len(index)} imported refs)")
+
+
+def attach_images(namespaces: dict, flattened: dict[str, dict]):
+    """Add each tag's container images, import closure included.
+
+    `images` is the sorted, de-duplicated docker_image list of the tag's
+    flattened manifest (what `bulker activate` would pull), and
+    `previous_tag` the next older tag in version order (None for the oldest).
+    """
+    for ns_data in namespaces.values():
+        for crate_data in ns_data["crates"].values():
+            ordered = crate_data["ordered_tags"]
+            for i, tag_name in enumerate(ordered):
+                tag_data = crate_data["tags"][tag_name]
+                resolved = flattened.get(tag_data["path"])
+                commands = resolved["manifest"]["commands"] if resolved else tag_data["commands"]
+                tag_data["images"] = sorted({
+                    c["docker_image"] for c in commands
+                    if isinstance(c.get("docker_image"), str) and c["docker_image"]
+                })
+                tag_data["image_count"] = len(tag_data["images"])
+                tag_data["previous_tag"] = ordered[i + 1] if i + 1 < len(ordered) else None
+
+
+def write_image_lists(namespaces: dict, output_dir: Path):
+    """Write images/<ns>/<crate>/<tag>.json and <tag>.delta.json for every tag.
+
+    The list is every image the tag needs; the delta names the images added
+    and removed since `previous_tag`, so a site that pre-pulls containers
+    only fetches what is new (for the oldest tag, every image is "added").
+    """
+    files = 0
+    for ns_name, ns_data in sorted(namespaces.items()):
+        for crate_name, crate_data in sorted(ns_data["crates"].items()):
+            crate_dir = output_dir / ns_name / crate_name
+            crate_dir.mkdir(parents=True, exist_ok=True)
+            for tag_name in crate_data["ordered_tags"]:
+                tag_data = crate_data["tags"][tag_name]
+                ref = {"namespace": ns_name, "name": crate_name, "tag": tag_name}
+                images = tag_data["images"]
+                previous = tag_data["previous_tag"]
+                old = set(crate_data["tags"][previous]["images"]) if previous else set()
+                delta = dict(ref, previous=previous,
+                             added=[i for i in images if i not in old],
+                             removed=sorted(old.difference(images)))
+                _write_if_changed(crate_dir / f"{tag_name}.json",
+                                  json.dumps(dict(ref, images=images), indent=2))
+                _write_if_changed(crate_dir / f"{tag_name}.delta.json",
+                                  json.dumps(delta, indent=2))
+                files += 2
+    print(f"  Wrote {files} image lists and deltas in {output_dir}")
+
+
+def attach_changes(namespaces: dict):
+    """Add `changes`, the command diff against the previous tag, to every tag.
+
+    Walks each crate's tags oldest to newest once, comparing neighbours with
+    manifest_diff.command_changes. The oldest tag gets None.
+    """
+    for ns_data in namespaces.values():
+        for crate_data in ns_data["crates"].values():
+            previous = None
+            for tag_name in reversed(crate_data["ordered_tags"]):
+                tag_data = crate_data["tags"][tag_name]
+                if previous is None:
+                    tag_data["changes"] = None
+                else:
+                    changes = command_changes(crate_data["tags"][previous]["commands"],
+                                              tag_data["commands"])
+                    tag_data["changes"] = dict(previous=previous, **changes)
+                previous = tag_name
+
+
+def write_changelogs(namespaces: dict, output_dir: Path):
+    """Write changes/<ns>/<crate>/<tag>.json for every tag with a previous tag."""
+    files = 0
+    for ns_name, ns_data in sorted(namespaces.items()):
+        for crate_name, crate_data in sorted(ns_data["crates"].items()):
+            crate_dir = output_dir / ns_name / crate_name
+            for tag_name in crate_data["ordered_tags"]:
+                changes = crate_data["tags"][tag_name]["changes"]
+                if changes is None:
+                    continue
+                crate_dir.mkdir(parents=True, exist_ok=True)
+                entry = dict(namespace=ns_name, name=crate_name, tag=tag_name, **changes)
+                _write_if_changed(crate_dir / f"{tag_name}.json", json.dumps(entry, indent=2))
+                files += 1
+    print(f"  Wrote {files} changelog entries in {output_dir}")
+
+
 def load_channels(root: Path) -> list[dict]:
     """Load channels.yaml from repo root."""
     channels_file = root / "channels.yaml"
     if not channels_file.exists():
         return []
-    with open(channels_file) as f:
-        data = yaml.safe_load(f)
+    data = parse_yaml(channels_file.read_text())
     return data.get("channels", []) if data else []
 
 
-def render_site(namespaces: dict, manifests: list[dict], channels: list[dict]):
-    """Render all HTML pages using Jinja2 templates."""
-    env = Environment(
-        loader=FileSystemLoader(str(TEMPLATES)),
-        autoescape=True,
+def local_channel(channels: list[dict], root: Path) -> tuple[str, dict | None]:
+    """This site's channel name, and its channels.yaml entry if it has one.
+
+    The entry whose URL host is the site's CNAME is this site; its crates come
+    from the tree rather than a fetch. Without one, the CNAME names it.
+    """
+    cname_file = root / "CNAME"
+    cname = cname_file.read_text().strip() if cname_file.exists() else ""
+    for ch in channels:
+        if cname and urllib.parse.urlsplit(ch.get("url") or "").hostname == cname:
+            return ch["name"], ch
+    return cname or "local", None
+
+
+def _remote_crates(entries: list[dict]) -> dict[tuple[str, str], dict]:
+    """(namespace, name) -> the entry of its latest tag, from a channel's index."""
+    crates: dict[tuple[str, str], dict[str, dict]] = {}
+    for entry in entries:
+        crates.setdefault((entry["namespace"], entry["name"]), {})[entry["tag"]] = entry
+    latest = {}
+    for key, tags in crates.items():
+        latest[key] = tags[versioning.latest_tag({t: e["version"] for t, e in tags.items()})]
+    return latest
+
+
+def write_federated_index(namespaces: dict, local: str, remote: list[tuple[dict, dict]],
+                          output: Path) -> dict[str, int]:
+    """Write search/federated.json: this site's crates and every remote channel's.
+
+    Rows are those of search/index.json with the channel name in front, so the
+    same namespace/crate in two channels stays two results, and the version
+    of the tag listed. `remote` pairs
+    each remote channel with its channel_client result; channels with no
+    index at all are listed but contribute no rows. Returns crates per channel.
+    """
+    crates = []
+    postings: dict[str, list[int]] = {}
+    counts: dict[str, int] = {}
+    channels = {}
+
+    def add(channel: str, ns_name: str, crate_name: str, tag: str, version: str,
+            commands: list[str], description: str):
+        crate_id = len(crates)
+        crates.append([channel, ns_name, crate_name, tag, version, len(commands), description])
+        for token in sorted(_search_tokens(channel, ns_name, crate_name, description, *commands)):
+            postings.setdefault(token, []).append(crate_id)
+        counts[channel] = counts.get(channel, 0) + 1
+
+    channels[local] = {"url": "", "local": True, "status": "current"}
+    counts[local] = 0
+    for ns_name, ns_data in sorted(namespaces.items()):
+        for crate_name, crate_data in sorted(ns_data["crates"].items()):
+            latest = crate_data["tags"][crate_data["latest_tag"]]
+            add(local, ns_name, crate_name, crate_data["latest_tag"], latest["version"],
+                latest["command_names"], crate_data["description"])
+
+    for ch, result in remote:
+        name = ch["name"]
+        current = result["status"] in ("fetched", "not modified")
+        status = "current" if current else "cached" if result["entry"] else "unavailable"
+        channels[name] = {"url": ch["url"].rstrip("/"), "local": False, "status": status}
+        counts[name] = 0
+        if result["entry"] is None:
+            continue
+        for (ns_name, crate_name), entry in sorted(_remote_crates(result["entry"]["manifests"]).items()):
+            add(name, ns_name, crate_name, entry["tag"], entry["version"], entry["commands"],
+                entry["description"])
+
+    index = {"fields": FEDERATED_FIELDS, "channels": channels, "crates": crates,
+             "tokens": dict(sorted(postings.items()))}
+    _write_if_changed(output, json.dumps(index, separators=(",", ":")))
+    print(f"  Wrote {output} ({len(crates)} crates from {len(channels)} channels, "
+          f"{len(postings)} tokens)")
+    return counts
+
+
+def federate_channels(channels: list[dict], namespaces: dict, output: Path,
+                      fetch: bool, timeout: float):
+    """Refresh remote channel indexes (if `fetch`) and write the federated index.
+
+    A channel that cannot be fetched keeps its last good index from the
+    channel cache, with a warning. Each channels.yaml entry gets the
+    `crate_count` the channels page shows.
+    """
+    local, local_entry = local_channel(channels, ROOT)
+    remote = [ch for ch in channels
+              if ch is not local_entry and ch.get("name") and ch.get("url")]
+    cache = channel_client.ChannelCache.load(CHANNEL_CACHE)
+    if fetch:
+        results = channel_client.refresh(remote, cache, timeout=timeout)
+        cache.save()
+    else:
+        results = channel_client.cached_only(remote, cache)
+
+    for ch in remote:
+        name, result = ch["name"], results[ch["name"]]
+        if result["status"] == "unavailable":
+            hint = "" if fetch else " (run with --fetch-channels)"
+            print(f"  WARNING: channel {name}: {result['error']}; not searchable{hint}",
+                  file=sys.stderr)
+            continue
+        count = len({(e["namespace"], e["name"]) for e in result["entry"]["manifests"]})
+        if result["status"] == "stale":
+            fetched = time.strftime("%Y-%m-%d %H:%M", time.gmtime(result["entry"]["fetched"]))
+            print(f"  WARNING: channel {name}: {result['error']}; using its index of "
+                  f"{fetched} UTC", file=sys.stderr)
+        print(f"  {name}: {count} crates ({result['status']})")
+
+    counts = write_federated_index(namespaces, local, [(ch, results[ch["name"]]) for ch in remote],
+                                   output)
+    for ch in channels:
+        name = local if ch is local_entry else ch.get("name")
+        if name in counts and (ch is local_entry or results[name]["entry"] is not None):
+            ch["crate_count"] = counts[name]
+
+
+def _template_digests() -> dict[str, str]:
+    """Hash every template; page keys include their template and base.html."""
+    return {
+        t.name: file_digest(t)
+        for t in sorted(TEMPLATES.iterdir())
+        if t.is_file()
+    }
+
+
+class FragmentCache:
+    """Page fragments rendered once per process from fragments.html.
+
+    A crate's version pages all list the crate's other tags, and its
+    consecutive versions mostly pin the same images, so rendering both from
+    scratch on every page grows with tags x (tags + commands). Tag links are
+    rendered once per crate; command tables are memoised by their contents,
+    and their rows one by one, so a table that differs from the previous
+    version in a few rows renders only those. The output is byte-identical to
+    rendering the macros in place.
+
+    Pages are rendered crate by crate, so the caches only need to span a few
+    crates; each is emptied when it reaches its cap, bounding memory.
+    """
+
+    # Whitespace the enclosing template puts around each fragment
+    TAG_INDENT = "\n        "
+    MAX_CRATES = 16
+    MAX_TABLES = 64
+    MAX_ROWS = 4096
+
+    def __init__(self, env: Environment):
+        self._module = env.get_template("fragments.html").module
+        self._tag_links: dict[tuple[str, str], dict[str, str]] = {}
+        self._rows: dict[tuple, str] = {}
+        self._tables: dict[tuple, Markup] = {}
+
+    def _crate_links(self, crate: dict) -> dict[str, str]:
+        key = (crate["namespace"], crate["name"])
+        links = self._tag_links.get(key)
+        if links is None:
+            links = {
+                t_name: str(self._module.tag_link(crate, t_name, crate["tags"][t_name]))
+                for t_name in crate["ordered_tags"]
+            }
+            if len(self._tag_links) >= self.MAX_CRATES:
+                self._tag_links.clear()
+            self._tag_links[key] = links
+        return links
+
+    def other_versions(self, crate: dict, tag_name: str) -> Markup:
+        """Links to every tag of the crate but tag_name, newest first."""
+        indent = self.TAG_INDENT
+        return Markup("".join(
+            indent + (link if t_name != tag_name else "") + indent
+            for t_name, link in self._crate_links(crate).items()
+        ))
+
+    def command_rows(self, commands: list[Command]) -> Markup:
+        """The rows of a commands table."""
+        key = tuple((c.command, c.docker_image, c.docker_args) for c in commands)
+        table = self._tables.get(key)
+        if table is None:
+            if len(self._tables) >= self.MAX_TABLES:
+                self._tables.clear()
+            if len(self._rows) >= self.MAX_ROWS:
+                self._rows.clear()
+            rows = []
+            for cmd, row_key in zip(commands, key):
+                row = self._rows.get(row_key)
+                if row is None:
+                    row = self._rows[row_key] = str(self._module.command_row(cmd))
+                rows.append(row)
+            table = self._tables[key] = Markup("".join(rows))
+        return table
+
+
+class _BytecodeCache(FileSystemBytecodeCache):
+    """FileSystemBytecodeCache that counts hits and misses for the build log.
+
+    Jinja keys each entry by template name and checks it against a hash of
+    the template source, so an edited template is recompiled and re-cached.
+    """
+
+    def __init__(self, directory: Path):
+        directory.mkdir(parents=True, exist_ok=True)
+        super().__init__(str(directory))
+        self.hits = self.misses = 0
+
+    def load_bytecode(self, bucket):
+        super().load_bytecode(bucket)
+        if bucket.code is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+
+def _html_template_digests() -> dict[str, str]:
+    return {name: d for name, d in _template_digests().items() if name.endswith(".html")}
+
+
+def _compiled_templates_fresh() -> bool:
+    """True if --compile-templates output matches the current templates and Jinja."""
+    try:
+        info = json.loads(COMPILED_TEMPLATES_INFO.read_text())
+    except (FileNotFoundError, ValueError):
+        return False
+    return (COMPILED_TEMPLATES.exists()
+            and info.get("jinja") == jinja2.__version__
+            and info.get("templates") == _html_template_digests())
+
+
+def _make_env(precompiled: bool | None = None) -> Environment:
+    """Create the Jinja2 environment used for every page.
+
+    Templates come from the --compile-templates module when it is up to date
+    (or when `precompiled` says so), else from _templates/ through the
+    bytecode cache.
+    """
+    if precompiled is None:
+        precompiled = _compiled_templates_fresh()
+    if precompiled:
+        env = Environment(loader=ModuleLoader(str(COMPILED_TEMPLATES)), autoescape=True)
+    else:
+        env = Environment(
+            loader=FileSystemLoader(str(TEMPLATES)),
+            autoescape=True,
+            bytecode_cache=_BytecodeCache(JINJA_CACHE),
+        )
+    env.globals["fragments"] = FragmentCache(env)
+    return env
+
+
+def _load_templates(env: Environment) -> float:
+    """Load every page template into env; returns the seconds it took."""
+    start = time.perf_counter()
+    for name in sorted(_html_template_digests()):
+        env.get_template(name)
+    return time.perf_counter() - start
+
+
+def compile_templates():
+    """Precompile _templates/*.html into COMPILED_TEMPLATES and compare load times."""
+    shutil.rmtree(COMPILED_TEMPLATES, ignore_errors=True)
+    COMPILED_TEMPLATES.parent.mkdir(parents=True, exist_ok=True)
+    source_env = Environment(loader=FileSystemLoader(str(TEMPLATES)), autoescape=True)
+    source_env.compile_templates(str(COMPILED_TEMPLATES), zip=None,
+                                 filter_func=lambda name: name.endswith(".html"),
+                                 ignore_errors=False)
+    # Byte-compile now, so loading never has to (PYTHONDONTWRITEBYTECODE or not)
+    compileall.compile_dir(str(COMPILED_TEMPLATES), quiet=1)
+    digests = _html_template_digests()
+    COMPILED_TEMPLATES_INFO.write_text(json.dumps(
+        {"jinja": jinja2.__version__, "templates": digests}, indent=2) + "\n")
+    print(f"  Compiled {len(digests)} templates into {COMPILED_TEMPLATES.relative_to(ROOT)}")
+
+    # Each strategy loads every template into a fresh environment, as a
+    # build (or each --jobs worker) does at start-up
+    from_source = _load_templates(
+        Environment(loader=FileSystemLoader(str(TEMPLATES)), autoescape=True))
+    _load_templates(_make_env(precompiled=False))  # make sure the bytecode cache is warm
+    from_bytecode = _load_templates(_make_env(precompiled=False))
+    from_module = _load_templates(_make_env(precompiled=True))
+    print("  Template load time, all templates:")
+    print(f"    parse and compile from source  {from_source * 1000:8.1f} ms")
+    print(f"    bytecode cache                 {from_bytecode * 1000:8.1f} ms")
+    print(f"    precompiled module             {from_module * 1000:8.1f} ms")
+
+
+def _render_crate_page(env: Environment, namespaces: dict, spec: tuple):
+    """Render and write one crate page (tag None) or per-version page."""
+    ns_name, crate_name, tag_name = spec
+    crate_data = namespaces[ns_name]["crates"][crate_name]
+    start = time.perf_counter()
+    if tag_name is None:
+        html = env.get_template("crate.html").render(crate=crate_data)
+        profiling.record_render("crate.html", time.perf_counter() - start)
+        _write_if_changed(DOCS / ns_name / f"{crate_name}.html", html)
+        return
+    html = env.get_template("crate_version.html").render(
+        crate=crate_data,
+        tag=crate_data["tags"][tag_name],
+        tag_name=tag_name,
+        is_latest=(tag_name == crate_data["latest_tag"]),
     )
-    env.filters["semver_sort"] = _semver_sort_tags
+    profiling.record_render("crate_version.html", time.perf_counter() - start)
+    _write_if_changed(DOCS / ns_name / crate_name / f"{tag_name}.html", html)
+
+
+# Per-process state for parallel rendering: each worker builds its own
+# Environment once and receives the site data once, at pool start-up.
+_worker_state: dict = {}
+
+
+def _init_render_worker(namespaces: dict, minify: bool, profile: bool):
+    global _minify
+    _minify = minify
+    if profile:
+        profiling.enable("render worker")
+    else:
+        profiling.disable()
+    _worker_state["env"] = _make_env()
+    _worker_state["namespaces"] = namespaces
+
+
+def _render_chunk(specs: list[tuple]) -> dict | None:
+    """Render a chunk; returns what the worker's profile recorded for it, if any."""
+    env = _worker_state["env"]
+    profile = profiling.active()
+    if profile is not None:
+        profile = profiling.enable(profile.tool)
+    for spec in specs:
+        _render_crate_page(env, _worker_state["namespaces"], spec)
+    return profile.to_dict() if profile is not None else None
+
+
+def _render_parallel(namespaces: dict, specs: list[tuple], jobs: int):
+    """Render crate/version pages across `jobs` worker processes.
+
+    The work list is split into contiguous chunks (several per worker, so one
+    crate with many tags does not leave the other workers idle).
+    """
+    n_chunks = min(len(specs), jobs * 4)
+    size = -(-len(specs) // n_chunks)
+    chunks = [specs[i:i + size] for i in range(0, len(specs), size)]
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_render_worker,
+        initargs=(namespaces, _minify, profiling.active() is not None),
+    ) as pool:
+        for recorded in pool.map(_render_chunk, chunks):
+            if recorded and profiling.active():
+                profiling.active().merge(recorded)
+
+
+def render_site(namespaces: dict, manifests: list[ManifestRecord], channels: list[dict],
+                cache: BuildCache | None = None, jobs: int = 1,
+                commands: dict | None = None):
+    """Render all HTML pages using Jinja2 templates.
+
+    With a build cache (incremental mode), a page is only rendered when the
+    hash of its inputs differs from the one recorded for its last build.
+    With jobs > 1, crate and version pages are rendered by a process pool.
+    Render time is recorded as two phases on the active profile, if any.
+    Returns the number of pages rendered.
+    """
+    precompiled = _compiled_templates_fresh()
+    with profiling.phase("load templates"):
+        env = _make_env(precompiled)
+        seconds = _load_templates(env)
+    if precompiled:
+        source = "precompiled module"
+    else:
+        bcc = env.bytecode_cache
+        source = f"bytecode cache: {bcc.hits} cached, {bcc.misses} compiled"
+    print(f"  Loaded templates in {seconds * 1000:.1f} ms ({source})")
 
     # Compute stats
     total_crates = sum(len(ns["crates"]) for ns in namespaces.values())
@@ -241,125 +1032,581 @@ def render_site(namespaces: dict, manifests: list[dict], channels: list[dict]):
         "total_manifests": total_manifests,
     }
 
+    templates = _template_digests()
+    rendered = skipped = 0
+
+    def page_key(template: str, inputs) -> str:
+        return inputs_key(templates[template], templates["base.html"],
+                          templates["fragments.html"], inputs)
+
+    def emit(rel: str, template: str, inputs, render) -> bool:
+        """Render docs/<rel> via render() unless its inputs are unchanged."""
+        nonlocal rendered, skipped
+        dest = DOCS / rel
+        _outputs.add(dest)
+        key = page_key(template, inputs)
+        if cache and cache.is_fresh(rel, key, dest):
+            skipped += 1
+            return False
+        start = time.perf_counter()
+        html = render()
+        profiling.record_render(template, time.perf_counter() - start)
+        _write_if_changed(dest, html)
+        if cache:
+            cache.record_output(rel, key, dest)
+        rendered += 1
+        return True
+
+    def crate_inputs(crate_data: dict) -> list:
+        # used_by and image_count depend on other crates' manifests too
+        return sorted((t, m["path"], m["digest"], m.get("used_by"), m.get("image_count"))
+                      for t, m in crate_data["tags"].items())
+
     # Ensure docs/ exists
     DOCS.mkdir(exist_ok=True)
 
     # Copy style.css and favicon
     css_src = TEMPLATES / "style.css"
     if css_src.exists():
-        shutil.copy2(css_src, DOCS / "style.css")
+        _copy_if_changed(css_src, DOCS / "style.css")
     favicon_src = TEMPLATES / "favicon.svg"
     if favicon_src.exists():
-        shutil.copy2(favicon_src, DOCS / "favicon.svg")
+        _copy_if_changed(favicon_src, DOCS / "favicon.svg")
 
-    # Render homepage
-    tmpl = env.get_template("home.html")
-    html = tmpl.render(namespaces=namespaces, stats=stats)
-    (DOCS / "index.html").write_text(html)
-    print(f"  Wrote docs/index.html")
+    with profiling.phase("render: index pages"):
+        # Render homepage. Only its footer shows the site totals; on every
+        # other page they would make adding a manifest re-render the whole site
+        all_inputs = sorted((m["path"], m["digest"]) for m in manifests)
+        if emit("index.html", "home.html", all_inputs,
+                lambda: env.get_template("home.html").render(namespaces=namespaces, stats=stats)):
+            print(f"  Wrote docs/index.html")
 
-    # Render namespace pages
-    ns_tmpl = env.get_template("namespace.html")
-    for ns_name, ns_data in sorted(namespaces.items()):
-        ns_dir = DOCS / ns_name
-        ns_dir.mkdir(exist_ok=True)
-        html = ns_tmpl.render(namespace=ns_data, stats=stats)
-        (ns_dir / "index.html").write_text(html)
-        print(f"  Wrote docs/{ns_name}/index.html")
-
-    # Render crate pages and version pages
-    crate_tmpl = env.get_template("crate.html")
-    version_tmpl = env.get_template("crate_version.html")
-    for ns_name, ns_data in sorted(namespaces.items()):
-        ns_dir = DOCS / ns_name
-        for crate_name, crate_data in sorted(ns_data["crates"].items()):
-            html = crate_tmpl.render(crate=crate_data, stats=stats)
-            (ns_dir / f"{crate_name}.html").write_text(html)
-            print(f"  Wrote docs/{ns_name}/{crate_name}.html")
-            # Per-version pages
-            crate_ver_dir = ns_dir / crate_name
-            crate_ver_dir.mkdir(exist_ok=True)
-            for tag_name, tag_data in crate_data["tags"].items():
-                html = version_tmpl.render(
-                    crate=crate_data,
-                    tag=tag_data,
-                    tag_name=tag_name,
-                    is_latest=(tag_name == crate_data["latest_tag"]),
-                    stats=stats,
-                )
-                (crate_ver_dir / f"{tag_name}.html").write_text(html)
-            print(f"    + {len(crate_data['tags'])} version pages")
+        # Render namespace pages
+        for ns_name, ns_data in sorted(namespaces.items()):
+            ns_dir = DOCS / ns_name
+            ns_dir.mkdir(exist_ok=True)
+            ns_inputs = [crate_inputs(c) for _, c in sorted(ns_data["crates"].items())]
+            if emit(f"{ns_name}/index.html", "namespace.html", ns_inputs,
+                    lambda: env.get_template("namespace.html").render(namespace=ns_data)):
+                print(f"  Wrote docs/{ns_name}/index.html")
+
+        # Render command browser
+        commands = commands if commands is not None else build_command_index(namespaces)
+        if emit("commands.html", "commands.html", all_inputs,
+                lambda: env.get_template("commands.html").render(commands=commands)):
+            print(f"  Wrote docs/commands.html")
+
+        # Render channels page
+        if emit("channels.html", "channels.html", channels,
+                lambda: env.get_template("channels.html").render(channels=channels)):
+            print(f"  Wrote docs/channels.html")
+
+    with profiling.phase("render: crate pages"):
+        # Render crate pages and version pages crate by crate: find which of a
+        # crate's pages are stale, then render them before moving on. With
+        # jobs > 1 the stale pages are collected instead and split across jobs.
+        stale = []  # (rel, key, (ns, crate, tag-or-None))
+        for ns_name, ns_data in sorted(namespaces.items()):
+            for crate_name, crate_data in sorted(ns_data["crates"].items()):
+                inputs = crate_inputs(crate_data)
+                pages = [(f"{ns_name}/{crate_name}.html",
+                          page_key("crate.html", inputs),
+                          (ns_name, crate_name, None))]
+                (DOCS / ns_name / crate_name).mkdir(exist_ok=True)
+                for tag_name in crate_data["tags"]:
+                    pages.append((f"{ns_name}/{crate_name}/{tag_name}.html",
+                                  page_key("crate_version.html", [tag_name, inputs]),
+                                  (ns_name, crate_name, tag_name)))
+                # Worker processes write their pages into their own _outputs
+                _outputs.update(DOCS / rel for rel, _, _ in pages)
+                crate_stale = [p for p in pages
+                               if not (cache and cache.is_fresh(p[0], p[1], DOCS / p[0]))]
+                skipped += len(pages) - len(crate_stale)
+                stale += crate_stale
+                if jobs > 1:
+                    continue
+                for rel, key, spec in crate_stale:
+                    _render_crate_page(env, namespaces, spec)
+                    if cache:
+                        cache.record_output(rel, key, DOCS / rel)
+        rendered += len(stale)
+
+        if jobs > 1:
+            specs = [spec for _, _, spec in stale]
+            if len(specs) > 1:
+                _render_parallel(namespaces, specs, jobs)
+            else:
+                for spec in specs:
+                    _render_crate_page(env, namespaces, spec)
+            if cache:
+                for rel, key, _ in stale:
+                    cache.record_output(rel, key, DOCS / rel)
+
+        version_counts: dict[tuple, int] = {}
+        for _, _, (ns_name, crate_name, tag_name) in stale:
+            if tag_name is None:
+                print(f"  Wrote docs/{ns_name}/{crate_name}.html")
+            else:
+                version_counts[(ns_name, crate_name)] = version_counts.get((ns_name, crate_name), 0) + 1
+        for (ns_name, crate_name), count in sorted(version_counts.items()):
+            print(f"    + {count} version pages for {ns_name}/{crate_name}")
+
+    print(f"  Rendered {rendered} pages, {skipped} unchanged"
+          + (f" ({jobs} jobs)" if jobs > 1 else ""))
+
+    # Copy channels.yaml to docs/
+    channels_src = ROOT / "channels.yaml"
+    if channels_src.exists():
+        _copy_if_changed(channels_src, DOCS / "channels.yaml")
+
+    # Copy CNAME into docs/
+    cname_src = ROOT / "CNAME"
+    if cname_src.exists():
+        _copy_if_changed(cname_src, DOCS / "CNAME")
+        print(f"  Copied CNAME to docs/")
+    return rendered
+
+
+def _link_or_copy(src: Path, dest: Path) -> bool:
+    """Replace dest with a hardlink to src, or a copy if linking fails.
+
+    The new file is staged under a temporary name and renamed over dest, so
+    an existing dest is never written through (it may itself be a link to a
+    source manifest). Returns True if linked.
+    """
+    tmp = dest.with_name(f".{dest.name}.tmp")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(src, tmp)
+        linked = True
+    except OSError:  # cross-device, or a filesystem without hardlinks
+        shutil.copy2(src, tmp)
+        linked = False
+    os.replace(tmp, dest)
+    profiling.record_write(0 if linked else dest.stat().st_size)
+    return linked
 
-    # Render channels page
-    channels_tmpl = env.get_template("channels.html")
-    html = channels_tmpl.render(channels=channels, stats=stats)
-    (DOCS / "channels.html").write_text(html)
-    print(f"  Wrote docs/channels.html")
 
-    # Copy YAML manifest files into docs/ so CLI URLs work when serving from docs/
-    # Skip symlinks in source; generate latest symlinks automatically
+def _publish_manifest(src: Path, dest: Path, digest: str | None,
+                      cache: BuildCache | None) -> str:
+    """Publish one manifest into docs/; returns "unchanged", "linked" or "copied".
+
+    A destination that is already src's inode, matches the build cache's
+    size+mtime record, or holds identical bytes is left alone, keeping its
+    mtime and inode for downstream sync.
+    """
+    rel = str(dest.relative_to(DOCS))
+    _outputs.add(dest)
+    try:
+        dest_stat = dest.stat()
+    except FileNotFoundError:
+        dest_stat = None
+    if dest_stat is not None:
+        src_stat = src.stat()
+        unchanged = (
+            (dest_stat.st_ino, dest_stat.st_dev) == (src_stat.st_ino, src_stat.st_dev)
+            or (cache is not None and digest is not None and cache.is_fresh(rel, digest, dest))
+            or (dest_stat.st_size == src_stat.st_size and dest.read_bytes() == src.read_bytes())
+        )
+        if unchanged:
+            if cache and digest:
+                cache.record_output(rel, digest, dest)
+            return "unchanged"
+    linked = _link_or_copy(src, dest)
+    if cache and digest:
+        cache.record_output(rel, digest, dest)
+    return "linked" if linked else "copied"
+
+
+def publish_manifests(namespaces: dict, manifests: list[ManifestRecord],
+                      cache: BuildCache | None = None) -> set[Path]:
+    """Publish manifest YAMLs into docs/<ns>/ so CLI URLs work when serving docs/.
+
+    Every non-symlink manifest is published under its own name, and each
+    crate's latest tag again as <crate>.yaml (the latest pointer). Files are
+    hardlinked where possible, so an in-place edit of a source manifest shows
+    through in docs/ until the next build. Returns the published paths.
+    """
+    digests = {m["path"]: m["digest"] for m in manifests}
+    counts = {"unchanged": 0, "linked": 0, "copied": 0}
+    published: set[Path] = set()
     for entry in sorted(ROOT.iterdir()):
         if not entry.is_dir() or entry.name in SKIP_DIRS or entry.name.startswith("."):
             continue
         ns_name = entry.name
         dest_dir = DOCS / ns_name
-        dest_dir.mkdir(exist_ok=True)
+        targets: dict[Path, tuple[Path, str | None]] = {}
         for yaml_file in sorted(entry.glob("*.yaml")):
             if yaml_file.is_symlink():
                 continue
-            shutil.copy2(yaml_file, dest_dir / yaml_file.name)
-        # Write latest pointer: copy highest-version file as crate_name.yaml
+            targets[dest_dir / yaml_file.name] = (yaml_file,
+                                                  digests.get(f"{ns_name}/{yaml_file.name}"))
+        # Latest pointer: the highest-version file again as <crate>.yaml
+        # (taking precedence over a bare-name file of the same name)
         if ns_name in namespaces:
             for crate_name, crate_data in namespaces[ns_name]["crates"].items():
-                latest_tag = crate_data["latest_tag"]
-                latest_manifest = crate_data["tags"][latest_tag]
-                src = ROOT / latest_manifest["path"]
-                dest = dest_dir / f"{crate_name}.yaml"
-                shutil.copy2(src, dest)
-    print(f"  Copied manifest YAML files to docs/ (with auto-generated latest pointers)")
+                latest = crate_data["tags"][crate_data["latest_tag"]]
+                targets[dest_dir / f"{crate_name}.yaml"] = (ROOT / latest["path"],
+                                                            latest["digest"])
+        # A directory without manifests (tooling, a new namespace not yet
+        # populated) gets no docs/ counterpart
+        if targets:
+            dest_dir.mkdir(exist_ok=True)
+        for dest, (src, digest) in targets.items():
+            counts[_publish_manifest(src, dest, digest, cache)] += 1
+            published.add(dest)
+    print(f"  Published {len(published)} manifest YAML files: {counts['linked']} linked, "
+          f"{counts['copied']} copied, {counts['unchanged']} unchanged")
+    return published
 
-    # Copy channels.yaml to docs/
-    channels_src = ROOT / "channels.yaml"
-    if channels_src.exists():
-        shutil.copy2(channels_src, DOCS / "channels.yaml")
 
-    # Copy CNAME into docs/
-    cname_src = ROOT / "CNAME"
-    if cname_src.exists():
-        shutil.copy2(cname_src, DOCS / "CNAME")
-        print(f"  Copied CNAME to docs/")
+def prune_published(docs: Path, keep: set[Path]) -> int:
+    """Remove YAMLs in docs/<ns>/ and docs/resolved/<ns>/ this build did not write.
 
+    These are copies of deleted manifests (or pointers of deleted crates);
+    their precompressed siblings go with them. Returns the number removed.
+    """
+    removed = 0
+    resolved = docs / "resolved"
+    ns_dirs = [p for p in docs.iterdir() if p.is_dir()]
+    if resolved.is_dir():
+        ns_dirs += [p for p in resolved.iterdir() if p.is_dir()]
+    for ns_dir in sorted(ns_dirs):
+        for path in sorted(ns_dir.glob("*.yaml")):
+            if path in keep:
+                continue
+            for stale in (path, path.with_name(path.name + ".gz"),
+                          path.with_name(path.name + ".br")):
+                stale.unlink(missing_ok=True)
+            print(f"  Removed orphaned docs/{path.relative_to(docs)}")
+            removed += 1
+    return removed
 
-def main():
-    print("Building hub.bulker.io static site...")
-    print()
+
+def prune_outputs(docs: Path, cache: BuildCache) -> int:
+    """Remove files the previous build wrote that this build did not.
+
+    The build cache's owned list is what the previous build produced; the
+    difference is what a deleted crate, tag or command left behind (pages,
+    image lists, changelogs, search shards). Precompressed siblings go too,
+    as do directories left empty. The owned list is then replaced by this
+    build's outputs. Returns the number of files removed.
+    """
+    current = {str(path.relative_to(docs)) for path in _outputs if path.is_relative_to(docs)}
+    removed = 0
+    for rel in sorted(cache.owned - current):
+        path = docs / rel
+        if not path.is_file():
+            continue
+        for stale in (path, path.with_name(path.name + ".gz"),
+                      path.with_name(path.name + ".br")):
+            stale.unlink(missing_ok=True)
+        print(f"  Removed stale docs/{rel}")
+        removed += 1
+        parent = path.parent
+        while parent != docs and not any(parent.iterdir()):
+            parent.rmdir()
+            parent = parent.parent
+    cache.owned = current
+    return removed
+
+
+def build(args: argparse.Namespace, cache: BuildCache,
+          previous: list[LoadedManifest] | None = None) -> tuple[list[LoadedManifest], int]:
+    """Build docs/ once; returns the loaded manifests and the pages rendered.
+
+    `previous` is the last build's load in this process (--watch), so files
+    unchanged since are not parsed again. Raises BuildError, before anything
+    is written, when validation or import resolution fails.
+    """
+    with profiling.phase("load"):
+        loaded = load_manifests(ROOT, previous=previous)
+    _outputs.clear()
+
+    if args.validate or args.check_tags:
+        from validate_manifests import validate
+
+        with profiling.phase("validate"):
+            errors = validate(loaded, check_tags=args.check_tags)
+        print()
+        if errors:
+            raise BuildError("Validation failed; not building.")
 
     print("Discovering manifests...")
-    manifests = discover_manifests(ROOT)
+    with profiling.phase("discover"):
+        manifests = discover_manifests(ROOT, cache, loaded)
     print(f"  Found {len(manifests)} manifests")
     print()
 
     print("Building data structure...")
-    namespaces = build_data_structure(manifests)
+    with profiling.phase("build data structure"):
+        namespaces = build_data_structure(manifests)
     print(f"  {len(namespaces)} namespaces")
     print()
 
+    print("Resolving imports...")
+    with profiling.phase("resolve imports"):
+        graph = ImportGraph(loaded)
+        flattened, errors = resolve_imports(graph)
+        attach_reverse_deps(namespaces, graph)
+        attach_images(namespaces, flattened)
+        attach_changes(namespaces)
+    for error in errors:
+        print(f"  ERROR: {error}", file=sys.stderr)
+    if errors:
+        raise BuildError("Import resolution failed; not building.")
+    print(f"  {len(flattened)} import closures")
+    print()
+
     print("Writing index files...")
-    DOCS.mkdir(exist_ok=True)
-    write_index_yaml(manifests, DOCS / "index.yaml")
-    write_index_json(manifests, DOCS / "index.json")
+    with profiling.phase("write indexes"):
+        DOCS.mkdir(exist_ok=True)
+        write_index_yaml(manifests, DOCS / "index.yaml")
+        write_index_json(manifests, DOCS / "index.json")
+        write_search_index(namespaces, DOCS / "search")
+        commands = build_command_index(namespaces)
+        write_command_index(commands, DOCS / "commands.json", DOCS / "commands")
+        resolved = write_resolved_manifests(flattened, namespaces, DOCS)
+        write_reverse_deps(build_reverse_deps(graph), DOCS / "reverse_deps.json")
+        write_image_lists(namespaces, DOCS / "images")
+        write_changelogs(namespaces, DOCS / "changes")
+    # The graph and closures hold every manifest's imports flattened out, and
+    # nothing from here on needs them. Nor does rendering need the parsed
+    # manifests, which --watch keeps for its next rebuild.
+    del graph, flattened
+    if not (args.watch or args.serve):
+        for m in loaded:
+            m.release()
     print()
 
     print("Loading channels...")
-    channels = load_channels(ROOT)
+    with profiling.phase("load channels"):
+        channels = load_channels(ROOT)
     print(f"  {len(channels)} channels")
     print()
 
+    print("Federating channel indexes...")
+    with profiling.phase("federate channels"):
+        federate_channels(channels, namespaces, DOCS / "search" / "federated.json",
+                          fetch=args.fetch_channels, timeout=args.channel_timeout)
+    print()
+
     print("Rendering HTML pages...")
-    render_site(namespaces, manifests, channels)
+    rendered = render_site(namespaces, manifests, channels, cache, jobs=max(1, args.jobs),
+                           commands=commands)
     print()
 
-    print("Done.")
+    print("Publishing manifests...")
+    with profiling.phase("publish manifests"):
+        published = publish_manifests(namespaces, manifests, cache)
+        prune_published(DOCS, published | resolved)
+        prune_outputs(DOCS, cache)
+    print()
+
+    if args.optimize_assets:
+        print("Optimizing assets...")
+        with profiling.phase("optimize assets"):
+            written = asset_pipeline.precompress(DOCS)
+            # A tagged manifest file is never edited once published; a new
+            # version is a new file. Bare-name files and latest pointers move.
+            immutable = {m["path"]: m["name"] for m in manifests if m["tag"] != "default"}
+            rules, uncovered = asset_pipeline.write_headers(DOCS, immutable)
+        print(f"  Wrote {written} precompressed files; {rules} cache rules in docs/_headers")
+        if uncovered:
+            print(f"  WARNING: {uncovered} versioned manifests did not fit in "
+                  f"{asset_pipeline.MAX_HEADER_RULES} _headers rules; they keep default caching",
+                  file=sys.stderr)
+        print()
+    return loaded, rendered
+
+
+def watched_paths() -> tuple[list[Path], list[Path]]:
+    """(directories, files) --watch follows: namespaces, _templates/, channels.yaml, CNAME."""
+    dirs = [
+        entry for entry in sorted(ROOT.iterdir())
+        if entry.is_dir() and entry.name not in SKIP_DIRS and not entry.name.startswith(".")
+    ]
+    return dirs + [TEMPLATES], [ROOT / "channels.yaml", ROOT / "CNAME"]
+
+
+def watch(args: argparse.Namespace, cache: BuildCache, loaded: list[LoadedManifest] | None):
+    """Rebuild after every change until interrupted; with --serve, also serve docs/.
+
+    Rebuilds run in this process and reuse the build cache, parsed manifests
+    and YAML dumps of the build before, so an edit costs only the pages and
+    files it affects: a manifest its crate, version, namespace and index
+    pages; a template the pages rendered from it. Their progress output is
+    suppressed; warnings and errors still go to stderr.
+    """
+    profiling.disable()
+    server = None
+    if args.serve:
+        server = dev_server.serve(DOCS, port=args.port)
+        print(f"Serving docs/ at {server.url} with live reload")
+    # The first build fetched the channels; rebuilds take them from the channel
+    # cache instead of going to the network on every save
+    args.fetch_channels = False
+    watcher = dev_server.make_watcher(watched_paths)
+    print(f"Watching for changes ({watcher.name}); Ctrl-C to stop.")
+    try:
+        while True:
+            changed = watcher.wait()
+            names = ", ".join(sorted(str(p.relative_to(ROOT)) for p in changed))
+            start = time.perf_counter()
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    loaded, rendered = build(args, cache, loaded)
+            except BuildError as e:
+                print(f"{names}: {e}", file=sys.stderr)
+                continue
+            except Exception:  # a half-saved file must not end the session
+                traceback.print_exc()
+                continue
+            cache.save()
+            print(f"{names}: rebuilt in {(time.perf_counter() - start) * 1000:.0f} ms, "
+                  f"{rendered} pages rendered")
+            if server:
+                server.notify()
+    except KeyboardInterrupt:
+        print()
+    finally:
+        watcher.close()
+        if server:
+            server.close()
+
+
+def _generator_digest() -> str:
+    """Hash of build_site.py and every module of this repo it has imported.
+
+    Any of them (manifest_diff.py's changelogs, versioning.py's tag order,
+    manifest_record.py's fields) can change outputs without any input
+    changing, so all of them are part of the build cache's generator.
+    """
+    sources = sorted({
+        Path(module.__file__).resolve()
+        for module in list(sys.modules.values())
+        if getattr(module, "__file__", None)
+        and Path(module.__file__).resolve().parent == ROOT
+    })
+    return inputs_key([(path.name, file_digest(path)) for path in sources])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build the hub.bulker.io static site.")
+    ap.add_argument(
+        "--incremental",
+        action="store_true",
+        help="reuse the build cache and re-render only pages whose inputs changed",
+    )
+    ap.add_argument(
+        "--jobs", "-j",
+        type=int,
+        default=1,
+        metavar="N",
+        help="render crate and version pages with N worker processes (default: 1)",
+    )
+    ap.add_argument(
+        "--validate",
+        action="store_true",
+        help="run validate_manifests.py's structural checks first, on the same parsed files",
+    )
+    ap.add_argument(
+        "--check-tags",
+        action="store_true",
+        help="like --validate, and also verify image tags on their registries",
+    )
+    ap.add_argument(
+        "--fetch-channels",
+        action="store_true",
+        help="refresh remote channel indexes for the federated search (default: use the cache)",
+    )
+    ap.add_argument(
+        "--channel-timeout",
+        type=float,
+        default=10.0,
+        metavar="SECONDS",
+        help="give up on a channel after SECONDS and use its cached index (default: 10)",
+    )
+    ap.add_argument(
+        "--optimize-assets",
+        action="store_true",
+        help="minify HTML/JSON, write .gz/.br siblings and a Cloudflare _headers file",
+    )
+    ap.add_argument(
+        "--profile",
+        action="store_true",
+        help="print CPU time, template renders, bytes written and parse times at the end",
+    )
+    ap.add_argument(
+        "--timings-json",
+        type=Path,
+        metavar="PATH",
+        help="write the build profile (phases, templates, writes, parses) as JSON to PATH",
+    )
+    ap.add_argument(
+        "--compile-templates",
+        action="store_true",
+        help="precompile the templates into .build_cache/templates/, compare load times, and exit",
+    )
+    ap.add_argument(
+        "--watch",
+        action="store_true",
+        help="after building, rebuild whenever a manifest, template or channels.yaml changes",
+    )
+    ap.add_argument(
+        "--serve",
+        action="store_true",
+        help="like --watch, and serve docs/ on localhost, reloading open pages after each rebuild",
+    )
+    ap.add_argument(
+        "--port",
+        type=int,
+        default=8000,
+        help="port for --serve (default: 8000)",
+    )
+    args = ap.parse_args()
+    if args.compile_templates:
+        print("Compiling templates...")
+        compile_templates()
+        return
+    global _minify, _keep_serialised
+    _minify = args.optimize_assets
+    _keep_serialised = args.watch or args.serve
+    profile = profiling.enable("build_site")
+
+    print("Building hub.bulker.io static site...")
+    print()
+
+    # The cache is always refreshed so a later --incremental run can use it;
+    # it is only trusted to skip work when --incremental is given (its list of
+    # owned outputs is always read, so a full rebuild still prunes).
+    # Minified and plain builds produce different bytes from the same inputs
+    generator = _generator_digest() + (":minified" if _minify else "")
+    cache = BuildCache.load(BUILD_CACHE, generator, reuse=args.incremental)
+
+    watching = args.watch or args.serve
+    try:
+        loaded, _ = build(args, cache)
+    except BuildError as e:
+        print(e, file=sys.stderr)
+        if not watching:
+            sys.exit(1)
+        loaded = None  # keep watching; the next edit may fix it
+    else:
+        cache.save()
+        profile.finish()
+        if args.profile:
+            profile.print_report()
+        else:
+            profile.print_phases()
+        if args.timings_json:
+            profile.write_json(args.timings_json)
+            print(f"Wrote profile to {args.timings_json}")
+        print()
+        print("Done.")
+
+    if watching:
+        watch(args, cache, loaded)
 
 
 if __name__ == "__main__":
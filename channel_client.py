@@ -0,0 +1,279 @@
+"""Fetch the indexes of remote bulker channels for build_site.py's federated search.
+
+Every channel in channels.yaml is a registry site built like this one, with a
+machine-readable listing at <url>/index.json (or index.yaml, for channels that
+only publish that). Fetching them is:
+
+- conditional: the ETag and Last-Modified of the last good response go back
+  as If-None-Match / If-Modified-Since, so an unchanged channel costs a 304
+  with no body;
+- concurrent, with a deadline per channel covering connect, headers and
+  body (and the index.yaml fallback), so a slow or unreachable channel --
+  even one that keeps trickling bytes -- delays the build by at most about
+  that long;
+- cached in .build_cache/channels.json: each channel's last good index is
+  kept, and used whenever a fetch fails, times out or returns something that
+  is not an index -- and by builds that do not fetch at all.
+
+Only each channel's own crates are read; a channel's federated index (what it
+learned from its channels) is never followed.
+
+Channel URLs may point at a local stand-in server, channel_stub.py, to
+exercise all of this (including failing and slow channels) without network
+access.
+"""
+
+import asyncio
+import json
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+import yaml
+
+import profiling
+
+CACHE_VERSION = 1
+
+# Looked for in order (after the one the cached index came from); index.yaml
+# serves channels that do not publish index.json
+INDEX_FILES = ("index.json", "index.yaml")
+
+USER_AGENT = "hub.bulker.io-build (channel federation)"
+
+# Bodies are read in chunks of at most this many bytes, checking the deadline
+# between them
+READ_CHUNK = 64 * 1024
+
+
+class ChannelError(Exception):
+    """A channel's index could not be fetched or is not a bulker index."""
+
+
+def compact_manifests(data) -> list[dict]:
+    """The search-relevant part of a parsed index.json/index.yaml document.
+
+    Entries without a namespace, name and tag are dropped; a document that
+    is not a {"manifests": [...]} mapping raises ChannelError.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("manifests"), list):
+        raise ChannelError("not a bulker index (no manifests list)")
+    entries = []
+    for entry in data["manifests"]:
+        if not isinstance(entry, dict):
+            continue
+        if not all(isinstance(entry.get(key), str) and entry[key]
+                   for key in ("namespace", "name", "tag")):
+            continue
+        commands = entry.get("commands")
+        compact = {
+            "namespace": entry["namespace"],
+            "name": entry["name"],
+            "tag": entry["tag"],
+            "version": str(entry.get("version") or ""),
+            "description": str(entry.get("description") or ""),
+            "commands": [str(c) for c in commands if c] if isinstance(commands, list) else [],
+        }
+        entries.append(compact)
+    return entries
+
+
+def _parse(body: bytes, source: str):
+    try:
+        if source.endswith(".json"):
+            return json.loads(body)
+        return yaml.safe_load(body)
+    except (ValueError, yaml.YAMLError) as e:
+        raise ChannelError(f"unparseable {source}: {e}") from None
+
+
+class ChannelCache:
+    """Last good index per channel.
+
+    {"version": 1, "channels": {name: {"url", "source", "etag", "last_modified",
+    "fetched": epoch of the last 200, "checked": epoch of the last 200 or 304,
+    "manifests": [entry, ...]}}}
+    """
+
+    def __init__(self, path: Path | None):
+        self.path = path
+        self.channels: dict[str, dict] = {}
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: Path | None) -> "ChannelCache":
+        cache = cls(path)
+        if path is None or not path.exists():
+            return cache
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError) as e:
+            print(f"  WARNING: ignoring unreadable channel cache {path}: {e}", file=sys.stderr)
+            return cache
+        if data.get("version") == CACHE_VERSION:
+            cache.channels = data.get("channels") or {}
+        return cache
+
+    def get(self, name: str, url: str) -> dict | None:
+        """The cached index of channel `name`, unless it was fetched from another URL."""
+        entry = self.channels.get(name)
+        if not entry or entry.get("url") != url:
+            return None
+        return entry
+
+    def put(self, name: str, entry: dict):
+        self.channels[name] = entry
+        self.dirty = True
+
+    def save(self):
+        if self.path is None or not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": CACHE_VERSION, "channels": self.channels},
+                                  indent=1, sort_keys=True))
+        tmp.replace(self.path)
+
+
+def _remaining(deadline: float, timeout: float) -> float:
+    """Seconds left before `deadline` (a time.monotonic() value), or ChannelError."""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise ChannelError(f"timed out after {timeout:g}s")
+    return remaining
+
+
+def _read_body(response, deadline: float, timeout: float) -> bytes:
+    """The whole body, unless the deadline passes first (ChannelError).
+
+    The socket timeout only bounds each read, so a server sending a byte now
+    and then would otherwise hold the fetch open indefinitely.
+    """
+    chunks = []
+    while True:
+        _remaining(deadline, timeout)
+        chunk = response.read1(READ_CHUNK)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+
+
+def _get(url: str, headers: dict[str, str], deadline: float,
+         timeout: float) -> tuple[int, dict, bytes]:
+    """One GET: (status, lower-cased headers, body), or ChannelError if no response.
+
+    `deadline` is the time.monotonic() by which the whole fetch must be done;
+    `timeout` is only for the error message.
+    """
+    request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT, **headers})
+    host = urllib.parse.urlsplit(url).netloc
+    start = time.perf_counter()
+    status = None
+    try:
+        try:
+            with urllib.request.urlopen(request, timeout=_remaining(deadline, timeout)) as response:
+                status = response.status
+                return (status, {k.lower(): v for k, v in response.headers.items()},
+                        _read_body(response, deadline, timeout))
+        except urllib.error.HTTPError as e:  # includes 304 Not Modified
+            status = e.code
+            return status, {k.lower(): v for k, v in e.headers.items()}, b""
+        except TimeoutError:
+            raise ChannelError(f"timed out after {timeout:g}s") from None
+        except (urllib.error.URLError, OSError) as e:
+            reason = getattr(e, "reason", e)
+            if isinstance(reason, TimeoutError):
+                raise ChannelError(f"timed out after {timeout:g}s") from None
+            raise ChannelError(f"network error: {reason}") from None
+    finally:
+        profiling.record_http(host, status, time.perf_counter() - start)
+
+
+def fetch_channel(url: str, cached: dict | None, timeout: float) -> tuple[str, dict]:
+    """Fetch one channel's index, conditionally against `cached`.
+
+    Returns ("fetched", new cache entry) or ("not modified", `cached` with
+    `checked` updated). Raises ChannelError, also when the whole fetch takes
+    longer than `timeout` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    base = url.rstrip("/")
+    # Start with the file the cached index came from, so a channel that only
+    # has index.yaml does not cost a 404 on every build
+    sources = sorted(INDEX_FILES, key=lambda source: source != (cached or {}).get("source"))
+    for source in sources:
+        headers = {}
+        if cached and cached.get("source") == source:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+        status, response_headers, body = _get(f"{base}/{source}", headers, deadline, timeout)
+        if status == 304 and headers:
+            return "not modified", {**cached, "checked": time.time()}
+        if status == 404:
+            continue
+        if status != 200:
+            raise ChannelError(f"HTTP {status} for {source}")
+        now = time.time()
+        return "fetched", {
+            "url": url,
+            "source": source,
+            "etag": response_headers.get("etag"),
+            "last_modified": response_headers.get("last-modified"),
+            "fetched": now,
+            "checked": now,
+            "manifests": compact_manifests(_parse(body, source)),
+        }
+    raise ChannelError(f"no {' or '.join(INDEX_FILES)} (HTTP 404)")
+
+
+def refresh(channels: list[dict], cache: ChannelCache, timeout: float = 10.0,
+            jobs: int = 8) -> dict[str, dict]:
+    """Fetch every channel concurrently, falling back to the cache on failure.
+
+    `channels` are channels.yaml entries (name, url). Returns {name: {"status":
+    "fetched" | "not modified" | "stale" | "unavailable", "error": str | None,
+    "entry": cache entry or None}}; "stale" means the fetch failed and the
+    last good index is used instead.
+    """
+    results: dict[str, dict] = {}
+    semaphore = asyncio.Semaphore(max(1, jobs))
+
+    async def one(name: str, url: str):
+        cached = cache.get(name, url)
+        async with semaphore:
+            try:
+                # fetch_channel keeps its own deadline; wait_for is a backstop
+                # (it cannot stop the thread, and asyncio.run joins it anyway)
+                status, entry = await asyncio.wait_for(
+                    asyncio.to_thread(fetch_channel, url, cached, timeout), timeout + 1)
+            except ChannelError as e:
+                error = str(e)
+            except asyncio.TimeoutError:
+                error = f"timed out after {timeout:g}s"
+            else:
+                cache.put(name, entry)
+                results[name] = {"status": status, "error": None, "entry": entry}
+                return
+        results[name] = {"status": "stale" if cached else "unavailable",
+                         "error": error, "entry": cached}
+
+    async def main():
+        await asyncio.gather(*(one(ch["name"], ch["url"]) for ch in channels))
+
+    asyncio.run(main())
+    return results
+
+
+def cached_only(channels: list[dict], cache: ChannelCache) -> dict[str, dict]:
+    """refresh()'s result shape from the cache alone, for builds that do not fetch."""
+    results = {}
+    for ch in channels:
+        entry = cache.get(ch["name"], ch["url"])
+        results[ch["name"]] = {"status": "cached" if entry else "unavailable",
+                               "error": None if entry else "never fetched", "entry": entry}
+    return results
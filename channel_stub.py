@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Local stand-in for a remote bulker channel.
+
+Serves a channel's index.json and/or index.yaml the way a static host does,
+with an ETag and a Last-Modified on every response and 304 Not Modified for
+a matching If-None-Match or If-Modified-Since, so channel_client.py can be
+exercised without network access. It can also misbehave: answer every
+request with an error status, or send bodies one byte at a time.
+
+Usage:
+    python channel_stub.py                       # this repo's docs/index.json and index.yaml
+    python channel_stub.py --docs path/to/docs   # another built site
+    python channel_stub.py --fail 503            # every request fails
+    python channel_stub.py --drip 0.1            # one body byte every 0.1s
+
+then point a channels.yaml entry at it (url: http://127.0.0.1:8766) and build
+with --fetch-channels.
+
+In-process use (e.g. from a test): `server = start_stub(files)` returns a
+running ChannelStub serving {"index.json": bytes, ...}; read `server.url` and
+`server.requests`, change `server.files`, `server.fail` or `server.drip` at
+any time, and call `server.shutdown()` when done.
+"""
+
+import argparse
+import hashlib
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).parent.resolve()
+
+CONTENT_TYPES = {"index.json": "application/json", "index.yaml": "application/yaml"}
+
+
+class ChannelStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, files: dict[str, bytes], fail: int = 0, drip: float = 0.0):
+        super().__init__(address, _Handler)
+        self.files = files
+        self.fail = fail
+        self.drip = drip
+        # One modification time for the server's lifetime, as a static host would report
+        self.last_modified = formatdate(time.time(), usegmt=True)
+        self.requests = 0
+        self.not_modified = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b"", headers: dict | None = None):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if not self.server.drip:
+            self.wfile.write(body)
+            return
+        try:
+            for i in range(len(body)):
+                self.wfile.write(body[i:i + 1])
+                self.wfile.flush()
+                time.sleep(self.server.drip)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        if server.fail:
+            self._send(server.fail, b"unavailable\n")
+            return
+        name = self.path.split("?", 1)[0].strip("/")
+        body = server.files.get(name)
+        if body is None:
+            self._send(404, b"not found\n")
+            return
+        headers = {"ETag": _etag(body), "Last-Modified": server.last_modified}
+        # If-None-Match, when sent, overrides If-Modified-Since (RFC 9110)
+        if "If-None-Match" in self.headers:
+            unchanged = self.headers["If-None-Match"] == headers["ETag"]
+        else:
+            unchanged = self.headers.get("If-Modified-Since") == server.last_modified
+        if unchanged:
+            with server.lock:
+                server.not_modified += 1
+            self._send(304, headers=headers)
+            return
+        self._send(200, body, {**headers, "Content-Type": CONTENT_TYPES.get(name, "text/plain")})
+
+
+def start_stub(files: dict[str, bytes], host: str = "127.0.0.1", port: int = 0,
+               fail: int = 0, drip: float = 0.0) -> ChannelStub:
+    """Start a stub channel on a background thread and return it."""
+    server = ChannelStub((host, port), files, fail=fail, drip=drip)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve a stand-in bulker channel index.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8766)
+    ap.add_argument("--docs", type=Path, default=ROOT / "docs",
+                    help="built site whose index.json/index.yaml to serve (default: docs/)")
+    ap.add_argument("--fail", type=int, default=0, metavar="STATUS",
+                    help="answer every request with this HTTP status")
+    ap.add_argument("--drip", type=float, default=0.0, metavar="SECONDS",
+                    help="send response bodies one byte every SECONDS")
+    args = ap.parse_args()
+
+    files = {name: (args.docs / name).read_bytes()
+             for name in CONTENT_TYPES if (args.docs / name).exists()}
+    if not files:
+        raise SystemExit(f"no index.json or index.yaml in {args.docs}")
+
+    server = ChannelStub((args.host, args.port), files, fail=args.fail, drip=args.drip)
+    print(f"Serving {', '.join(sorted(files))} at {server.url} (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"{server.requests} requests, {server.not_modified} not modified")
+
+
+if __name__ == "__main__":
+    main()
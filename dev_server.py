@@ -0,0 +1,240 @@
+"""Watch mode and local preview server for build_site.py --watch / --serve.
+
+- Watcher:  waits for edits to the manifest directories, _templates/ and
+            top-level files such as channels.yaml, using inotify (the optional
+            `inotify_simple` module) where available and mtime polling
+            otherwise. A burst of events (an editor's write + rename) is
+            collected into one change set.
+- serve():  serves docs/ over HTTP in a background thread. HTML responses get
+            a small script that reloads the page when notify() is called after
+            a rebuild; the files in docs/ themselves are never modified.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections.abc import Callable
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+try:
+    import inotify_simple
+except ImportError:  # optional; the watcher polls mtimes without it
+    inotify_simple = None
+
+# Quiet period that ends a burst of change events
+DEBOUNCE = 0.05
+POLL_INTERVAL = 0.5
+
+RELOAD_PATH = "/__reload"
+RELOAD_SCRIPT = (
+    b'<script>new EventSource("' + RELOAD_PATH.encode()
+    + b'").onmessage = () => location.reload();</script>\n'
+)
+# Comment lines keep idle event streams from being closed by the browser
+KEEPALIVE = 15
+
+
+def _ignored(name: str) -> bool:
+    """Editor swap, backup and temporary files."""
+    return name.startswith((".", "#")) or name.endswith(("~", ".swp", ".tmp"))
+
+
+class PollingWatcher:
+    """Detect changes by comparing (mtime, size) snapshots of the watched files."""
+
+    name = "polling"
+
+    def __init__(self, targets: Callable[[], tuple[list[Path], list[Path]]]):
+        self.targets = targets
+        self.snapshot = self._scan()
+
+    def _scan(self) -> dict[Path, tuple[int, int]]:
+        dirs, files = self.targets()
+        paths = [p for d in dirs if d.is_dir() for p in d.iterdir() if not _ignored(p.name)]
+        state = {}
+        for path in paths + files:
+            try:
+                st = path.lstat()
+            except FileNotFoundError:
+                continue
+            state[path] = (st.st_mtime_ns, st.st_size)
+        return state
+
+    def wait(self) -> set[Path]:
+        while True:
+            time.sleep(POLL_INTERVAL)
+            state = self._scan()
+            changed = {p for p in state.keys() | self.snapshot.keys()
+                       if state.get(p) != self.snapshot.get(p)}
+            self.snapshot = state
+            if changed:
+                return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Detect changes with inotify: one watch per directory, none per file."""
+
+    name = "inotify"
+
+    def __init__(self, targets: Callable[[], tuple[list[Path], list[Path]]]):
+        flags = inotify_simple.flags
+        self.mask = (flags.CLOSE_WRITE | flags.MODIFY | flags.CREATE | flags.DELETE
+                     | flags.MOVED_FROM | flags.MOVED_TO | flags.ATTRIB)
+        self.targets = targets
+        self.inotify = inotify_simple.INotify()
+        self.watches: dict[int, Path] = {}
+        self._sync()
+
+    def _sync(self):
+        """Watch every target directory, and the parents of target files.
+
+        Called again after each change, so a new namespace directory starts
+        being watched as soon as it is created.
+        """
+        dirs, files = self.targets()
+        self.files = set(files)
+        self.dirs = {d for d in dirs if d.is_dir()}
+        watched = set(self.watches.values())
+        for d in self.dirs | {f.parent for f in files}:
+            if d not in watched:
+                self.watches[self.inotify.add_watch(d, self.mask)] = d
+
+    def _changes(self, events) -> set[Path]:
+        changed = set()
+        for event in events:
+            directory = self.watches.get(event.wd)
+            if directory is None or not event.name or _ignored(event.name):
+                continue
+            path = directory / event.name
+            if directory in self.dirs or path in self.files:
+                changed.add(path)
+            elif event.mask & inotify_simple.flags.ISDIR:
+                changed.add(path)  # possibly a new namespace; _sync() decides
+        return changed
+
+    def wait(self) -> set[Path]:
+        while True:
+            changed = self._changes(self.inotify.read())
+            # Collect the rest of the burst
+            while events := self.inotify.read(timeout=int(DEBOUNCE * 1000)):
+                changed |= self._changes(events)
+            before = self.dirs
+            self._sync()
+            dirs = before | self.dirs  # a deleted namespace still counts
+            changed = {p for p in changed if p.parent in dirs or p in dirs or p in self.files}
+            if changed:
+                return changed
+
+    def close(self):
+        self.inotify.close()
+
+
+def make_watcher(targets: Callable[[], tuple[list[Path], list[Path]]]):
+    """An inotify watcher if inotify_simple is installed (and works), else polling.
+
+    `targets` returns (directories whose entries are watched, individual
+    files); it is re-evaluated as the tree changes.
+    """
+    if inotify_simple is not None:
+        try:
+            return InotifyWatcher(targets)
+        except OSError as e:  # e.g. the inotify watch limit
+            print(f"  WARNING: inotify unavailable ({e}); polling for changes", file=sys.stderr)
+    return PollingWatcher(targets)
+
+
+class _Reloader:
+    """A generation counter browsers wait on; notify() bumps it."""
+
+    def __init__(self):
+        self.generation = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.generation += 1
+            self.condition.notify_all()
+
+    def wait(self, seen: int, timeout: float) -> int:
+        with self.condition:
+            self.condition.wait_for(lambda: self.generation != seen, timeout)
+            return self.generation
+
+
+class _Handler(SimpleHTTPRequestHandler):
+    reloader: _Reloader
+
+    def log_message(self, format, *args):
+        pass  # one line per request would bury the rebuild reports
+
+    def end_headers(self):
+        self.send_header("Cache-Control", "no-store")
+        super().end_headers()
+
+    def do_GET(self):
+        url_path = self.path.split("?", 1)[0].split("#", 1)[0]
+        if url_path == RELOAD_PATH:
+            self._stream_reloads()
+            return
+        path = Path(self.translate_path(self.path))
+        if path.is_dir() and url_path.endswith("/"):
+            path = path / "index.html"
+        if path.suffix != ".html" or not path.is_file():
+            super().do_GET()
+            return
+        body = path.read_bytes()
+        end = body.rfind(b"</body>")
+        body = body[:end] + RELOAD_SCRIPT + body[end:] if end >= 0 else body + RELOAD_SCRIPT
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_reloads(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        seen = self.reloader.generation
+        try:
+            while True:
+                generation = self.reloader.wait(seen, KEEPALIVE)
+                self.wfile.write(b"data: reload\n\n" if generation != seen else b": keepalive\n\n")
+                self.wfile.flush()
+                seen = generation
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class PreviewServer:
+    """docs/ over HTTP with live reload; started by serve()."""
+
+    def __init__(self, httpd: ThreadingHTTPServer, reloader: _Reloader):
+        self.httpd = httpd
+        self.reloader = reloader
+        host, port = httpd.server_address[:2]
+        self.url = f"http://{host}:{port}/"
+
+    def notify(self):
+        """Tell every open page to reload."""
+        self.reloader.notify()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def serve(docs: Path, host: str = "127.0.0.1", port: int = 8000) -> PreviewServer:
+    """Start serving `docs` in a daemon thread."""
+    reloader = _Reloader()
+    handler = type("Handler", (_Handler,), {"reloader": reloader})
+    httpd = ThreadingHTTPServer((host, port), partial(handler, directory=os.fspath(docs)))
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return PreviewServer(httpd, reloader)
@@ -0,0 +1,63 @@
+"""Compare the commands of two manifest versions.
+
+Shared by update_refgenie_crate.py, which prints the pin changes a sync would
+make, and build_site.py, which publishes a changelog entry for every pair of
+consecutive tags of every crate (docs/changes/<ns>/<crate>/<tag>.json) and
+renders it on the version page.
+"""
+
+ABSENT = "(absent)"
+REMOVED = "(REMOVED)"
+
+
+def diff(old: dict[str, dict], new_entries: list[dict]) -> list[tuple[str, str, str]]:
+    """(command, image before, image after) for every command whose image differs.
+
+    `old` maps command names to entries; a command missing on one side shows
+    ABSENT (added) or REMOVED (dropped) in place of its image.
+    """
+    rows = []
+    new = {e["command"]: e["docker_image"] for e in new_entries}
+    for name in sorted(set(old) | set(new), key=str.lower):
+        before = old.get(name, {}).get("docker_image", ABSENT)
+        after = new.get(name, REMOVED)
+        if before != after:
+            rows.append((name, before, after))
+    return rows
+
+
+def image_version(image: str) -> str:
+    """Best-effort human version from a container reference."""
+    tag = image.rsplit(":", 1)[-1] if ":" in image.rsplit("/", 1)[-1] else "latest"
+    return tag.split("--")[0]
+
+
+def command_changes(old_commands: list[dict], new_commands: list[dict]) -> dict:
+    """Structured diff of two command lists: added, removed and re-pinned commands.
+
+    Each entry carries the image(s) and the version image_version() reads from
+    them; `version_changed` tells a rebuild-only re-pin (same tool version,
+    new build) from an upgrade.
+    """
+    old = {c["command"]: c for c in old_commands if isinstance(c.get("command"), str)}
+    new_entries = [c for c in new_commands if isinstance(c.get("command"), str)]
+    changes = {"added": [], "removed": [], "repinned": []}
+    for name, before, after in diff(old, new_entries):
+        if before == ABSENT:
+            changes["added"].append({"command": name, "docker_image": after,
+                                     "version": image_version(after or "")})
+        elif after == REMOVED:
+            changes["removed"].append({"command": name, "docker_image": before,
+                                       "version": image_version(before or "")})
+        else:
+            before_version = image_version(before or "")
+            after_version = image_version(after or "")
+            changes["repinned"].append({
+                "command": name,
+                "before": before,
+                "after": after,
+                "before_version": before_version,
+                "after_version": after_version,
+                "version_changed": before_version != after_version,
+            })
+    return changes
@@ -0,0 +1,198 @@
+"""The import graph between manifests, as hub.bulker.io publishes them.
+
+An import reference `namespace/crate:tag` names a published URL: the versioned
+file for a tag, or the crate's latest pointer (`<crate>.yaml`) for `default`.
+build_site.py publishes that pointer as a copy of the crate's latest tag; a
+crate with a real bare-name file and no versioned copies is its own default.
+This module resolves references the same way, from the shared loader's
+records, so both validate_manifests.py and build_site.py can walk the graph.
+
+It also flattens a manifest's transitive imports into one pre-resolved
+manifest (see ImportGraph.flatten), which build_site.py publishes so that
+`bulker load` needs a single fetch per crate.
+"""
+
+from collections import deque
+
+import versioning
+from manifest_loader import LoadedManifest
+
+
+def parse_import(ref: str) -> tuple[str, str, str] | None:
+    """Split `namespace/crate:tag` into its parts, or None if malformed."""
+    if not isinstance(ref, str):
+        return None
+    ref = ref.strip()
+    if "/" not in ref:
+        return None
+    namespace, rest = ref.split("/", 1)
+    crate, _, tag = rest.partition(":")
+    return namespace, crate, tag or "default"
+
+
+class ImportCycleError(ValueError):
+    """A manifest imports itself, directly or through other manifests."""
+
+    def __init__(self, cycle: list[str]):
+        self.cycle = cycle
+        super().__init__("import cycle: " + " -> ".join(cycle))
+
+
+class ImportGraph:
+    """Resolve import references and walk importers/imports between manifests.
+
+    Nodes are repo-relative manifest paths of real (non-symlink) files.
+    """
+
+    def __init__(self, loaded: list[LoadedManifest]):
+        self.manifests: dict[str, LoadedManifest] = {}
+        self.by_tag: dict[tuple[str, str, str], str] = {}
+        versions: dict[tuple[str, str], dict[str, str]] = {}
+        for m in loaded:
+            if m.is_symlink or m.manifest is None:
+                continue
+            self.manifests[m.rel] = m
+            self.by_tag[(m.namespace, m.crate, m.tag)] = m.rel
+            versions.setdefault((m.namespace, m.crate), {})[m.tag] = str(m.manifest.get("version") or "")
+        # Same rule build_data_structure uses for the latest pointer
+        self.latest: dict[tuple[str, str], str] = {
+            key: self.by_tag[(*key, versioning.latest_tag(tags))]
+            for key, tags in versions.items()
+        }
+
+        self.imports: dict[str, list[str]] = {}
+        self.importers: dict[str, set[str]] = {rel: set() for rel in self.manifests}
+        self.dangling: dict[str, list[str]] = {}
+        for rel, m in self.manifests.items():
+            refs = [r for r in (m.manifest.get("imports") or []) if isinstance(r, str)]
+            self.imports[rel] = refs
+            for ref in refs:
+                target = self.resolve(ref)
+                if target is None:
+                    self.dangling.setdefault(rel, []).append(ref)
+                else:
+                    self.importers[target].add(rel)
+
+    def resolve(self, ref: str) -> str | None:
+        """Return the manifest an import reference is served from, if any."""
+        parts = parse_import(ref)
+        if parts is None:
+            return None
+        namespace, crate, tag = parts
+        if tag == "default":
+            return self.latest.get((namespace, crate))
+        return self.by_tag.get((namespace, crate, tag))
+
+    def dependents(self, rels) -> set[str]:
+        """Every manifest that imports any of `rels`, directly or transitively."""
+        seen: set[str] = set()
+        queue = deque(rels)
+        while queue:
+            for importer in self.importers.get(queue.popleft(), ()):
+                if importer not in seen:
+                    seen.add(importer)
+                    queue.append(importer)
+        return seen
+
+    def direct_dependents(self, ref: str) -> set[str] | None:
+        """Manifests that import what `ref` names; None if it names nothing.
+
+        For a concrete tag that is every importer of the file, whichever way
+        they refer to it. For `crate:default` (or a bare `ns/crate`) it is the
+        manifests importing the default pointer itself: what moves if the
+        crate's latest tag changes.
+        """
+        parts = parse_import(ref)
+        target = self.resolve(ref)
+        if parts is None or target is None:
+            return None
+        if parts[2] != "default":
+            return set(self.importers[target])
+        return {
+            rel for rel, refs in self.imports.items()
+            if any(parse_import(r) == parts for r in refs)
+        }
+
+    def dependents_of(self, ref: str) -> set[str] | None:
+        """Direct and transitive dependents of `ref` (see direct_dependents)."""
+        direct = self.direct_dependents(ref)
+        if direct is None:
+            return None
+        return direct | self.dependents(direct)
+
+    def importers_of_crate(self, namespace: str, crate: str) -> set[str]:
+        """Manifests whose imports name this crate at any tag (resolvable or not)."""
+        found = set()
+        for rel, refs in self.imports.items():
+            for ref in refs:
+                parts = parse_import(ref)
+                if parts and parts[:2] == (namespace, crate):
+                    found.add(rel)
+        return found
+
+    def ref(self, rel: str) -> str:
+        """The `namespace/crate:tag` reference a manifest file is published as."""
+        m = self.manifests[rel]
+        return f"{m.namespace}/{m.crate}:{m.tag}"
+
+    def closure(self, rel: str) -> list[str]:
+        """The manifest and everything it imports, in bulker's precedence order.
+
+        Depth-first and pre-order: the manifest itself, then each import in
+        listed order followed by that import's own imports. A manifest reached
+        twice keeps its first position. Dangling imports are left out (see
+        `dangling`); raises ImportCycleError if an import leads back to a
+        manifest on the current path.
+        """
+        order: list[str] = []
+        seen: set[str] = set()
+        path: list[str] = []
+
+        def visit(node: str):
+            if node in path:
+                cycle = path[path.index(node):] + [node]
+                raise ImportCycleError([self.ref(n) for n in cycle])
+            if node in seen:
+                return
+            seen.add(node)
+            order.append(node)
+            path.append(node)
+            for ref in self.imports.get(node, ()):
+                target = self.resolve(ref)
+                if target is not None:
+                    visit(target)
+            path.pop()
+
+        visit(rel)
+        return order
+
+    def flatten(self, rel: str) -> dict:
+        """A pre-resolved copy of a manifest with its imports' commands merged in.
+
+        Commands follow bulker's first-listed-wins rule over the closure order:
+        a command name already provided earlier shadows later definitions. Each
+        command records the manifest it came from under `provenance`, and the
+        closure itself is listed under `resolved_imports`; `imports` is dropped
+        since nothing is left to fetch.
+        """
+        members = self.closure(rel)
+        manifest = {k: v for k, v in self.manifests[rel].manifest.items() if k != "imports"}
+        commands, provided, host_commands = [], set(), []
+        for member in members:
+            data = self.manifests[member].manifest
+            source = self.ref(member)
+            for cmd in data.get("commands") or []:
+                if not isinstance(cmd, dict) or cmd.get("command") in provided:
+                    continue
+                provided.add(cmd.get("command"))
+                commands.append(dict(cmd, provenance=source))
+            for host_cmd in data.get("host_commands") or []:
+                if host_cmd not in host_commands:
+                    host_commands.append(host_cmd)
+        manifest["commands"] = commands
+        if host_commands:
+            manifest["host_commands"] = host_commands
+        manifest["resolved_imports"] = [
+            {"ref": self.ref(member), "path": member} for member in members[1:]
+        ]
+        return {"manifest": manifest}
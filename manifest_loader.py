@@ -0,0 +1,192 @@
+"""Shared manifest loading for validate_manifests.py and build_site.py.
+
+Every manifest file is read from disk once and YAML-parsed at most once per
+process, with libyaml's CSafeLoader when PyYAML was built with it. Validation,
+image collection and site building all consume the same LoadedManifest
+records, so a combined validate+build run parses each file a single time.
+
+Symlinked manifests (e.g. bulker/biobase.yaml -> biobase_0.1.15.yaml) share the
+text and parsed data of their target rather than being parsed again.
+"""
+
+import hashlib
+import time
+from pathlib import Path
+
+import yaml
+
+import profiling
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader
+
+# Directories to skip when scanning for manifests
+SKIP_DIRS = {"docs", "_templates", "benchmarks", "tests", ".git", ".github", "__pycache__"}
+
+
+def parse_yaml(text: str):
+    """yaml.safe_load, using the C loader when available."""
+    return yaml.load(text, Loader=SafeLoader)
+
+
+class LoadedManifest:
+    """One manifest file: its raw text, content hash and (lazily) parsed data."""
+
+    def __init__(self, path: Path, root: Path, raw: bytes,
+                 target: "LoadedManifest | None" = None, error: Exception | None = None):
+        self.path = path
+        self.rel = str(path.relative_to(root))
+        self.namespace = path.parent.name
+        self.is_symlink = target is not None
+        self._raw = raw
+        self._text: str | None = None
+        self._target = target
+        self._parsed = error is not None
+        self._data = None
+        self._error = error
+        self.digest = hashlib.sha256(raw).hexdigest()
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            if self._raw is None:  # released
+                self._raw = self.path.read_bytes()
+            self._text = self._raw.decode()
+        return self._text
+
+    def release(self):
+        """Drop the file's bytes, text and parsed data to free memory.
+
+        Anything asked for again afterwards is re-read (and re-parsed) from
+        disk; the digest is kept.
+        """
+        if self._error is not None:
+            return  # keep the read or parse error callers report
+        self._raw = self._text = self._data = None
+        self._parsed = False
+
+    def _parse(self):
+        if self._target is not None:
+            self._data, self._error = self._target.data, self._target.error
+        else:
+            start = time.perf_counter()
+            try:
+                self._data = parse_yaml(self.text)
+            except Exception as e:
+                self._error = e
+            profiling.record_parse(self.rel, time.perf_counter() - start)
+        self._parsed = True
+
+    @property
+    def data(self):
+        """Parsed YAML document, or None if the file failed to parse."""
+        if not self._parsed:
+            self._parse()
+        return self._data
+
+    @property
+    def error(self) -> Exception | None:
+        """The exception raised while parsing, if any."""
+        if not self._parsed:
+            self._parse()
+        return self._error
+
+    @property
+    def manifest(self) -> dict | None:
+        """The `manifest` mapping, or None if the document has none."""
+        data = self.data
+        if isinstance(data, dict) and isinstance(data.get("manifest"), dict):
+            return data["manifest"]
+        return None
+
+    @property
+    def crate(self) -> str:
+        """Crate name: manifest.name without its namespace, else the file stem."""
+        manifest = self.manifest or {}
+        name = manifest.get("name", self.path.stem)
+        # Strip namespace prefix if present (e.g. "databio/pepatac" -> "pepatac")
+        if isinstance(name, str) and "/" in name:
+            name = name.rsplit("/", 1)[-1]
+        return name
+
+    @property
+    def tag(self) -> str:
+        """Tag from the filename convention: name_tag.yaml, or name.yaml = default."""
+        stem = self.path.stem
+        if "_" in stem:
+            # e.g. pepatac_1.0.13 -> tag = 1.0.13
+            return stem.split("_", 1)[1]
+        return "default"
+
+    def images(self) -> set[str]:
+        """Every docker_image referenced by this manifest's commands."""
+        images = set()
+        manifest = self.manifest
+        if manifest:
+            for cmd in manifest.get("commands") or []:
+                if isinstance(cmd, dict) and isinstance(cmd.get("docker_image"), str) \
+                        and cmd["docker_image"].strip():
+                    images.add(cmd["docker_image"].strip())
+        return images
+
+
+def discover_manifest_files(root: Path) -> list[Path]:
+    """Find all manifest YAML files (excluding docs/, _templates/, etc.)."""
+    files = []
+    for entry in sorted(root.iterdir()):
+        if not entry.is_dir() or entry.name in SKIP_DIRS or entry.name.startswith("."):
+            continue
+        for yaml_file in sorted(entry.glob("*.yaml")):
+            files.append(yaml_file)
+    return files
+
+
+def load_manifests(root: Path, files: list[Path] | None = None,
+                   previous: list[LoadedManifest] | None = None) -> list[LoadedManifest]:
+    """Read every manifest under `root` (or just `files`) exactly once.
+
+    Returned in discovery order. Symlinks are included and flagged, sharing
+    the record of their target when the target is itself a loaded manifest.
+    Files still byte-identical to their record in `previous` (an earlier load
+    in the same process, as in build_site.py --watch) reuse that record, so
+    they are not parsed again.
+    """
+    if files is None:
+        files = discover_manifest_files(root)
+    reusable = {m.rel: m for m in previous or () if not m.is_symlink}
+    by_real: dict[Path, LoadedManifest] = {}
+    # Load real files first so symlinks can point at an existing record
+    for path in files:
+        if not path.is_symlink():
+            record = _read(path, root)
+            old = reusable.get(record.rel)
+            by_real[path.resolve()] = old if old is not None and old.digest == record.digest else record
+    loaded = []
+    for path in files:
+        if not path.is_symlink():
+            loaded.append(by_real[path.resolve()])
+            continue
+        target = by_real.get(path.resolve())
+        if target is None:
+            # Dangling, or pointing outside the scanned tree
+            loaded.append(_read(path, root))
+        else:
+            loaded.append(LoadedManifest(path, root, target._raw, target=target))
+    return loaded
+
+
+def _read(path: Path, root: Path) -> LoadedManifest:
+    try:
+        return LoadedManifest(path, root, path.read_bytes())
+    except OSError as e:
+        return LoadedManifest(path, root, b"", error=e)
+
+
+def collect_images(loaded: list[LoadedManifest]) -> set[str]:
+    """Union of docker images across manifests (symlinks add nothing new)."""
+    images: set[str] = set()
+    for m in loaded:
+        images |= m.images()
+    return images
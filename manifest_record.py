@@ -0,0 +1,122 @@
+"""Compact per-manifest records for build_site.py.
+
+build_site.py keeps one ManifestRecord per tag of every crate alive from
+discovery to the end of rendering, so they are kept small:
+
+- __slots__ classes instead of dicts, for records and their commands;
+- counts and name lists are computed on access rather than stored;
+- `raw_yaml` (shown on crate and version pages) is not stored at all: it is
+  read from the manifest file each time a page asks for it, and released
+  with the page. Large registries no longer hold every manifest's text for
+  the whole build, nor ship it to each render worker.
+
+Both classes also answer `record["key"]` and `record.get("key")`, so code and
+templates written against the earlier dict records (and manifest_diff.py,
+which takes plain YAML command dicts too) work unchanged.
+"""
+
+from pathlib import Path
+
+
+class _Record:
+    __slots__ = ()
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value):
+        setattr(self, key, value)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+
+class Command(_Record):
+    """One `commands` entry of a manifest, with missing fields as ""."""
+
+    __slots__ = ("command", "docker_image", "docker_args", "docker_command")
+
+    def __init__(self, command: str = "", docker_image: str = "", docker_args: str = "",
+                 docker_command: str = ""):
+        self.command = command
+        self.docker_image = docker_image
+        self.docker_args = docker_args
+        self.docker_command = docker_command
+
+    @classmethod
+    def from_yaml(cls, entry: dict) -> "Command":
+        return cls(entry.get("command", ""), entry.get("docker_image", ""),
+                   entry.get("docker_args", ""), entry.get("docker_command", ""))
+
+    def to_list(self) -> list:
+        return [self.command, self.docker_image, self.docker_args, self.docker_command]
+
+
+class ManifestRecord(_Record):
+    """What the site needs from one manifest file (one tag of one crate).
+
+    The attributes after `digest` are filled in by build_site.py's attach_*
+    passes once every manifest is known.
+    """
+
+    __slots__ = (
+        "namespace", "name", "tag", "version", "description", "path", "filename",
+        "commands", "imports", "host_commands", "source", "digest",
+        "used_by", "images", "image_count", "previous_tag", "changes",
+    )
+
+    # Fields stored in the build cache; the rest are per-build
+    CACHED = ("namespace", "name", "tag", "version", "description", "path", "filename",
+              "imports", "host_commands")
+
+    def __init__(self, namespace: str, name: str, tag: str, version: str, description: str,
+                 path: str, filename: str, commands: list[Command], imports: list,
+                 host_commands: list, source: Path | None = None, digest: str | None = None):
+        self.namespace = namespace
+        self.name = name
+        self.tag = tag
+        self.version = version
+        self.description = description
+        self.path = path
+        self.filename = filename
+        self.commands = commands
+        self.imports = imports
+        self.host_commands = host_commands
+        self.source = source
+        self.digest = digest
+        self.used_by = None
+        self.images = None
+        self.image_count = None
+        self.previous_tag = None
+        self.changes = None
+
+    @property
+    def command_names(self) -> list[str]:
+        return [c.command for c in self.commands]
+
+    @property
+    def command_count(self) -> int:
+        return len(self.commands)
+
+    @property
+    def host_command_count(self) -> int:
+        return len(self.host_commands)
+
+    @property
+    def raw_yaml(self) -> str:
+        """The manifest's text, read from `source` on every access."""
+        return self.source.read_text() if self.source is not None else ""
+
+    def to_cache(self) -> dict:
+        """JSON-safe form for the build cache (see from_cache)."""
+        data = {field: getattr(self, field) for field in self.CACHED}
+        data["commands"] = [c.to_list() for c in self.commands]
+        return data
+
+    @classmethod
+    def from_cache(cls, data: dict, source: Path | None = None) -> "ManifestRecord":
+        fields = {field: data[field] for field in cls.CACHED}
+        return cls(commands=[Command(*c) for c in data["commands"]], source=source, **fields)
@@ -9,28 +9,16 @@ Rules:
 Run from repo root: python migrate_symlinks.py [--dry-run]
 """
 
-import re
 import shutil
 import sys
 from pathlib import Path
 
 import yaml
 
-SKIP_DIRS = {"docs", "_templates", ".git", ".github", "__pycache__"}
-ROOT = Path(__file__).parent.resolve()
-
-
-VERSION_RE = re.compile(r'^\d+(\.\d+)*$')
-
-
-def is_version_like(s: str) -> bool:
-    """Check if a string looks like a version number (e.g., 1.0.0, 3.21)."""
-    return bool(VERSION_RE.match(s))
+from versioning import is_version_like, latest_tag
 
-
-def version_key(v: str):
-    """Parse version string into comparable tuple of ints."""
-    return tuple(int(x) for x in v.split("."))
+SKIP_DIRS = {"docs", "_templates", "benchmarks", "tests", ".git", ".github", "__pycache__"}
+ROOT = Path(__file__).parent.resolve()
 
 
 def get_version_from_file(filepath: Path) -> str:
@@ -43,6 +31,15 @@ def get_version_from_file(filepath: Path) -> str:
         return ""
 
 
+def latest_versioned(versioned: dict[str, Path]) -> Path:
+    """The file the bare-name symlink should point at.
+
+    Uses the same rule as build_site.py's latest pointer: highest
+    manifest.version, then highest version in the file name.
+    """
+    return versioned[latest_tag({v: get_version_from_file(p) for v, p in versioned.items()})]
+
+
 def migrate_namespace(namespace_dir: Path, dry_run: bool = False):
     """Process all manifests in a namespace directory."""
     # Collect all yaml files, grouping by crate name
@@ -77,8 +74,7 @@ def migrate_namespace(namespace_dir: Path, dry_run: bool = False):
 
         # Case: no bare file, only versioned (e.g., refgenie)
         if not bare and versioned:
-            latest_ver = max(versioned.keys(), key=version_key)
-            target = versioned[latest_ver]
+            target = latest_versioned(versioned)
             symlink_path = namespace_dir / f"{crate_name}.yaml"
             print(f"  CREATE symlink: {symlink_path.name} -> {target.name}")
             if not dry_run:
@@ -99,8 +95,7 @@ def migrate_namespace(namespace_dir: Path, dry_run: bool = False):
                 versioned[bare_version] = versioned_path
 
             # Now replace bare with symlink to latest
-            latest_ver = max(versioned.keys(), key=version_key)
-            target = versioned[latest_ver]
+            target = latest_versioned(versioned)
             print(f"  SYMLINK: {bare.name} -> {target.name}")
             if not dry_run:
                 bare.unlink()
@@ -0,0 +1,215 @@
+"""Run-time profile shared by build_site.py and validate_manifests.py.
+
+One Profile per process collects:
+
+- wall and CPU time per phase (CPU includes reaped child processes, such as
+  the render pool);
+- template render counts and durations;
+- files and bytes written into docs/;
+- YAML parse time per manifest file;
+- registry HTTP latency, as a histogram per host and result class
+  (2xx, 4xx, 429, 5xx, error).
+
+Instrumented code calls the module-level record_* helpers, which do nothing
+unless a profile is active, so the hot paths pay one global lookup when
+profiling is off. Both tools expose it as `--profile` (print a report) and
+`--timings-json PATH` (write the JSON that CI archives).
+"""
+
+import json
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # not on Windows; CPU time then excludes child processes
+    resource = None
+
+# Upper bounds (milliseconds) of the HTTP latency histogram buckets
+LATENCY_BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+_active: "Profile | None" = None
+
+
+def _cpu_seconds() -> float:
+    cpu = time.process_time()
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu += usage.ru_utime + usage.ru_stime
+    return cpu
+
+
+def result_class(status: int | None) -> str:
+    """Group an HTTP status (None for a failed request) for the histogram."""
+    if status is None:
+        return "error"
+    if status == 429:
+        return "429"
+    return f"{status // 100}xx"
+
+
+class Profile:
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.started = time.time()
+        self._wall0, self._cpu0 = time.perf_counter(), _cpu_seconds()
+        self.phases: dict[str, dict[str, float]] = {}
+        self.templates: dict[str, dict[str, float]] = {}
+        self.files_written = 0
+        self.bytes_written = 0
+        self.parse_seconds: dict[str, float] = {}
+        self.http: dict[str, dict[str, dict]] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        wall, cpu = time.perf_counter(), _cpu_seconds()
+        try:
+            yield
+        finally:
+            entry = self.phases.setdefault(name, {"wall": 0.0, "cpu": 0.0})
+            entry["wall"] += time.perf_counter() - wall
+            entry["cpu"] += _cpu_seconds() - cpu
+
+    def finish(self):
+        """Record the whole run, since the profile was created, as phase "total"."""
+        self.phases["total"] = {"wall": time.perf_counter() - self._wall0,
+                                "cpu": _cpu_seconds() - self._cpu0}
+
+    def record_render(self, template: str, seconds: float, count: int = 1):
+        entry = self.templates.setdefault(template, {"count": 0, "seconds": 0.0})
+        entry["count"] += count
+        entry["seconds"] += seconds
+
+    def record_write(self, nbytes: int, files: int = 1):
+        self.files_written += files
+        self.bytes_written += nbytes
+
+    def record_parse(self, path: str, seconds: float):
+        self.parse_seconds[path] = seconds
+
+    def record_http(self, host: str, status: int | None, seconds: float):
+        entry = self.http.setdefault(host, {}).setdefault(result_class(status), {
+            "count": 0, "seconds": 0.0, "max": 0.0,
+            "buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+        })
+        entry["count"] += 1
+        entry["seconds"] += seconds
+        entry["max"] = max(entry["max"], seconds)
+        ms = seconds * 1000
+        index = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if ms <= bound),
+                     len(LATENCY_BUCKETS_MS))
+        entry["buckets"][index] += 1
+
+    def merge(self, data: dict):
+        """Fold in the templates and writes recorded by a worker process."""
+        for template, entry in data.get("templates", {}).items():
+            self.record_render(template, entry["seconds"], entry["count"])
+        self.record_write(data.get("bytes_written", 0), data.get("files_written", 0))
+
+    def to_dict(self) -> dict:
+        parse = self.parse_seconds
+        return {
+            "tool": self.tool,
+            "started": self.started,
+            "phases": self.phases,
+            "templates": self.templates,
+            "files_written": self.files_written,
+            "bytes_written": self.bytes_written,
+            "parse": {
+                "files": len(parse),
+                "seconds": sum(parse.values()),
+                "per_file": dict(sorted(parse.items())),
+            },
+            "http": {
+                "bucket_bounds_ms": LATENCY_BUCKETS_MS,
+                "hosts": self.http,
+            },
+        }
+
+    def write_json(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), indent=2) + "\n")
+
+    def print_phases(self, file=sys.stdout):
+        if not self.phases:
+            return
+        print("Timings:", file=file)
+        width = max(len(name) for name in self.phases)
+        for name, entry in self.phases.items():
+            print(f"  {name:<{width}}  {entry['wall']:8.3f}s", file=file)
+
+    def print_report(self, file=sys.stdout, slowest: int = 10):
+        """The --profile report: phases with CPU, templates, writes, parses, HTTP."""
+        print("Profile:", file=file)
+        if self.phases:
+            width = max(len(name) for name in self.phases)
+            print(f"  {'phase':<{width}}  {'wall':>9}  {'cpu':>9}", file=file)
+            for name, entry in self.phases.items():
+                print(f"  {name:<{width}}  {entry['wall']:8.3f}s  {entry['cpu']:8.3f}s", file=file)
+        if self.templates:
+            print("  templates:", file=file)
+            for template, entry in sorted(self.templates.items()):
+                print(f"    {template:<22} {int(entry['count']):6d} renders  "
+                      f"{entry['seconds']:8.3f}s", file=file)
+        if self.files_written:
+            print(f"  wrote {self.files_written} files, {self.bytes_written:,} bytes", file=file)
+        if self.parse_seconds:
+            total = sum(self.parse_seconds.values())
+            print(f"  parsed {len(self.parse_seconds)} YAML files in {total:.3f}s; slowest:",
+                  file=file)
+            ranked = sorted(self.parse_seconds.items(), key=lambda kv: kv[1], reverse=True)
+            for path, seconds in ranked[:slowest]:
+                print(f"    {seconds * 1000:8.1f} ms  {path}", file=file)
+        for host, classes in sorted(self.http.items()):
+            for cls, entry in sorted(classes.items()):
+                mean = entry["seconds"] / entry["count"] * 1000
+                print(f"  {host} {cls}: {entry['count']} requests, mean {mean:.0f} ms, "
+                      f"max {entry['max'] * 1000:.0f} ms", file=file)
+
+
+def enable(tool: str) -> Profile:
+    """Start collecting into a new profile and return it."""
+    global _active
+    _active = Profile(tool)
+    return _active
+
+
+def disable():
+    global _active
+    _active = None
+
+
+def active() -> Profile | None:
+    return _active
+
+
+@contextmanager
+def phase(name: str):
+    """Time a phase on the active profile; a no-op when profiling is off."""
+    if _active is None:
+        yield
+    else:
+        with _active.phase(name):
+            yield
+
+
+def record_render(template: str, seconds: float):
+    if _active is not None:
+        _active.record_render(template, seconds)
+
+
+def record_write(nbytes: int):
+    if _active is not None:
+        _active.record_write(nbytes)
+
+
+def record_parse(path: str, seconds: float):
+    if _active is not None:
+        _active.record_parse(path, seconds)
+
+
+def record_http(host: str, status: int | None, seconds: float):
+    if _active is not None:
+        _active.record_http(host, status, seconds)
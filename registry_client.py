@@ -0,0 +1,335 @@
+"""Asyncio client for verifying image tags on container registries.
+
+Used by validate_manifests.py --check-tags. Every registry host gets a small
+pool of standard-library HTTP/1.1 keep-alive connections (http.client), so a
+run pays for one TLS handshake per pooled connection rather than one per
+image. Each host has its own concurrency limit, and a 429 answer pauses every
+request to that host for the Retry-After interval before retrying.
+
+The blocking http.client round-trips run in worker threads via
+asyncio.to_thread; the event loop only schedules them and enforces limits.
+
+In batch mode, quay.io images are grouped by repository and each repository's
+tag list is fetched once (paginated) instead of one specificTag query per
+image -- every biobase version pins a different biocontainers/samtools tag,
+so verifying the whole history costs one listing per repository.
+
+Registry endpoints can be redirected (e.g. to registry_stub.py) with
+`endpoints={"quay.io": "http://127.0.0.1:8765"}`.
+"""
+
+import asyncio
+import email.utils
+import http.client
+import json
+import sys
+import time
+import urllib.parse
+
+import profiling
+
+QUAY = "quay.io"
+DOCKER_HUB = "hub.docker.com"
+
+DEFAULT_LIMITS = {QUAY: 4, DOCKER_HUB: 2}
+DEFAULT_LIMIT = 2
+
+# Page size for quay.io repository tag listings (the API maximum is 100)
+QUAY_PAGE_SIZE = 100
+
+# Connection errors that mean a pooled keep-alive socket went stale
+_STALE = (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError)
+
+
+def quay_repository(image: str) -> tuple[str, str] | None:
+    """Split quay.io/<ns>/<name>:<tag> into ("<ns>/<name>", tag), else None."""
+    image = image.strip()
+    if not image.startswith("quay.io/") or ":" not in image:
+        return None
+    repo_path, tag = image.rsplit(":", 1)
+    repo = repo_path[len("quay.io/"):]
+    if len(repo.split("/", 1)) != 2:
+        return None
+    return repo, tag
+
+
+def plan_lookup(image: str) -> tuple:
+    """Decide how to verify an image reference.
+
+    Returns either ("request", host, path) for a registry API call, or
+    ("done", exists, message) when no request is needed or possible.
+    """
+    image = image.strip()
+
+    # No tag means :latest -- skip check
+    if ":" not in image:
+        return ("done", True, "no tag (implicit :latest)")
+
+    repo_path, tag = image.rsplit(":", 1)
+    quote = urllib.parse.quote
+
+    if repo_path.startswith("quay.io/"):
+        # quay.io/biocontainers/samtools:1.23--h... -> biocontainers/samtools
+        repo_parts = repo_path[len("quay.io/"):].split("/", 1)
+        if len(repo_parts) != 2:
+            return ("done", True, "skipped (unusual quay.io path)")
+        namespace, name = repo_parts
+        return ("request", QUAY,
+                f"/api/v1/repository/{namespace}/{name}/tag/?specificTag={quote(tag)}")
+
+    if "/" in repo_path and not repo_path.startswith("quay.io"):
+        # Docker Hub: namespace/repo, or another registry like ghcr.io
+        if repo_path.startswith("ghcr.io/"):
+            return ("done", True, "skipped (ghcr.io -- no public API)")
+        repo_parts = repo_path.split("/")
+        if len(repo_parts) == 2:
+            namespace, name = repo_parts
+            return ("request", DOCKER_HUB, f"/v2/repositories/{namespace}/{name}/tags/{quote(tag)}")
+        if len(repo_parts) >= 3:
+            # Unknown registry (e.g., gcr.io/project/image)
+            return ("done", True, "skipped (unknown registry)")
+        return ("done", True, "skipped (could not determine registry)")
+
+    # Single-name image like "openjdk" -- Docker Hub library
+    return ("request", DOCKER_HUB, f"/v2/repositories/library/{repo_path}/tags/{quote(tag)}")
+
+
+def interpret(host: str, status: int, body: bytes) -> tuple[bool, str]:
+    """Turn a registry API response into (exists, message)."""
+    if status == 404:
+        return (False, "tag not found (HTTP 404)")
+    if status != 200:
+        return (True, f"skipped (HTTP {status})")
+    if host == QUAY:
+        try:
+            tags = json.loads(body).get("tags", [])
+        except ValueError:
+            return (True, "skipped (unreadable quay.io response)")
+        if tags:
+            return (True, "verified on quay.io")
+        return (False, "tag not found on quay.io")
+    return (True, "verified on Docker Hub")
+
+
+def retry_after_seconds(value: str | None, default: float) -> float:
+    """Parse a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return default
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    return max(0.0, when.timestamp() - time.time())
+
+
+class _HostPool:
+    """Keep-alive connections and the concurrency limit for one registry host."""
+
+    def __init__(self, host: str, base_url: str, limit: int, timeout: float):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.host = host
+        self.scheme = parsed.scheme
+        self.netloc = parsed.netloc
+        self.limit = limit
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(limit)
+        self.idle: list[http.client.HTTPConnection] = []
+        self.resume_at = 0.0
+        self.connections_opened = 0
+
+    def _connect(self) -> http.client.HTTPConnection:
+        self.connections_opened += 1
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return cls(self.netloc, timeout=self.timeout)
+
+    @staticmethod
+    def _roundtrip(conn, path: str, headers: dict) -> tuple[int, dict, bytes]:
+        conn.request("GET", path, headers=headers)
+        resp = conn.getresponse()
+        body = resp.read()  # must drain fully before the socket can be reused
+        return resp.status, {k.lower(): v for k, v in resp.getheaders()}, body
+
+    async def get(self, path: str, headers: dict) -> tuple[int, dict, bytes]:
+        async with self.semaphore:
+            delay = self.resume_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            reused = bool(self.idle)
+            conn = self.idle.pop() if reused else self._connect()
+            start = time.perf_counter()
+            try:
+                try:
+                    result = await asyncio.to_thread(self._roundtrip, conn, path, headers)
+                except _STALE:
+                    if not reused:
+                        raise
+                    # The server closed an idle keep-alive socket; reconnect once
+                    conn.close()
+                    conn = self._connect()
+                    result = await asyncio.to_thread(self._roundtrip, conn, path, headers)
+            except BaseException:
+                conn.close()
+                profiling.record_http(self.host, None, time.perf_counter() - start)
+                raise
+            profiling.record_http(self.host, result[0], time.perf_counter() - start)
+            self.idle.append(conn)
+            return result
+
+    def close(self):
+        for conn in self.idle:
+            conn.close()
+        self.idle.clear()
+
+
+class RegistryClient:
+    """Pooled, rate-limit-aware registry API client. Use from one event loop."""
+
+    def __init__(self, limits: dict[str, int] | None = None,
+                 endpoints: dict[str, str] | None = None,
+                 timeout: float = 10.0, max_retries: int = 3,
+                 max_backoff: float = 60.0):
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.endpoints = endpoints or {}
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.pools: dict[str, _HostPool] = {}
+
+    def _pool(self, host: str) -> _HostPool:
+        if host not in self.pools:
+            self.pools[host] = _HostPool(
+                host,
+                self.endpoints.get(host, f"https://{host}"),
+                max(1, self.limits.get(host, DEFAULT_LIMIT)),
+                self.timeout,
+            )
+        return self.pools[host]
+
+    async def get(self, host: str, path: str, headers: dict | None = None) -> tuple[int, dict, bytes]:
+        """GET a path on a registry host, backing off and retrying on 429."""
+        pool = self._pool(host)
+        attempt = 0
+        while True:
+            status, resp_headers, body = await pool.get(path, headers or {})
+            if status != 429 or attempt >= self.max_retries:
+                return status, resp_headers, body
+            wait = min(self.max_backoff,
+                       retry_after_seconds(resp_headers.get("retry-after"), 2.0 ** attempt))
+            # Pause the whole host, not just this request
+            pool.resume_at = max(pool.resume_at, time.monotonic() + wait)
+            attempt += 1
+
+    async def check_image(self, image: str) -> tuple[str, bool, str]:
+        """Check one image: (image, exists, message); lookups follow plan_lookup()."""
+        image = image.strip()
+        plan = plan_lookup(image)
+        if plan[0] == "done":
+            return (image, plan[1], plan[2])
+        _, host, path = plan
+        try:
+            status, _, body = await self.get(host, path, {"Accept": "application/json"})
+        except Exception as e:
+            return (image, True, f"skipped (network error: {e})")
+        exists, message = interpret(host, status, body)
+        return (image, exists, message)
+
+    async def list_quay_tags(self, repo: str) -> tuple[int, set[str]]:
+        """Fetch every active tag of a quay.io repository, following pagination.
+
+        Returns (status, tags); status is the first non-200 answer, if any.
+        """
+        tags: set[str] = set()
+        page = 1
+        while True:
+            path = (f"/api/v1/repository/{repo}/tag/"
+                    f"?limit={QUAY_PAGE_SIZE}&page={page}&onlyActiveTags=true")
+            status, _, body = await self.get(QUAY, path, {"Accept": "application/json"})
+            if status != 200:
+                return status, tags
+            data = json.loads(body)
+            tags.update(t["name"] for t in data.get("tags", []) if "name" in t)
+            if not data.get("has_additional"):
+                return 200, tags
+            page += 1
+
+    async def check_repository(self, repo: str, images: list[str]) -> list[tuple[str, bool, str]]:
+        """Verify several tags of one quay.io repository with a single listing.
+
+        Falls back to per-image queries if the listing fails for any reason
+        other than the repository not existing.
+        """
+        try:
+            status, tags = await self.list_quay_tags(repo)
+        except Exception:
+            status = None
+        if status == 404:
+            return [(img, False, "tag not found (HTTP 404)") for img in images]
+        if status != 200:
+            return [await self.check_image(img) for img in images]
+        results = []
+        for img in images:
+            if quay_repository(img)[1] in tags:
+                results.append((img, True, "verified on quay.io"))
+            else:
+                results.append((img, False, "tag not found on quay.io"))
+        return results
+
+    async def check_images(self, images, batch: bool = False,
+                           progress_every: int = 10) -> dict[str, tuple[bool, str]]:
+        """Check many images concurrently; returns {image: (exists, message)}.
+
+        With batch=True, quay.io repositories wanted at two or more tags are
+        verified from one tag listing; a lone tag is still a specificTag query,
+        which is cheaper than paging through a large repository.
+        """
+        images = [img.strip() for img in images]
+        singles = images
+        repos: dict[str, list[str]] = {}
+        if batch:
+            singles = []
+            for img in images:
+                split = quay_repository(img)
+                if split:
+                    repos.setdefault(split[0], []).append(img)
+                else:
+                    singles.append(img)
+            for repo in [r for r, imgs in repos.items() if len(imgs) < 2]:
+                singles.extend(repos.pop(repo))
+
+        async def one(img):
+            return [await self.check_image(img)]
+
+        tasks = [asyncio.create_task(one(img)) for img in singles]
+        tasks += [asyncio.create_task(self.check_repository(repo, imgs))
+                  for repo, imgs in repos.items()]
+        results = {}
+        for task in asyncio.as_completed(tasks):
+            for image, exists, message in await task:
+                results[image] = (exists, message)
+                if progress_every and len(results) % progress_every == 0:
+                    print(f"  Checked {len(results)}/{len(images)} images...", file=sys.stderr)
+        return results
+
+    def close(self):
+        for pool in self.pools.values():
+            pool.close()
+
+    def stats(self) -> dict[str, int]:
+        """Connections opened per host (for checking that pooling works)."""
+        return {host: pool.connections_opened for host, pool in self.pools.items()}
+
+
+def check_images(images, limits: dict[str, int] | None = None,
+                 endpoints: dict[str, str] | None = None,
+                 timeout: float = 10.0, batch: bool = False) -> dict[str, tuple[bool, str]]:
+    """Synchronous entry point: verify `images` with a fresh pooled client."""
+    async def run():
+        client = RegistryClient(limits=limits, endpoints=endpoints, timeout=timeout)
+        try:
+            return await client.check_images(images, batch=batch)
+        finally:
+            client.close()
+    return asyncio.run(run())
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""Local stand-in for the quay.io and Docker Hub tag APIs.
+
+Serves the two endpoints registry_client.py calls, over HTTP/1.1 keep-alive,
+from a fixed set of "published" images, so tag verification can be exercised
+without network access or registry rate limits:
+
+    GET /api/v1/repository/<ns>/<name>/tag/?specificTag=<tag>   (quay.io)
+    GET /api/v1/repository/<ns>/<name>/tag/?limit=<n>&page=<p>  (quay.io listing)
+    GET /v2/repositories/<ns>/<name>/tags/<tag>                 (Docker Hub)
+
+Usage:
+    python registry_stub.py                       # every image in this repo exists
+    python registry_stub.py --images images.txt   # only the listed images exist
+    python registry_stub.py --throttle 5          # every 5th request gets a 429
+
+then point the validator at it:
+    python validate_manifests.py --check-tags --no-tag-cache \\
+        --registry-endpoint quay.io=http://127.0.0.1:8765 \\
+        --registry-endpoint hub.docker.com=http://127.0.0.1:8765
+
+In-process use (e.g. from a test): `server = start_stub(images)` returns a
+running RegistryStub; read `server.url`, `server.requests` and
+`server.connections`, and call `server.shutdown()` when done.
+"""
+
+import argparse
+import json
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from manifest_loader import collect_images, load_manifests
+
+ROOT = Path(__file__).parent.resolve()
+
+
+class RegistryStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, images: set[str], throttle: int = 0, retry_after: int = 1):
+        super().__init__(address, _Handler)
+        self.images = {img.strip() for img in images}
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def has_tag(self, repo: str, tag: str) -> bool:
+        return f"{repo}:{tag}" in self.images
+
+    def repo_tags(self, repo: str) -> list[str]:
+        return sorted(img.rsplit(":", 1)[1] for img in self.images
+                      if ":" in img and img.rsplit(":", 1)[0] == repo)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, payload: dict | None = None, headers: dict | None = None):
+        body = json.dumps(payload or {}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            throttled = server.throttle and server.requests % server.throttle == 0
+        if throttled:
+            self._send(429, {"error": "rate limited"}, {"Retry-After": str(server.retry_after)})
+            return
+
+        url = urllib.parse.urlsplit(self.path)
+        parts = [urllib.parse.unquote(p) for p in url.path.strip("/").split("/")]
+
+        # quay.io: /api/v1/repository/<ns>/<name>/tag/
+        if parts[:3] == ["api", "v1", "repository"] and len(parts) == 6 and parts[5] == "tag":
+            repo = f"quay.io/{parts[3]}/{parts[4]}"
+            query = urllib.parse.parse_qs(url.query)
+            if "specificTag" in query:
+                tag = query["specificTag"][0]
+                tags = [{"name": tag}] if server.has_tag(repo, tag) else []
+                self._send(200, {"tags": tags, "page": 1, "has_additional": False})
+                return
+            all_tags = server.repo_tags(repo)
+            if not all_tags:
+                self._send(404, {"error_message": "Not Found"})
+                return
+            limit = int(query.get("limit", ["50"])[0])
+            page = int(query.get("page", ["1"])[0])
+            chunk = all_tags[(page - 1) * limit:page * limit]
+            self._send(200, {"tags": [{"name": t} for t in chunk], "page": page,
+                             "has_additional": page * limit < len(all_tags)})
+            return
+
+        # Docker Hub: /v2/repositories/<ns>/<name>/tags/<tag>
+        if parts[:2] == ["v2", "repositories"] and len(parts) == 6 and parts[4] == "tags":
+            ns, name, tag = parts[2], parts[3], parts[5]
+            repo = name if ns == "library" else f"{ns}/{name}"
+            if server.has_tag(repo, tag):
+                self._send(200, {"name": tag})
+            else:
+                self._send(404, {"message": "object not found"})
+            return
+
+        self._send(404, {"message": "unknown endpoint"})
+
+
+def start_stub(images: set[str], host: str = "127.0.0.1", port: int = 0,
+               throttle: int = 0, retry_after: int = 1) -> RegistryStub:
+    """Start a stub registry on a background thread and return it."""
+    server = RegistryStub((host, port), images, throttle=throttle, retry_after=retry_after)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve a stand-in quay.io/Docker Hub tag API.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--images", type=Path,
+                    help="file of image references that exist (default: all images in this repo)")
+    ap.add_argument("--throttle", type=int, default=0, metavar="N",
+                    help="answer every Nth request with 429 Too Many Requests")
+    ap.add_argument("--retry-after", type=int, default=1, metavar="SECONDS")
+    args = ap.parse_args()
+
+    if args.images:
+        images = {line.strip() for line in args.images.read_text().splitlines() if line.strip()}
+    else:
+        images = collect_images(load_manifests(ROOT))
+
+    server = RegistryStub((args.host, args.port), images,
+                          throttle=args.throttle, retry_after=args.retry_after)
+    print(f"Serving {len(images)} images at {server.url} (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"{server.requests} requests over {server.connections} connections")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""Run sibling-mapping checks for update_derived_crates.py --verify-siblings.
+
+A sibling mapping claims that command X ships inside the image a source crate
+pins for package Y (bgzip inside biobase's htslib image). Checking one means
+starting that image and asking `command -v X`, which costs a full image pull.
+So checks are:
+
+- grouped by image: every command wanted from one image is probed in a single
+  container start (hisat2-build and hisat2-inspect share one);
+- run concurrently, at most `jobs` containers at a time;
+- cached by image reference in .build_cache/sibling_checks.json. A pinned tag
+  (hisat2:2.2.2--h503566f_0) or digest names fixed content, so its answer is
+  kept until a command not yet asked about comes up. `latest` and untagged
+  images are never cached.
+
+Runners: `apptainer` and `docker` start real containers; `stub` answers from
+a YAML file mapping images to the commands they contain, for tests and dry
+runs without a container runtime.
+
+write_verified() records a passed check in the crate sources file by editing
+the text, so comments and layout survive: `verified` gets the date and
+`verified_image` the image the check ran against.
+"""
+
+import abc
+import asyncio
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+import yaml
+
+CACHE_VERSION = 1
+
+# Prints "<command>\t<path>" per argument; the path is empty when not found
+PROBE = 'for c in "$@"; do printf \'%s\\t%s\\n\' "$c" "$(command -v "$c" || true)"; done'
+
+
+class ProbeError(Exception):
+    """The container could not be started or the probe failed."""
+
+
+class Runner(abc.ABC):
+    """Answers whether images contain commands; `cacheable` answers may be cached."""
+
+    name: str
+    cacheable = True
+
+    @abc.abstractmethod
+    async def probe(self, image: str, commands: list[str]) -> dict[str, str | None]:
+        """Return {command: path inside the image, or None if absent}."""
+
+
+class ContainerRunner(Runner):
+    """Probe an image for commands by starting a container (see argv())."""
+
+    @abc.abstractmethod
+    def argv(self, image: str, commands: list[str]) -> list[str]:
+        """The command line that runs PROBE with `commands` in `image`."""
+
+    async def probe(self, image, commands):
+        proc = await asyncio.create_subprocess_exec(
+            *self.argv(image, commands),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        out, err = await proc.communicate()
+        if proc.returncode != 0:
+            lines = err.decode(errors="replace").strip().splitlines()
+            raise ProbeError(f"{self.name} exited {proc.returncode}: "
+                             f"{lines[-1] if lines else 'no output'}")
+        found = {}
+        for line in out.decode(errors="replace").splitlines():
+            command, _, path = line.partition("\t")
+            found[command] = path.strip() or None
+        return {c: found.get(c) for c in commands}
+
+
+class ApptainerRunner(ContainerRunner):
+    name = "apptainer"
+
+    def argv(self, image, commands):
+        return ["apptainer", "exec", f"docker://{image}", "sh", "-c", PROBE, "probe", *commands]
+
+
+class DockerRunner(ContainerRunner):
+    name = "docker"
+
+    def argv(self, image, commands):
+        return ["docker", "run", "--rm", "--entrypoint", "sh", image, "-c", PROBE,
+                "probe", *commands]
+
+
+class StubRunner(Runner):
+    """Answers from {image: [command, ...]}; an unlisted image fails to start."""
+
+    name = "stub"
+    cacheable = False  # stub answers must never reach the real cache
+
+    def __init__(self, contents: dict[str, list[str]]):
+        self.contents = contents
+
+    @classmethod
+    def from_file(cls, path: Path) -> "StubRunner":
+        return cls(yaml.safe_load(path.read_text()) or {})
+
+    async def probe(self, image, commands):
+        if image not in self.contents:
+            raise ProbeError(f"stub has no image {image}")
+        present = set(self.contents[image] or [])
+        return {c: f"/usr/local/bin/{c}" if c in present else None for c in commands}
+
+
+RUNNERS = {"apptainer": ApptainerRunner, "docker": DockerRunner}
+
+
+def cacheable_image(image: str) -> bool:
+    """True for digests and pinned tags; `latest` and untagged images can move."""
+    if "@sha256:" in image:
+        return True
+    last = image.rsplit("/", 1)[-1]
+    return ":" in last and last.rsplit(":", 1)[1] != "latest"
+
+
+class CheckCache:
+    """Probe results per image: {"version": 1, "images": {image: {"commands": {...}, "checked": epoch}}}."""
+
+    def __init__(self, path: Path | None):
+        self.path = path
+        self.images: dict[str, dict] = {}
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: Path | None) -> "CheckCache":
+        cache = cls(path)
+        if path is None or not path.exists():
+            return cache
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError) as e:
+            print(f"  WARNING: ignoring unreadable sibling check cache {path}: {e}",
+                  file=sys.stderr)
+            return cache
+        if data.get("version") == CACHE_VERSION:
+            cache.images = data.get("images") or {}
+        return cache
+
+    def get(self, image: str, commands: list[str]) -> dict[str, str | None] | None:
+        """Cached answers for all of `commands`, or None if any is missing."""
+        known = (self.images.get(image) or {}).get("commands") or {}
+        if not all(c in known for c in commands):
+            return None
+        return {c: known[c] for c in commands}
+
+    def put(self, image: str, found: dict[str, str | None]):
+        entry = self.images.setdefault(image, {"commands": {}})
+        entry["commands"].update(found)
+        entry["checked"] = time.time()
+        self.dirty = True
+
+    def save(self):
+        if self.path is None or not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": CACHE_VERSION, "images": self.images},
+                                  indent=1, sort_keys=True))
+        tmp.replace(self.path)
+
+
+def run_checks(wanted: dict[str, set[str]], runner: Runner, cache: CheckCache,
+               jobs: int = 4) -> dict[str, dict]:
+    """Probe every image for its wanted commands.
+
+    Returns {image: {"found": {command: path | None}, "cached": bool,
+    "error": str | None}}.
+    """
+    results: dict[str, dict] = {}
+    semaphore = asyncio.Semaphore(max(1, jobs))
+
+    async def one(image: str, commands: list[str]):
+        use_cache = runner.cacheable and cacheable_image(image)
+        cached = cache.get(image, commands) if use_cache else None
+        if cached is not None:
+            results[image] = {"found": cached, "cached": True, "error": None}
+            return
+        async with semaphore:
+            print(f"  Probing {image} for {', '.join(commands)}...", file=sys.stderr)
+            try:
+                found = await runner.probe(image, commands)
+            except (ProbeError, OSError) as e:
+                results[image] = {"found": {}, "cached": False, "error": str(e)}
+                return
+        if use_cache:
+            cache.put(image, found)
+        results[image] = {"found": found, "cached": False, "error": None}
+
+    async def main():
+        await asyncio.gather(*(one(image, sorted(commands))
+                               for image, commands in sorted(wanted.items())))
+
+    asyncio.run(main())
+    return results
+
+
+def _block_bounds(lines: list[str], name: str) -> tuple[int, int] | None:
+    """[head, end) line range of `  <name>:` under the top-level `siblings:` key."""
+    if "siblings:" not in lines:
+        return None
+    head = None
+    for i in range(lines.index("siblings:") + 1, len(lines)):
+        line = lines[i]
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        if head is None:
+            if not line.startswith(" "):
+                return None  # left the siblings mapping
+            if re.fullmatch(rf"  {re.escape(name)}:\s*", line):
+                head = i
+        elif not line.startswith("    "):
+            return head, i
+    return (head, len(lines)) if head is not None else None
+
+
+def write_verified(text: str, name: str, date: str, image: str) -> str:
+    """Set `verified` and `verified_image` of sibling `name` in sources-file text."""
+    lines = text.split("\n")
+    bounds = _block_bounds(lines, name)
+    if bounds is None:
+        raise ValueError(f"no siblings entry for {name}")
+    head, end = bounds
+    # Trailing blank or comment lines belong to whatever follows
+    while end - 1 > head and (not lines[end - 1].strip() or lines[end - 1].lstrip().startswith("#")):
+        end -= 1
+    block = lines[head + 1:end]
+    verified = f'    verified: "{date}"'
+    verified_image = f"    verified_image: {image}"
+    block = [line for line in block if not line.startswith("    verified_image:")]
+    for i, line in enumerate(block):
+        if line.startswith("    verified:"):
+            block[i:i + 1] = [verified, verified_image]
+            break
+    else:
+        block += [verified, verified_image]
+    return "\n".join(lines[:head + 1] + block + lines[end:])
@@ -0,0 +1,88 @@
+"""Persistent cache of registry image-tag lookups for validate_manifests.py.
+
+Pinned tags such as quay.io/biocontainers/bcftools:1.24--h487d631_1 do not
+change once published, so a positive lookup is trusted for a long time. A
+network error or rate-limit answer says nothing about the tag, so it expires
+quickly. A "not found" answer is never stored: it fails the run, and the
+re-run after the missing tag is pushed must ask the registry again.
+
+Stored as JSON, keyed by the full image reference:
+    {"version": 1, "images": {"<image>": {"exists": bool, "message": str, "checked": epoch}}}
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+CACHE_VERSION = 1
+
+TTL_VERIFIED = 90 * 24 * 3600  # tag confirmed on the registry
+TTL_SKIPPED = 600              # network error / unexpected HTTP status
+
+
+def ttl_for(exists: bool, message: str) -> int | None:
+    """How long a lookup result stays valid, or None if it should not be cached.
+
+    Results that never touched the network (untagged images, registries we
+    do not query) are cheap to recompute and are not stored; neither are
+    tags found missing.
+    """
+    if not exists:
+        return None
+    if message.startswith("verified"):
+        return TTL_VERIFIED
+    if "network error" in message or "HTTP" in message:
+        return TTL_SKIPPED
+    return None
+
+
+class TagCache:
+    def __init__(self, path: Path, now: float | None = None):
+        self.path = path
+        self.now = time.time() if now is None else now
+        self.images: dict[str, dict] = {}
+
+    @classmethod
+    def load(cls, path: Path, now: float | None = None) -> "TagCache":
+        cache = cls(path, now)
+        if not path.exists():
+            return cache
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError) as e:
+            print(f"  WARNING: ignoring unreadable tag cache {path}: {e}", file=sys.stderr)
+            return cache
+        if data.get("version") == CACHE_VERSION:
+            cache.images = data.get("images") or {}
+        return cache
+
+    def get(self, image: str) -> tuple[bool, str] | None:
+        """Return a cached (exists, message) if present and not expired."""
+        entry = self.images.get(image)
+        if not entry:
+            return None
+        ttl = ttl_for(entry["exists"], entry["message"])
+        if ttl is None or self.now - entry["checked"] > ttl:
+            return None
+        return entry["exists"], entry["message"]
+
+    def put(self, image: str, exists: bool, message: str):
+        if ttl_for(exists, message) is None:
+            return
+        self.images[image] = {"exists": exists, "message": message, "checked": self.now}
+
+    def prune(self):
+        """Drop expired entries so the file does not grow without bound."""
+        self.images = {
+            image: entry for image, entry in self.images.items()
+            if self.get(image) is not None
+        }
+
+    def save(self):
+        self.prune()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": CACHE_VERSION, "images": self.images},
+                                  indent=1, sort_keys=True))
+        tmp.replace(self.path)
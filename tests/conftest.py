@@ -0,0 +1,6 @@
+"""The tools are top-level scripts, not a package: import them from the repo root."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
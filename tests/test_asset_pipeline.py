@@ -0,0 +1,107 @@
+"""asset_pipeline: minification, precompression and the _headers rule limit."""
+
+import gzip
+from pathlib import Path
+
+import asset_pipeline
+
+PAGE = """<html>
+    <body>
+        <h1>  pepatac  </h1>
+
+        <pre>manifest:
+  name: databio/pepatac
+    commands:
+
+  - command: samtools</pre>
+        <TEXTAREA rows="3">  keep
+    this   </TEXTAREA>
+    </body>
+</html>
+"""
+
+
+def test_minify_html_keeps_pre_and_textarea():
+    assert asset_pipeline.minify_html(PAGE) == """<html>
+<body>
+<h1>  pepatac  </h1>
+<pre>manifest:
+  name: databio/pepatac
+    commands:
+
+  - command: samtools</pre>
+<TEXTAREA rows="3">  keep
+    this   </TEXTAREA>
+</body>
+</html>
+"""
+
+
+def test_minify_by_file_type():
+    assert asset_pipeline.minify(Path("a.json"), '{\n  "a": [1, 2]\n}') == '{"a":[1,2]}'
+    assert asset_pipeline.minify(Path("a.html"), "  <p>x</p>\n\n") == "<p>x</p>\n"
+    assert asset_pipeline.minify(Path("a.yaml"), "a:  1\n") == "a:  1\n"
+
+
+def test_precompress_is_deterministic(tmp_path):
+    big = tmp_path / "index.json"
+    big.write_text('{"crates": [' + ",".join(['"pepatac"'] * 500) + "]}")
+    (tmp_path / "small.json").write_text("{}")
+    (tmp_path / "image.png").write_bytes(b"\0" * 4096)
+
+    assert asset_pipeline.precompress(tmp_path) >= 1
+    sibling = tmp_path / "index.json.gz"
+    assert gzip.decompress(sibling.read_bytes()) == big.read_bytes()
+    assert not (tmp_path / "small.json.gz").exists()
+    assert not (tmp_path / "image.png.gz").exists()
+
+    first = sibling.read_bytes()
+    assert asset_pipeline.precompress(tmp_path) == 0  # unchanged: nothing rewritten
+    assert sibling.read_bytes() == first
+
+
+def publish(docs, tagged, mutable=()):
+    """Write docs/ns/<name> for every file; return {rel: crate} for the tagged ones."""
+    (docs / "ns").mkdir(parents=True, exist_ok=True)
+    for name in [*tagged, *mutable]:
+        (docs / "ns" / name).write_text(name)
+    return {f"ns/{name}": name.split("_", 1)[0] for name in tagged}
+
+
+def rules(docs):
+    return [line for line in (docs / "_headers").read_text().splitlines()
+            if line.startswith("/")]
+
+
+def test_headers_per_file_within_the_limit(tmp_path):
+    immutable = publish(tmp_path, ["pepatac_1.0.yaml", "pepatac_1.1.yaml"], ["pepatac.yaml"])
+    assert asset_pipeline.write_headers(tmp_path, immutable) == (2, 0)
+    text = (tmp_path / "_headers").read_text()
+    assert rules(tmp_path) == ["/ns/pepatac_1.0.yaml", "/ns/pepatac_1.1.yaml"]
+    assert text.count("ETag: ") == 2 and "immutable" in text
+
+
+def test_headers_fall_back_to_crate_splats(tmp_path):
+    tags = [f"pepatac_1.{n}.yaml" for n in range(60)] + [f"peppro_1.{n}.yaml" for n in range(60)]
+    immutable = publish(tmp_path, tags, ["pepatac.yaml", "pepatac.html"])
+    assert asset_pipeline.write_headers(tmp_path, immutable) == (2, 0)
+    assert rules(tmp_path) == ["/ns/pepatac_*", "/ns/peppro_*"]
+    assert "ETag" not in (tmp_path / "_headers").read_text()
+
+
+def test_headers_keep_per_file_rules_where_a_splat_would_clash(tmp_path):
+    # /ns/lab_* would also match lab_geofetch's latest pointer and page
+    tags = [f"lab_1.{n}.yaml" for n in range(3)] + [f"pepatac_1.{n}.yaml" for n in range(110)]
+    immutable = publish(tmp_path, tags, ["lab_geofetch.yaml", "lab_geofetch.html"])
+    assert asset_pipeline.write_headers(tmp_path, immutable) == (4, 0)
+    assert rules(tmp_path) == ["/ns/lab_1.0.yaml", "/ns/lab_1.1.yaml", "/ns/lab_1.2.yaml",
+                               "/ns/pepatac_*"]
+
+
+def test_headers_over_the_cap_leave_the_smallest_rules_out(tmp_path):
+    # 102 single-tag crates need 102 splats; lab's 3 tags need per-file rules
+    tags = [f"c{n:03}_1.0.yaml" for n in range(102)] + [f"lab_1.{n}.yaml" for n in range(3)]
+    immutable = publish(tmp_path, tags, ["lab_geofetch.yaml"])
+    assert asset_pipeline.write_headers(tmp_path, immutable) == (100, 5)
+    assert len(rules(tmp_path)) == asset_pipeline.MAX_HEADER_RULES
+    assert "/ns/c000_*" in rules(tmp_path)
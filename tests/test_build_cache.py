@@ -0,0 +1,62 @@
+"""BuildCache freshness and invalidation."""
+
+import os
+
+from build_cache import BuildCache
+
+
+def written(tmp_path, text="<p>page</p>"):
+    dest = tmp_path / "page.html"
+    dest.write_text(text)
+    cache = BuildCache(tmp_path / "build_cache.json", "gen-1")
+    cache.record_output("page.html", "key-1", dest)
+    return cache, dest
+
+
+def test_unchanged_output_is_fresh(tmp_path):
+    cache, dest = written(tmp_path)
+    assert cache.is_fresh("page.html", "key-1", dest)
+    assert not cache.is_fresh("page.html", "key-2", dest)
+    assert not cache.is_fresh("other.html", "key-1", dest)
+
+
+def test_new_mtime_with_same_bytes_is_fresh(tmp_path):
+    # A fresh checkout of docs/ gives every file a new mtime
+    cache, dest = written(tmp_path)
+    st = dest.stat()
+    os.utime(dest, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert cache.is_fresh("page.html", "key-1", dest)
+    assert cache.outputs["page.html"][2] == dest.stat().st_mtime_ns
+
+
+def test_edited_or_missing_output_is_stale(tmp_path):
+    cache, dest = written(tmp_path)
+    dest.write_text("<p>PAGE</p>")  # same size, other bytes
+    assert not cache.is_fresh("page.html", "key-1", dest)
+    dest.unlink()
+    assert not cache.is_fresh("page.html", "key-1", dest)
+
+
+def test_generator_change_drops_records_but_keeps_owned(tmp_path):
+    cache, dest = written(tmp_path)
+    cache.store_manifest("ns/a.yaml", "digest", {"name": "a"})
+    cache.owned = {"page.html"}
+    cache.save()
+
+    same = BuildCache.load(cache.path, "gen-1")
+    assert same.is_fresh("page.html", "key-1", dest)
+    assert same.lookup_manifest("ns/a.yaml", "digest") == {"name": "a"}
+    assert same.lookup_manifest("ns/a.yaml", "other") is None
+
+    for other in (BuildCache.load(cache.path, "gen-2"),
+                  BuildCache.load(cache.path, "gen-1", reuse=False)):
+        assert other.outputs == {} and other.manifests == {}
+        assert other.owned == {"page.html"}
+
+
+def test_unreadable_cache_starts_empty(tmp_path, capsys):
+    path = tmp_path / "build_cache.json"
+    path.write_text("{")
+    cache = BuildCache.load(path, "gen-1")
+    assert cache.outputs == {} and cache.owned == set()
+    assert "ignoring unreadable build cache" in capsys.readouterr().err
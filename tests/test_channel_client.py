@@ -0,0 +1,109 @@
+"""channel_client against the channel_stub.py stand-in for a remote channel."""
+
+import json
+import time
+
+import pytest
+import yaml
+
+import build_site
+import channel_client
+from channel_client import ChannelCache, ChannelError
+from channel_stub import start_stub
+
+MANIFESTS = [
+    {"namespace": "lab", "name": "tools", "tag": "1.0.0", "version": "1.0.0",
+     "commands": ["samtools", "bedtools"], "description": "Lab tools"},
+    {"namespace": "lab", "name": "tools", "tag": "1.1.0", "version": "1.1.0",
+     "commands": ["samtools", "bedtools", "bgzip"], "description": "Lab tools"},
+    {"namespace": "lab", "name": "tools", "tag": "default", "version": "0.9.0",
+     "commands": ["samtools"], "description": ""},
+    {"namespace": "lab", "tag": "1.0.0"},  # no name: dropped
+]
+INDEX_JSON = json.dumps({"manifests": MANIFESTS}).encode()
+INDEX_YAML = yaml.safe_dump({"manifests": MANIFESTS}).encode()
+
+
+@pytest.fixture
+def stub():
+    server = start_stub({"index.json": INDEX_JSON})
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def channels(server):
+    return [{"name": "lab", "url": server.url}]
+
+
+def test_fetch_then_not_modified(stub):
+    status, entry = channel_client.fetch_channel(stub.url, None, timeout=5)
+    assert status == "fetched"
+    assert entry["source"] == "index.json" and entry["etag"]
+    assert [(e["tag"], e["version"]) for e in entry["manifests"]] == [
+        ("1.0.0", "1.0.0"), ("1.1.0", "1.1.0"), ("default", "0.9.0")]
+
+    status, again = channel_client.fetch_channel(stub.url, entry, timeout=5)
+    assert status == "not modified"
+    assert again["manifests"] == entry["manifests"] and again["checked"] >= entry["checked"]
+    assert stub.requests == 2 and stub.not_modified == 1
+
+
+def test_changed_index_is_fetched_again(stub):
+    _, entry = channel_client.fetch_channel(stub.url, None, timeout=5)
+    stub.files["index.json"] = json.dumps({"manifests": MANIFESTS[:1]}).encode()
+    status, entry = channel_client.fetch_channel(stub.url, entry, timeout=5)
+    assert status == "fetched" and len(entry["manifests"]) == 1
+
+
+def test_yaml_only_channel(stub):
+    stub.files = {"index.yaml": INDEX_YAML}
+    status, entry = channel_client.fetch_channel(stub.url, None, timeout=5)
+    assert status == "fetched" and entry["source"] == "index.yaml"
+    assert stub.requests == 2  # index.json was a 404
+
+    # Later fetches start with index.yaml, conditionally
+    status, _ = channel_client.fetch_channel(stub.url, entry, timeout=5)
+    assert status == "not modified" and stub.requests == 3
+
+
+def test_not_an_index(stub):
+    stub.files["index.json"] = b'{"crates": []}'
+    with pytest.raises(ChannelError, match="not a bulker index"):
+        channel_client.fetch_channel(stub.url, None, timeout=5)
+    stub.files["index.json"] = b"{"
+    with pytest.raises(ChannelError, match="unparseable index.json"):
+        channel_client.fetch_channel(stub.url, None, timeout=5)
+
+
+def test_failed_fetch_uses_last_good_index(stub, tmp_path):
+    cache = ChannelCache(tmp_path / "channels.json")
+    results = channel_client.refresh(channels(stub), cache, timeout=5)
+    assert results["lab"]["status"] == "fetched"
+    cache.save()
+
+    stub.fail = 503
+    cache = ChannelCache.load(tmp_path / "channels.json")
+    results = channel_client.refresh(channels(stub), cache, timeout=5)
+    assert results["lab"]["status"] == "stale"
+    assert results["lab"]["error"] == "HTTP 503 for index.json"
+    assert len(results["lab"]["entry"]["manifests"]) == 3
+
+    results = channel_client.refresh(channels(stub), ChannelCache(None), timeout=5)
+    assert results["lab"]["status"] == "unavailable" and results["lab"]["entry"] is None
+
+
+def test_slow_body_is_cut_off_at_the_timeout(stub):
+    stub.drip = 0.05  # the index would take minutes to arrive
+    start = time.perf_counter()
+    results = channel_client.refresh(channels(stub), ChannelCache(None), timeout=1)
+    elapsed = time.perf_counter() - start
+    assert results["lab"]["status"] == "unavailable"
+    assert results["lab"]["error"] == "timed out after 1s"
+    assert elapsed < 2
+
+
+def test_remote_latest_tag_follows_version():
+    entries = channel_client.compact_manifests({"manifests": MANIFESTS})
+    latest = build_site._remote_crates(entries)
+    assert latest[("lab", "tools")]["tag"] == "1.1.0"
@@ -0,0 +1,93 @@
+"""ImportGraph: resolving import references and walking the graph."""
+
+import pytest
+import yaml
+
+from manifest_graph import ImportCycleError, ImportGraph, parse_import
+from manifest_loader import load_manifests
+
+
+def write(root, rel, version, commands=(), imports=()):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    name = f"{path.parent.name}/{path.stem.split('_', 1)[0]}"
+    manifest = {"name": name, "version": version}
+    if imports:
+        manifest["imports"] = list(imports)
+    manifest["commands"] = [{"command": c, "docker_image": image} for c, image in commands]
+    path.write_text(yaml.safe_dump({"manifest": manifest}, sort_keys=False))
+
+
+@pytest.fixture
+def root(tmp_path):
+    write(tmp_path, "ns/base_1.0.0.yaml", "1.0.0", [("sh", "base:1"), ("ls", "base:1")])
+    write(tmp_path, "ns/base_2.0.0.yaml", "2.0.0", [("sh", "base:2")])
+    write(tmp_path, "ns/extra_1.0.0.yaml", "1.0.0", [("ls", "extra:1"), ("grep", "extra:1")],
+          imports=["ns/base:1.0.0"])
+    write(tmp_path, "ns/tools_1.0.0.yaml", "1.0.0", [("sh", "tools:1")],
+          imports=["ns/base:default", "ns/extra:1.0.0", "ns/gone:1.0"])
+    return tmp_path
+
+
+def test_parse_import():
+    assert parse_import("ns/base:1.0.0") == ("ns", "base", "1.0.0")
+    assert parse_import("ns/base") == ("ns", "base", "default")
+    assert parse_import("base:1.0.0") is None
+    assert parse_import(None) is None
+
+
+def test_resolve_follows_the_latest_pointer(root):
+    graph = ImportGraph(load_manifests(root))
+    assert graph.resolve("ns/base:default") == "ns/base_2.0.0.yaml"
+    assert graph.resolve("ns/base") == "ns/base_2.0.0.yaml"
+    assert graph.resolve("ns/base:1.0.0") == "ns/base_1.0.0.yaml"
+    assert graph.resolve("ns/base:3.0.0") is None
+    assert graph.dangling == {"ns/tools_1.0.0.yaml": ["ns/gone:1.0"]}
+    assert graph.importers["ns/base_1.0.0.yaml"] == {"ns/extra_1.0.0.yaml"}
+
+
+def test_closure_is_depth_first_in_listed_order(root):
+    graph = ImportGraph(load_manifests(root))
+    assert graph.closure("ns/tools_1.0.0.yaml") == [
+        "ns/tools_1.0.0.yaml", "ns/base_2.0.0.yaml", "ns/extra_1.0.0.yaml", "ns/base_1.0.0.yaml"]
+
+
+def test_import_cycle(tmp_path):
+    write(tmp_path, "ns/a_1.0.yaml", "1.0", imports=["ns/b:1.0"])
+    write(tmp_path, "ns/b_1.0.yaml", "1.0", imports=["ns/c:1.0"])
+    write(tmp_path, "ns/c_1.0.yaml", "1.0", imports=["ns/a:default"])
+    graph = ImportGraph(load_manifests(tmp_path))
+    with pytest.raises(ImportCycleError) as raised:
+        graph.closure("ns/a_1.0.yaml")
+    assert raised.value.cycle == ["ns/a:1.0", "ns/b:1.0", "ns/c:1.0", "ns/a:1.0"]
+    assert str(raised.value) == "import cycle: ns/a:1.0 -> ns/b:1.0 -> ns/c:1.0 -> ns/a:1.0"
+
+
+def test_dependents(root):
+    graph = ImportGraph(load_manifests(root))
+    assert graph.dependents(["ns/base_1.0.0.yaml"]) == {"ns/extra_1.0.0.yaml",
+                                                        "ns/tools_1.0.0.yaml"}
+    # A concrete tag: every importer of that file
+    assert graph.direct_dependents("ns/base:2.0.0") == {"ns/tools_1.0.0.yaml"}
+    # The default pointer: only what imports the pointer itself
+    assert graph.direct_dependents("ns/base:default") == {"ns/tools_1.0.0.yaml"}
+    assert graph.direct_dependents("ns/extra:default") == set()
+    assert graph.dependents_of("ns/base:1.0.0") == {"ns/extra_1.0.0.yaml",
+                                                    "ns/tools_1.0.0.yaml"}
+    assert graph.dependents_of("ns/nosuch:1.0") is None
+
+
+def test_flatten_first_listed_command_wins(root):
+    graph = ImportGraph(load_manifests(root))
+    manifest = graph.flatten("ns/tools_1.0.0.yaml")["manifest"]
+    assert "imports" not in manifest
+    assert [(c["command"], c["docker_image"], c["provenance"]) for c in manifest["commands"]] == [
+        ("sh", "tools:1", "ns/tools:1.0.0"),
+        ("ls", "extra:1", "ns/extra:1.0.0"),
+        ("grep", "extra:1", "ns/extra:1.0.0"),
+    ]
+    assert manifest["resolved_imports"] == [
+        {"ref": "ns/base:2.0.0", "path": "ns/base_2.0.0.yaml"},
+        {"ref": "ns/extra:1.0.0", "path": "ns/extra_1.0.0.yaml"},
+        {"ref": "ns/base:1.0.0", "path": "ns/base_1.0.0.yaml"},
+    ]
@@ -0,0 +1,90 @@
+"""registry_client against the registry_stub.py stand-in for quay.io and Docker Hub."""
+
+import time
+
+import pytest
+
+import registry_client
+from registry_client import DOCKER_HUB, QUAY
+from registry_stub import start_stub
+
+PUBLISHED = {
+    "quay.io/biocontainers/samtools:1.19--h50ea8bc_0",
+    "quay.io/biocontainers/samtools:1.21--h50ea8bc_0",
+    "quay.io/biocontainers/samtools:1.23--h96c455f_0",
+    "quay.io/biocontainers/bedtools:2.31.1--hf5e1c6e_2",
+    "databio/pepatac:1.0.14",
+    "ubuntu:22.04",
+}
+
+WANTED = [
+    "quay.io/biocontainers/samtools:1.19--h50ea8bc_0",
+    "quay.io/biocontainers/samtools:1.21--h50ea8bc_0",
+    "quay.io/biocontainers/samtools:1.22--missing_0",  # repository exists, tag does not
+    "quay.io/biocontainers/bedtools:2.31.1--hf5e1c6e_2",
+    "quay.io/biocontainers/bedtools:2.30.0--missing_0",
+    "quay.io/biocontainers/nosuchtool:1.0--0",  # no such repository
+    "quay.io/biocontainers/nosuchtool:1.1--0",
+    "databio/pepatac:1.0.14",
+    "databio/pepatac:0.0.1",
+    "ubuntu:22.04",
+    "ubuntu",  # untagged: never queried
+]
+
+
+@pytest.fixture
+def stub():
+    server = start_stub(PUBLISHED)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def endpoints(server):
+    return {QUAY: server.url, DOCKER_HUB: server.url}
+
+
+def test_single_and_batch_agree(stub):
+    single = registry_client.check_images(WANTED, endpoints=endpoints(stub))
+    single_requests = stub.requests
+    batch = registry_client.check_images(WANTED, endpoints=endpoints(stub), batch=True)
+    batch_requests = stub.requests - single_requests
+
+    assert {img: exists for img, (exists, _) in single.items()} == \
+           {img: exists for img, (exists, _) in batch.items()}
+    assert {img for img, (exists, _) in batch.items() if not exists} == {
+        "quay.io/biocontainers/samtools:1.22--missing_0",
+        "quay.io/biocontainers/bedtools:2.30.0--missing_0",
+        "quay.io/biocontainers/nosuchtool:1.0--0",
+        "quay.io/biocontainers/nosuchtool:1.1--0",
+        "databio/pepatac:0.0.1",
+    }
+    # One listing per quay.io repository instead of one query per tag
+    assert batch_requests == 3 + 3
+    assert single_requests == 7 + 3
+
+
+def test_requests_share_keep_alive_connections(stub):
+    images = [f"quay.io/biocontainers/samtools:{n}" for n in range(40)]
+    registry_client.check_images(images, limits={QUAY: 2}, endpoints=endpoints(stub))
+    assert stub.requests == 40
+    assert stub.connections <= 2
+
+
+def test_rate_limited_requests_wait_for_retry_after(stub):
+    stub.throttle = 3  # every third request answers 429, Retry-After: 1
+    start = time.monotonic()
+    results = registry_client.check_images(WANTED, endpoints=endpoints(stub))
+    elapsed = time.monotonic() - start
+
+    assert all(not message.startswith("skipped") for _, message in results.values())
+    assert results["quay.io/biocontainers/samtools:1.19--h50ea8bc_0"] == (True, "verified on quay.io")
+    assert stub.requests > 10  # the throttled requests were retried
+    assert elapsed >= 1.0
+
+
+def test_retry_after_seconds():
+    assert registry_client.retry_after_seconds("7", 2.0) == 7.0
+    assert registry_client.retry_after_seconds(None, 2.0) == 2.0
+    assert registry_client.retry_after_seconds("soon", 2.0) == 2.0
+    assert registry_client.retry_after_seconds("Thu, 01 Jan 1970 00:00:00 GMT", 2.0) == 0.0
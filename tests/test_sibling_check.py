@@ -0,0 +1,137 @@
+"""sibling_check and update_derived_crates.run_sibling_checks, using the stub runner."""
+
+import pytest
+
+import sibling_check
+import update_derived_crates
+from sibling_check import CheckCache, StubRunner
+
+HISAT2 = "quay.io/biocontainers/hisat2:2.2.2--h503566f_0"
+HTSLIB = "quay.io/biocontainers/htslib:1.24--ha79157c_0"
+LATEST = "databio/epilog:latest"
+
+CONTENTS = {
+    HISAT2: ["hisat2", "hisat2-build", "hisat2-inspect"],
+    HTSLIB: ["tabix", "bgzip"],
+    LATEST: ["epilog"],
+}
+
+SOURCES = """\
+target_crate: databio/refgenie
+siblings:
+  hisat2-build:
+    sibling_of: hisat2
+    # checked by hand
+    verified: "2026-07-23"
+  bgzip:
+    sibling_of: tabix
+    verified: "2026-07-23"
+    verified_image: quay.io/biocontainers/htslib:1.24--ha79157c_0
+
+# Overrides follow
+overrides: {}
+"""
+
+
+class CountingRunner(StubRunner):
+    """A stub that counts container starts and, like a real runtime, may be cached."""
+
+    name = "counting"
+    cacheable = True
+
+    def __init__(self, contents):
+        super().__init__(contents)
+        self.starts = []
+
+    async def probe(self, image, commands):
+        self.starts.append(image)
+        return await super().probe(image, commands)
+
+
+def test_one_container_start_per_image():
+    runner = CountingRunner(CONTENTS)
+    wanted = {HISAT2: {"hisat2-build", "hisat2-inspect"}, HTSLIB: {"bgzip"}}
+    results = sibling_check.run_checks(wanted, runner, CheckCache(None))
+    assert sorted(runner.starts) == [HISAT2, HTSLIB]
+    assert results[HISAT2]["found"] == {"hisat2-build": "/usr/local/bin/hisat2-build",
+                                        "hisat2-inspect": "/usr/local/bin/hisat2-inspect"}
+    assert results[HTSLIB]["error"] is None
+
+
+def test_pinned_images_are_cached_and_latest_is_not(tmp_path):
+    path = tmp_path / "sibling_checks.json"
+    wanted = {HISAT2: {"hisat2-build"}, LATEST: {"epilog"}}
+    cache = CheckCache(path)
+    sibling_check.run_checks(wanted, CountingRunner(CONTENTS), cache)
+    cache.save()
+
+    runner = CountingRunner(CONTENTS)
+    results = sibling_check.run_checks(wanted, runner, CheckCache.load(path))
+    assert runner.starts == [LATEST]
+    assert results[HISAT2]["cached"] and not results[LATEST]["cached"]
+
+    # A command not asked about before needs the container again
+    runner = CountingRunner(CONTENTS)
+    sibling_check.run_checks({HISAT2: {"hisat2-inspect"}}, runner, CheckCache.load(path))
+    assert runner.starts == [HISAT2]
+
+
+def test_stub_answers_never_reach_the_cache():
+    cache = CheckCache(None)
+    results = sibling_check.run_checks({HISAT2: {"hisat2-build"}, "nosuch:1.0": {"x"}},
+                                       StubRunner(CONTENTS), cache)
+    assert cache.images == {} and not cache.dirty
+    assert results["nosuch:1.0"]["error"] == "stub has no image nosuch:1.0"
+
+
+def test_write_verified_keeps_layout():
+    text = sibling_check.write_verified(SOURCES, "hisat2-build", "2026-10-01", HISAT2)
+    assert text == SOURCES.replace(
+        '    verified: "2026-07-23"\n  bgzip:',
+        f'    verified: "2026-10-01"\n    verified_image: {HISAT2}\n  bgzip:')
+    text = sibling_check.write_verified(SOURCES, "bgzip", "2026-10-01", HTSLIB)
+    assert text.count("verified_image:") == 1
+    assert '\n# Overrides follow\n' in text
+    with pytest.raises(ValueError):
+        sibling_check.write_verified(SOURCES, "bowtie-build", "2026-10-01", HISAT2)
+
+
+def plan(sources_path):
+    return {
+        "target": "databio/refgenie",
+        "source": "bulker/biobase",
+        "sources_path": sources_path,
+        "sources": {"siblings": {"hisat2-build": {"sibling_of": "hisat2"},
+                                 "bgzip": {"sibling_of": "tabix", "verified_image": HTSLIB}}},
+        "source_commands": {"hisat2": {"docker_image": HISAT2},
+                            "tabix": {"docker_image": HTSLIB}},
+    }
+
+
+def test_passed_checks_are_written_back(tmp_path):
+    path = tmp_path / "refgenie_crate_sources.yaml"
+    path.write_text(SOURCES)
+    ok = update_derived_crates.run_sibling_checks(
+        [plan(path)], CountingRunner(CONTENTS), CheckCache(None), jobs=2)
+    assert ok
+    text = path.read_text()
+    # Only the mapping whose image had not been verified is rewritten
+    assert f"verified_image: {HISAT2}" in text
+    assert text.count('verified: "2026-07-23"') == 1
+
+
+def test_stub_runner_does_not_write_back(tmp_path):
+    path = tmp_path / "refgenie_crate_sources.yaml"
+    path.write_text(SOURCES)
+    ok = update_derived_crates.run_sibling_checks(
+        [plan(path)], StubRunner(CONTENTS), CheckCache(None), jobs=2)
+    assert ok
+    assert path.read_text() == SOURCES
+
+
+def test_missing_command_fails_the_run(tmp_path):
+    path = tmp_path / "refgenie_crate_sources.yaml"
+    path.write_text(SOURCES)
+    contents = {**CONTENTS, HTSLIB: ["tabix"]}
+    assert not update_derived_crates.run_sibling_checks(
+        [plan(path)], StubRunner(contents), CheckCache(None), jobs=2)
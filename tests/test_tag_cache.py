@@ -0,0 +1,47 @@
+"""TagCache expiry: what is stored, and for how long."""
+
+import tag_cache
+from tag_cache import TagCache
+
+NOW = 1_800_000_000.0
+VERIFIED = "quay.io/biocontainers/samtools:1.21--h50ea8bc_0"
+SKIPPED = "quay.io/biocontainers/bedtools:2.31.1--hf5e1c6e_2"
+MISSING = "quay.io/biocontainers/samtools:1.22--missing_0"
+
+
+def saved(tmp_path):
+    cache = TagCache(tmp_path / "tag_cache.json", now=NOW)
+    cache.put(VERIFIED, True, "verified on quay.io")
+    cache.put(SKIPPED, True, "skipped (network error: timed out)")
+    cache.put(MISSING, False, "tag not found (HTTP 404)")
+    cache.put("ubuntu", True, "no tag specified (uses :latest)")
+    cache.save()
+    return cache.path
+
+
+def test_answers_survive_until_their_ttl(tmp_path):
+    path = saved(tmp_path)
+    cache = TagCache.load(path, now=NOW + tag_cache.TTL_SKIPPED - 1)
+    assert cache.get(VERIFIED) == (True, "verified on quay.io")
+    assert cache.get(SKIPPED) == (True, "skipped (network error: timed out)")
+
+    cache = TagCache.load(path, now=NOW + tag_cache.TTL_SKIPPED + 1)
+    assert cache.get(VERIFIED) == (True, "verified on quay.io")
+    assert cache.get(SKIPPED) is None
+
+    cache = TagCache.load(path, now=NOW + tag_cache.TTL_VERIFIED + 1)
+    assert cache.get(VERIFIED) is None
+
+
+def test_missing_tags_and_offline_answers_are_not_stored(tmp_path):
+    cache = TagCache.load(saved(tmp_path), now=NOW)
+    assert cache.get(MISSING) is None
+    assert cache.get("ubuntu") is None
+    assert sorted(cache.images) == sorted([SKIPPED, VERIFIED])
+
+
+def test_save_prunes_expired_entries(tmp_path):
+    path = saved(tmp_path)
+    cache = TagCache.load(path, now=NOW + tag_cache.TTL_SKIPPED + 1)
+    cache.save()
+    assert list(TagCache.load(path, now=NOW).images) == [VERIFIED]
@@ -0,0 +1,67 @@
+"""update_derived_crates discovery and planning across several derived crates."""
+
+import pytest
+import yaml
+
+import update_derived_crates
+
+
+def manifest(path, name, version, commands):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(yaml.safe_dump({"manifest": {
+        "name": name, "version": version,
+        "commands": [{"command": c, "docker_image": image} for c, image in commands.items()],
+    }}, sort_keys=False))
+
+
+def sources(path, target, commands, **extra):
+    path.write_text(yaml.safe_dump({"target_crate": target, "source_crate": "bulker/biobase",
+                                    "commands": commands, **extra}, sort_keys=False))
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    monkeypatch.setattr(update_derived_crates, "ROOT", tmp_path)
+    manifest(tmp_path / "bulker/biobase_0.9.0.yaml", "bulker/biobase", "0.9.0",
+             {"samtools": "samtools:1.19", "hisat2": "hisat2:2.2.1"})
+    manifest(tmp_path / "bulker/biobase_0.10.0.yaml", "bulker/biobase", "0.10.0",
+             {"samtools": "samtools:1.21", "hisat2": "hisat2:2.2.2", "tabix": "htslib:1.24"})
+    manifest(tmp_path / "lab/refs_1.0.0.yaml", "lab/refs", "1.0.0",
+             {"samtools": "samtools:1.19", "hisat2-build": "hisat2:2.2.1"})
+    manifest(tmp_path / "lab/align_1.0.0.yaml", "lab/align", "1.0.0",
+             {"samtools": "samtools:1.21"})
+    sources(tmp_path / "refs_crate_sources.yaml", "lab/refs", ["samtools", "hisat2-build"],
+            siblings={"hisat2-build": {"sibling_of": "hisat2"}})
+    sources(tmp_path / "align_crate_sources.yaml", "lab/align", ["samtools", "bgzip"])
+    return tmp_path
+
+
+def test_discover_sources_finds_every_derived_crate(tree):
+    derived = update_derived_crates.discover_sources(tree)
+    assert sorted(derived) == ["lab/align", "lab/refs"]
+    assert derived["lab/refs"][0].name == "refs_crate_sources.yaml"
+
+    sources(tree / "refs2_crate_sources.yaml", "lab/refs", ["samtools"])
+    with pytest.raises(SystemExit, match="already derived by"):
+        update_derived_crates.discover_sources(tree)
+
+
+def test_plans_share_one_read_of_the_source_crate(tree):
+    derived = update_derived_crates.discover_sources(tree)
+    index = {}
+    plans = {target: update_derived_crates.plan_crate(target, *derived[target], index)
+             for target in sorted(derived)}
+    # Both resolve against the newest biobase (0.10.0 > 0.9.0), read once
+    assert list(index) == ["bulker/biobase"]
+    assert index["bulker/biobase"][0].name == "biobase_0.10.0.yaml"
+
+    refs = plans["lab/refs"]
+    assert refs["error"] is None
+    assert {e["command"]: e["docker_image"] for e in refs["entries"]} == {
+        "samtools": "samtools:1.21", "hisat2-build": "hisat2:2.2.2"}
+    assert refs["rows"]
+
+    # bgzip has no rule: this crate fails without affecting the other
+    align = plans["lab/align"]
+    assert align["error"].startswith("no source for: bgzip")
+    assert align["rows"] == []
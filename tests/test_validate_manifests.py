@@ -0,0 +1,69 @@
+"""validate_manifests --changed-since: which manifests a change selects."""
+
+import subprocess
+
+import pytest
+import yaml
+
+import validate_manifests
+from manifest_loader import load_manifests
+
+
+def write(root, rel, imports=()):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    manifest = {"name": f"{path.parent.name}/{path.stem.split('_', 1)[0]}",
+                "version": path.stem.split("_", 1)[1], "imports": list(imports),
+                "commands": [{"command": "sh", "docker_image": f"{path.stem}:1"}]}
+    path.write_text(yaml.safe_dump({"manifest": manifest}, sort_keys=False))
+
+
+def git(root, *args):
+    subprocess.run(["git", "-c", "user.name=test", "-c", "user.email=test@example.org",
+                    *args], cwd=root, check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setattr(validate_manifests, "ROOT", tmp_path)
+    write(tmp_path, "ns/base_1.0.0.yaml")
+    write(tmp_path, "ns/extra_1.0.0.yaml", imports=["ns/base:1.0.0"])
+    write(tmp_path, "ns/tools_1.0.0.yaml", imports=["ns/extra:default"])
+    write(tmp_path, "other/solo_1.0.0.yaml")
+    git(tmp_path, "init", "-q")
+    git(tmp_path, "add", ".")
+    git(tmp_path, "commit", "-q", "-m", "base")
+    return tmp_path
+
+
+def selected(root, ref="HEAD"):
+    chosen = validate_manifests.select_changed(load_manifests(root), ref)
+    return None if chosen is None else sorted(m.rel for m in chosen)
+
+
+def test_nothing_changed(repo):
+    assert selected(repo) == []
+
+
+def test_changed_manifest_pulls_in_its_importers(repo):
+    path = repo / "ns/base_1.0.0.yaml"
+    path.write_text(path.read_text().replace("command: sh", "command: bash"))
+    assert selected(repo) == ["ns/base_1.0.0.yaml", "ns/extra_1.0.0.yaml", "ns/tools_1.0.0.yaml"]
+
+
+def test_new_tag_selects_importers_of_any_tag(repo):
+    # A new tag can move what ns/extra:default resolves to
+    write(repo, "ns/extra_2.0.0.yaml")
+    assert selected(repo) == ["ns/extra_2.0.0.yaml", "ns/tools_1.0.0.yaml"]
+
+
+def test_deleted_manifest_selects_its_importers(repo):
+    (repo / "ns/extra_1.0.0.yaml").unlink()
+    assert selected(repo) == ["ns/tools_1.0.0.yaml"]
+
+
+def test_tooling_change_or_bad_ref_validates_everything(repo, capsys):
+    assert selected(repo, "no-such-ref") is None
+    assert "validating everything" in capsys.readouterr().err
+    (repo / "validate_manifests.py").write_text("")
+    assert selected(repo) is None
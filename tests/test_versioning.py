@@ -0,0 +1,36 @@
+"""Tag order and the latest-tag rule shared by the build and crate scripts."""
+
+from versioning import is_version_like, latest_tag, numeric_version, sort_tags, version_key
+
+
+def test_version_like():
+    assert is_version_like("1.0.10") and is_version_like("3")
+    assert not is_version_like("default") and not is_version_like("1.0.0-rc1")
+    assert numeric_version("1.0.10") == (1, 0, 10)
+    assert numeric_version("strict_1.0.0") is None
+
+
+def test_numeric_parts_compare_as_numbers():
+    assert version_key("1.0.10") > version_key("1.0.9")
+    assert version_key("0.10.0") > version_key("0.9.12")
+    assert version_key("") < version_key("0")
+    assert sort_tags(["1.0.9", "1.0.10", "0.2", "1.0"]) == ["1.0.10", "1.0.9", "1.0", "0.2"]
+    assert sort_tags(["1.0.9", "1.0.10"], reverse=False) == ["1.0.9", "1.0.10"]
+
+
+def test_text_parts_rank_above_numbers():
+    assert sort_tags(["2.0.0", "strict_1.0.0", "default"]) == ["strict_1.0.0", "default", "2.0.0"]
+
+
+def test_latest_tag_follows_manifest_version():
+    # Highest manifest.version wins, whatever the tag is called
+    assert latest_tag({"1.0.0": "1.0.0", "1.1.0": "1.1.0", "default": "0.9.0"}) == "1.1.0"
+    assert latest_tag({"default": "2.0.0", "1.1.0": "1.1.0"}) == "default"
+    assert latest_tag({}) is None
+
+
+def test_latest_tag_ties():
+    # Equal versions: a version-like tag beats any other, then the higher tag
+    assert latest_tag({"default": "1.0", "1.0": "1.0"}) == "1.0"
+    assert latest_tag({"1.0": "", "1.2": "", "default": ""}) == "1.2"
+    assert latest_tag({"demo": "1.0", "strict": "1.0"}) == "strict"
@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""Re-pin derived crates from the crate they follow (usually bulker/biobase).
+
+A derived crate ships tools that its source crate already pins, and takes
+their images from there instead of pinning its own. Each one is described by
+a `<name>_crate_sources.yaml` at the repo root (refgenie_crate_sources.yaml
+documents every field):
+
+    target_crate: databio/refgenie   # the crate this file generates
+    source_crate: bulker/biobase     # where exact matches and siblings come from
+    commands: [...]                  # what the crate must provide
+    siblings / overrides / excluded / extra_fields / imports
+    description: ...                 # optional; default: the current manifest's
+
+Resolution precedence per command:
+  1. an `overrides` entry                       -> pinned image + stated reason
+  2. the source defines the exact command       -> the source's image
+  3. the source defines the declared `sibling_of` -> that package's image
+Anything unresolved is a hard error; no partial crate is ever written.
+
+One run handles every sources file: each source crate's newest manifest is
+read and indexed once, every derived crate resolves against that index, and
+the report covers them all. An unresolvable crate fails the run (exit 1)
+after the report, without hiding the others' diffs.
+
+Usage:
+    python update_derived_crates.py                     # report diffs only
+    python update_derived_crates.py --crate databio/refgenie
+    python update_derived_crates.py --write             # emit next version of changed crates
+    python update_derived_crates.py --write --crate databio/refgenie --version 1.2.0
+    python update_derived_crates.py --verify-siblings   # print apptainer checks
+    python update_derived_crates.py --verify-siblings --runner docker --jobs 8
+
+With --runner, --verify-siblings runs the checks itself (sibling_check.py):
+one container start per image, concurrently, with answers for pinned images
+cached in .build_cache/sibling_checks.json. Each mapping that passes against
+an image it was not yet verified on gets `verified` and `verified_image`
+written back to its sources file (never with --runner stub); a failed check
+fails the run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import sys
+from pathlib import Path
+
+import yaml
+
+import sibling_check
+from manifest_diff import diff, image_version
+from manifest_loader import parse_yaml
+from versioning import is_version_like, latest_tag, numeric_version, version_key
+
+ROOT = Path(__file__).parent.resolve()
+SOURCES_GLOB = "*_crate_sources.yaml"
+SIBLING_CACHE = ROOT / ".build_cache" / "sibling_checks.json"
+
+
+class UnresolvedCommandsError(Exception):
+    """Commands a derived crate must provide that no rule resolves."""
+
+    def __init__(self, names: list[str], sources_name: str):
+        self.names = names
+        super().__init__(
+            "no source for: " + ", ".join(names)
+            + f"\nAdd a `siblings` or `overrides` entry to {sources_name}."
+        )
+
+
+# ---------------------------------------------------------------- manifest io
+
+
+def newest_manifest(directory: Path, stem: str) -> Path:
+    """Return the latest `<stem>_<version>.yaml` in `directory`.
+
+    Candidates are ordered by the version in their file names, which is the
+    version they ship, so only the newest is read. File names that tie
+    (`1.0` and `1.00`) are told apart by versioning.latest_tag on their
+    manifest.version, the rule build_site.py uses for the published pointer.
+    """
+    candidates = {}
+    for path in directory.glob(f"{stem}_*.yaml"):
+        if path.is_symlink():
+            continue
+        version = path.stem[len(stem) + 1 :]
+        if is_version_like(version):
+            candidates[version] = path
+    if not candidates:
+        raise SystemExit(f"no versioned {stem} manifest found in {directory}")
+    newest = version_key(max(candidates, key=version_key))
+    tied = sorted(v for v in candidates if version_key(v) == newest)
+    if len(tied) == 1:
+        return candidates[tied[0]]
+    versions = {v: str(load_manifest(candidates[v]).get("version") or "") for v in tied}
+    return candidates[latest_tag(versions)]
+
+
+def load_manifest(path: Path) -> dict:
+    return parse_yaml(path.read_text())["manifest"]
+
+
+def commands_by_name(manifest: dict) -> dict[str, dict]:
+    return {entry["command"]: entry for entry in manifest.get("commands") or []}
+
+
+def crate_dir_and_stem(crate: str) -> tuple[Path, str]:
+    """`namespace/name` -> (ROOT/namespace, name)."""
+    namespace, name = crate.split("/")
+    return ROOT / namespace, name
+
+
+# ---------------------------------------------------------------- resolution
+
+
+def resolve(sources: dict, biobase: dict[str, dict],
+            sources_name: str = "the crate sources file") -> tuple[list[dict], list[str]]:
+    """Apply the three-step precedence to every command the crate must provide.
+
+    `biobase` is the source crate's commands_by_name index. Returns (entries,
+    notes). Raises UnresolvedCommandsError if any command is unresolvable, so
+    a broken source map can never emit a silently incomplete crate.
+    """
+    siblings = sources.get("siblings") or {}
+    overrides = sources.get("overrides") or {}
+    extra_fields = sources.get("extra_fields") or {}
+
+    # `commands` is the authority on what the crate ships. Siblings marked
+    # `optional` are documented mappings only -- they are recorded so a future
+    # recipe can adopt them without re-deriving the package relationship, but
+    # they are NOT emitted until someone adds them to `commands`. A crate that
+    # ships commands no recipe uses is noise the reviewer has to re-litigate
+    # every quarter.
+    wanted = list(sources["commands"])
+
+    entries: list[dict] = []
+    notes: list[str] = []
+    unresolved: list[str] = []
+
+    for name in sorted(wanted, key=str.lower):
+        sibling = siblings.get(name)
+        # A sibling marked `optional` is a documented mapping, not an active
+        # source; it never resolves anything.
+        if sibling and sibling.get("optional"):
+            sibling = None
+
+        if name in overrides:
+            # Overrides are checked FIRST, ahead of biobase. An override is an
+            # explicit human decision -- including the decision to HOLD a
+            # command back from a biobase version that exists but breaks a
+            # recipe (bismark 3.x dropped bowtie1). If biobase could outrank an
+            # override, the escape hatch would be useless for exactly the case
+            # it is needed for. Shadowing is announced so it stays visible.
+            image = overrides[name]["docker_image"]
+            # Availability check uses the RAW sibling entry, optional or not:
+            # "what biobase could have supplied" is exactly what the reader
+            # needs to see when a hold is in effect.
+            raw = siblings.get(name)
+            available = (
+                biobase.get(name, {}).get("docker_image")
+                or (biobase[raw["sibling_of"]]["docker_image"]
+                    if raw and raw["sibling_of"] in biobase else None)
+            )
+            if available:
+                notes.append(
+                    f"{name}: OVERRIDE holds back biobase's {available} -> {image}"
+                )
+            else:
+                notes.append(f"{name}: override -> {image}")
+        elif name in biobase:
+            image = biobase[name]["docker_image"]
+            notes.append(f"{name}: exact match in biobase -> {image}")
+        elif sibling and sibling["sibling_of"] in biobase:
+            package = sibling["sibling_of"]
+            image = biobase[package]["docker_image"]
+            notes.append(f"{name}: sibling of `{package}` -> {image}")
+        else:
+            unresolved.append(name)
+            continue
+
+        entry = {"command": name, "docker_image": image}
+        entry.update(extra_fields.get(name) or {})
+        entries.append(entry)
+
+    if unresolved:
+        raise UnresolvedCommandsError(unresolved, sources_name)
+    return entries, notes
+
+
+def bump_minor(version: str) -> str:
+    parts = list(numeric_version(version) or (1, 0, 0))
+    while len(parts) < 3:
+        parts.append(0)
+    parts[1] += 1
+    parts[2] = 0
+    return ".".join(str(p) for p in parts)
+
+
+# ---------------------------------------------------------------- planning
+
+
+def discover_sources(root: Path = ROOT) -> dict[str, tuple[Path, dict]]:
+    """Map each derived crate (`namespace/name`) to its sources file and contents."""
+    found: dict[str, tuple[Path, dict]] = {}
+    for path in sorted(root.glob(SOURCES_GLOB)):
+        sources = yaml.safe_load(path.read_text()) or {}
+        missing = [k for k in ("target_crate", "source_crate", "commands") if not sources.get(k)]
+        if missing:
+            raise SystemExit(f"{path.name}: missing {', '.join(missing)}")
+        target = sources["target_crate"]
+        if target in found:
+            raise SystemExit(f"{path.name}: {target} is already derived by {found[target][0].name}")
+        found[target] = (path, sources)
+    return found
+
+
+def plan_crate(target: str, sources_path: Path, sources: dict,
+               index: dict[str, tuple[Path, dict[str, dict]]]) -> dict:
+    """Resolve one derived crate against its source crate's (cached) command index.
+
+    Returns the plan: current manifest, source path, entries, notes, diff rows,
+    and `error` (an UnresolvedCommandsError message) when resolution failed.
+    """
+    source = sources["source_crate"]
+    if source not in index:
+        path = newest_manifest(*crate_dir_and_stem(source))
+        index[source] = (path, commands_by_name(load_manifest(path)))
+    source_path, source_commands = index[source]
+
+    current_path = newest_manifest(*crate_dir_and_stem(target))
+    current = load_manifest(current_path)
+    plan = {
+        "target": target,
+        "sources_path": sources_path,
+        "sources": sources,
+        "source": source,
+        "source_path": source_path,
+        "source_commands": source_commands,
+        "current_path": current_path,
+        "current": current,
+        "entries": [],
+        "notes": [],
+        "rows": [],
+        "error": None,
+    }
+    try:
+        plan["entries"], plan["notes"] = resolve(sources, source_commands, sources_path.name)
+    except UnresolvedCommandsError as e:
+        plan["error"] = str(e)
+        return plan
+    plan["rows"] = diff(commands_by_name(current), plan["entries"])
+    return plan
+
+
+def print_sibling_checks(plan: dict):
+    source_commands = plan["source_commands"]
+    print("Sibling verification commands (run on a host with apptainer):")
+    for name, spec in (plan["sources"].get("siblings") or {}).items():
+        package = spec["sibling_of"]
+        if package not in source_commands:
+            print(f"  # {name}: SKIP, {plan['source']} has no `{package}`")
+            continue
+        print(
+            f"  apptainer exec docker://{source_commands[package]['docker_image']}"
+            f" which {name}"
+        )
+    print()
+
+
+def sibling_images(plan: dict) -> dict[str, str]:
+    """{sibling name: the source crate's image for its package}, where it has one."""
+    source_commands = plan["source_commands"]
+    return {
+        name: source_commands[spec["sibling_of"]]["docker_image"]
+        for name, spec in (plan["sources"].get("siblings") or {}).items()
+        if spec["sibling_of"] in source_commands
+    }
+
+
+def run_sibling_checks(plans: list[dict], runner: sibling_check.Runner,
+                       cache: sibling_check.CheckCache, jobs: int) -> bool:
+    """Check every sibling mapping of every plan; returns False if any failed.
+
+    Checks are gathered across all plans first, so an image shared by two
+    derived crates is still started once.
+    """
+    wanted: dict[str, set[str]] = {}
+    for plan in plans:
+        for name, image in sibling_images(plan).items():
+            wanted.setdefault(image, set()).add(name)
+    results = sibling_check.run_checks(wanted, runner, cache, jobs)
+    cache.save()
+
+    today = datetime.date.today().isoformat()
+    ok = True
+    for plan in plans:
+        if len(plans) > 1:
+            print(f"=== {plan['target']}")
+        print(f"Sibling checks ({runner.name}):")
+        siblings = plan["sources"].get("siblings") or {}
+        images = sibling_images(plan)
+        verified = []
+        for name, spec in siblings.items():
+            if name not in images:
+                print(f"  {name}: SKIP, {plan['source']} has no `{spec['sibling_of']}`")
+                continue
+            image = images[name]
+            result = results[image]
+            cached = " (cached)" if result["cached"] else ""
+            if result["error"]:
+                print(f"  {name}: ERROR in {image}: {result['error']}")
+                ok = False
+            elif result["found"].get(name):
+                print(f"  {name}: {result['found'][name]}{cached}")
+                if spec.get("verified_image") != image:
+                    verified.append((name, image))
+            else:
+                print(f"  {name}: NOT FOUND in {image}{cached}")
+                ok = False
+        if verified and not runner.cacheable:
+            # A stub's answers are not evidence about the real images
+            print(f"  not recording {', '.join(n for n, _ in verified)} as verified "
+                  f"({runner.name} runner)")
+        elif verified:
+            path = plan["sources_path"]
+            text = path.read_text()
+            for name, image in verified:
+                text = sibling_check.write_verified(text, name, today, image)
+            path.write_text(text)
+            print(f"  updated {path.name}: verified {', '.join(n for n, _ in verified)}")
+        print()
+    return ok
+
+
+def print_plan(plan: dict):
+    if plan["error"]:
+        print(f"ERROR: {plan['error']}")
+        print()
+        return
+
+    print("Resolution:")
+    for note in plan["notes"]:
+        print(f"  {note}")
+    print()
+
+    rows = plan["rows"]
+    if not rows:
+        print(f"No changes: {plan['target']} already matches {plan['source']}.")
+        print()
+        return
+
+    width = max(len(r[0]) for r in rows)
+    print("Pin changes:")
+    for name, before, after in rows:
+        print(f"  {name:<{width}}  {before}")
+        print(f"  {'':<{width}}  -> {after}")
+    print()
+    print("Version changes (these RENAME published assets):")
+    for name, before, after in rows:
+        if before.startswith("(") or after.startswith("("):
+            print(f"  {name:<{width}}  {before} -> {after}")
+            continue
+        bv, av = image_version(before), image_version(after)
+        if bv != av:
+            print(f"  {name:<{width}}  {bv} -> {av}")
+    print()
+
+
+def next_manifest_path(plan: dict, version: str | None) -> Path:
+    crate_dir, stem = crate_dir_and_stem(plan["target"])
+    return crate_dir / f"{stem}_{version or bump_minor(str(plan['current']['version']))}.yaml"
+
+
+def write_crate(plan: dict, version: str | None) -> Path:
+    """Write the next version of a derived crate; returns the new file's path."""
+    current, sources = plan["current"], plan["sources"]
+    out_path = next_manifest_path(plan, version)
+    new_version = out_path.stem.rsplit("_", 1)[1]
+    manifest = {
+        "manifest": {
+            "name": current["name"],
+            "version": new_version,
+            "description": sources.get("description") or current.get("description", ""),
+            "imports": list(sources.get("imports") or []),
+            "commands": plan["entries"],
+        }
+    }
+    with open(out_path, "w") as handle:
+        yaml.safe_dump(manifest, handle, sort_keys=False, default_flow_style=False)
+    return out_path
+
+
+# ---------------------------------------------------------------------- main
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--crate", action="append", metavar="NS/NAME",
+                    help="only this derived crate (repeatable; default: every sources file)")
+    ap.add_argument("--write", action="store_true", help="write the new manifests")
+    ap.add_argument("--version", help="explicit new version (default: minor bump); needs one --crate")
+    ap.add_argument(
+        "--verify-siblings",
+        action="store_true",
+        help="print the apptainer commands that prove each sibling mapping",
+    )
+    ap.add_argument("--runner", choices=[*sibling_check.RUNNERS, "stub"],
+                    help="with --verify-siblings: run the checks with this container runtime")
+    ap.add_argument("--stub-file", type=Path, metavar="YAML",
+                    help="for --runner stub: {image: [command, ...]} the stub answers from")
+    ap.add_argument("--jobs", type=int, default=4,
+                    help="containers to run at once with --runner (default: 4)")
+    ap.add_argument("--no-check-cache", action="store_true",
+                    help="re-probe every image, ignoring (and then replacing) cached answers")
+    args = ap.parse_args(argv)
+    if args.runner and not args.verify_siblings:
+        raise SystemExit("--runner needs --verify-siblings")
+    if args.runner == "stub" and not args.stub_file:
+        raise SystemExit("--runner stub needs --stub-file")
+
+    derived = discover_sources()
+    targets = args.crate or sorted(derived)
+    unknown = [t for t in targets if t not in derived]
+    if unknown:
+        raise SystemExit(f"no {SOURCES_GLOB} derives {', '.join(unknown)}")
+    if args.version and len(targets) != 1:
+        raise SystemExit("--version needs exactly one --crate")
+
+    # Source crate -> (newest manifest path, commands_by_name), read once per run
+    index: dict[str, tuple[Path, dict[str, dict]]] = {}
+    plans = [plan_crate(t, *derived[t], index) for t in targets]
+
+    for plan in plans:
+        if len(plans) > 1:
+            print(f"=== {plan['target']} ({plan['sources_path'].name})")
+        print(f"source crate : {plan['source_path'].relative_to(ROOT)}")
+        print(f"current crate: {plan['current_path'].relative_to(ROOT)}")
+        print()
+        if args.verify_siblings and not args.runner:
+            print_sibling_checks(plan)
+        print_plan(plan)
+
+    siblings_ok = True
+    if args.runner:
+        if args.runner == "stub":
+            runner = sibling_check.StubRunner.from_file(args.stub_file)
+        else:
+            runner = sibling_check.RUNNERS[args.runner]()
+        if args.no_check_cache:
+            cache = sibling_check.CheckCache(SIBLING_CACHE)  # answers replace the old ones
+        else:
+            cache = sibling_check.CheckCache.load(SIBLING_CACHE)
+        siblings_ok = run_sibling_checks(plans, runner, cache, args.jobs)
+
+    failed = [p for p in plans if p["error"]]
+    changed = [p for p in plans if p["rows"]]
+    if len(plans) > 1:
+        print(f"{len(plans)} derived crates: {len(changed)} with pin changes, "
+              f"{len(failed)} unresolvable")
+        print()
+
+    for plan in changed:
+        if not args.write:
+            print(f"(dry run) would write {next_manifest_path(plan, args.version).relative_to(ROOT)}")
+            continue
+        out_path = write_crate(plan, args.version)
+        print(f"wrote {out_path.relative_to(ROOT)}")
+        print(f"remember: ln -sf {out_path.name} "
+              f"{(out_path.parent / plan['target'].split('/')[1]).relative_to(ROOT)}.yaml")
+    return 1 if failed or not siblings_ok else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,23 +4,41 @@
 Modes:
     python validate_manifests.py              # Tier 1: structural only (no network)
     python validate_manifests.py --check-tags # Tier 1 + Tier 2: verify image tags exist
+    python validate_manifests.py --check-tags --no-tag-cache  # ignore cached lookups
+    python validate_manifests.py --check-tags --registry-limit quay.io=8
+    python validate_manifests.py --check-tags --batch-tags   # one listing per quay.io repo
+    python validate_manifests.py --changed-since origin/master  # only what a PR affects
+    python validate_manifests.py --dependents bulker/coreutils:default  # what imports it
     python validate_manifests.py --sort       # Sort commands alphabetically in-place
+    python validate_manifests.py --check-tags --timings-json t.json  # phases, HTTP latency
 
 Exit code 0 = all valid, exit code 1 = errors found.
 """
 
-import json
+import argparse
 import re
+import subprocess
 import sys
-import urllib.error
-import urllib.request
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 import yaml
 
+import profiling
+from manifest_graph import ImportGraph
+from manifest_loader import (
+    SKIP_DIRS,
+    LoadedManifest,
+    collect_images,
+    discover_manifest_files,
+    load_manifests,
+    parse_yaml,
+)
+from registry_client import check_images
+from tag_cache import TagCache
+
 ROOT = Path(__file__).parent.resolve()
-SKIP_DIRS = {"docs", "_templates", ".git", ".github", "__pycache__"}
+# Registry lookups are cached here between runs (see tag_cache.py)
+TAG_CACHE = ROOT / ".build_cache" / "tag_cache.json"
 
 # Pattern for import references: namespace/crate:tag
 IMPORT_RE = re.compile(r"^[a-zA-Z0-9_-]+/[a-zA-Z0-9_.-]+:[a-zA-Z0-9_.-]+$")
@@ -50,28 +68,15 @@ class ValidationResult:
         return len(self.errors) == 0
 
 
-def discover_manifest_files(root: Path) -> list[Path]:
-    """Find all manifest YAML files (excluding docs/, _templates/, etc.)."""
-    files = []
-    for entry in sorted(root.iterdir()):
-        if not entry.is_dir() or entry.name in SKIP_DIRS or entry.name.startswith("."):
-            continue
-        for yaml_file in sorted(entry.glob("*.yaml")):
-            files.append(yaml_file)
-    return files
-
-
-def validate_structure(filepath: Path) -> ValidationResult:
-    """Tier 1: Structural validation of a single manifest file."""
-    rel = filepath.relative_to(ROOT)
-    result = ValidationResult(str(rel))
+def validate_structure(loaded: LoadedManifest) -> ValidationResult:
+    """Tier 1: Structural validation of a single (already loaded) manifest file."""
+    filepath = loaded.path
+    result = ValidationResult(loaded.rel)
 
-    # Parse YAML
-    try:
-        with open(filepath) as f:
-            data = yaml.safe_load(f)
-    except Exception as e:
-        result.error(f"YAML parse error: {e}")
+    # Parsed once by the shared loader
+    data = loaded.data
+    if loaded.error is not None:
+        result.error(f"YAML parse error: {loaded.error}")
         return result
 
     if not isinstance(data, dict):
@@ -188,101 +193,119 @@ def validate_structure(filepath: Path) -> ValidationResult:
     return result
 
 
-def check_image_tag(image: str, timeout: int = 10) -> tuple[str, bool, str]:
-    """Check if a docker image tag exists on its registry.
+def validate_tags(all_images: set[str], cache: TagCache | None = None,
+                  limits: dict[str, int] | None = None,
+                  endpoints: dict[str, str] | None = None,
+                  batch: bool = False) -> dict[str, tuple[bool, str]]:
+    """Tier 2: Check all unique images concurrently.
 
-    Returns (image, exists, message).
+    Images with an unexpired entry in `cache` are not looked up again; fresh
+    results are written back to it. `limits` caps concurrent requests per
+    registry host; `endpoints` redirects a host (e.g. to registry_stub.py).
+    With `batch`, quay.io repositories are checked from one tag listing each.
     """
-    image = image.strip()
-
-    # No tag means :latest -- skip check
-    if ":" not in image:
-        return (image, True, "no tag (implicit :latest)")
-
-    # Parse image into registry/repo:tag
-    parts = image.rsplit(":", 1)
-    repo_path = parts[0]
-    tag = parts[1]
-
-    try:
-        if repo_path.startswith("quay.io/"):
-            # quay.io/biocontainers/samtools:1.23--h... -> biocontainers/samtools
-            repo = repo_path[len("quay.io/"):]
-            # Need namespace/name from repo
-            repo_parts = repo.split("/", 1)
-            if len(repo_parts) != 2:
-                return (image, True, "skipped (unusual quay.io path)")
-            namespace, name = repo_parts
-            url = f"https://quay.io/api/v1/repository/{namespace}/{name}/tag/?specificTag={tag}"
-            req = urllib.request.Request(url)
-            req.add_header("Accept", "application/json")
-            with urllib.request.urlopen(req, timeout=timeout) as resp:
-                data = json.loads(resp.read())
-                tags = data.get("tags", [])
-                if tags:
-                    return (image, True, "verified on quay.io")
-                else:
-                    return (image, False, f"tag not found on quay.io")
-
-        elif "/" in repo_path and not repo_path.startswith("quay.io"):
-            # Docker Hub: namespace/repo or library image
-            # Could also be other registries like ghcr.io
-            if repo_path.startswith("ghcr.io/"):
-                return (image, True, "skipped (ghcr.io -- no public API)")
-
-            # Assume Docker Hub for namespace/repo without registry prefix
-            repo_parts = repo_path.split("/")
-            if len(repo_parts) == 2:
-                namespace, name = repo_parts
-                url = f"https://hub.docker.com/v2/repositories/{namespace}/{name}/tags/{tag}"
-                req = urllib.request.Request(url)
-                with urllib.request.urlopen(req, timeout=timeout) as resp:
-                    if resp.status == 200:
-                        return (image, True, "verified on Docker Hub")
-            elif len(repo_parts) >= 3:
-                # Unknown registry (e.g., gcr.io/project/image)
-                return (image, True, f"skipped (unknown registry)")
-
-            return (image, True, "skipped (could not determine registry)")
-
-        else:
-            # Single-name image like "openjdk" -- Docker Hub library
-            url = f"https://hub.docker.com/v2/repositories/library/{repo_path}/tags/{tag}"
-            req = urllib.request.Request(url)
-            with urllib.request.urlopen(req, timeout=timeout) as resp:
-                if resp.status == 200:
-                    return (image, True, "verified on Docker Hub")
-            return (image, False, "tag not found on Docker Hub")
-
-    except urllib.error.HTTPError as e:
-        if e.code == 404:
-            return (image, False, f"tag not found (HTTP 404)")
-        return (image, True, f"skipped (HTTP {e.code})")
-    except Exception as e:
-        return (image, True, f"skipped (network error: {e})")
-
-
-def validate_tags(all_images: set[str]) -> dict[str, tuple[bool, str]]:
-    """Tier 2: Check all unique images concurrently."""
     results = {}
     # Filter out images without tags (already warned in Tier 1)
     to_check = {img for img in all_images if ":" in img}
 
+    if cache is not None:
+        for img in sorted(to_check):
+            hit = cache.get(img)
+            if hit is not None:
+                results[img] = hit
+        to_check -= set(results)
+        print(f"\n{len(results)} image tags answered from cache ({cache.path.name})")
+
     print(f"\nChecking {len(to_check)} unique image tags on registries...")
 
-    with ThreadPoolExecutor(max_workers=5) as pool:
-        futures = {pool.submit(check_image_tag, img): img for img in to_check}
-        done = 0
-        for future in as_completed(futures):
-            done += 1
-            image, exists, msg = future.result()
-            results[image] = (exists, msg)
-            if done % 10 == 0:
-                print(f"  Checked {done}/{len(to_check)} images...", file=sys.stderr)
+    checked = check_images(sorted(to_check), limits=limits, endpoints=endpoints, batch=batch)
+    for image, (exists, msg) in checked.items():
+        results[image] = (exists, msg)
+        if cache is not None:
+            cache.put(image, exists, msg)
 
     return results
 
 
+def _git(*args: str) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+
+
+def _is_manifest_path(rel: str) -> bool:
+    parts = rel.split("/")
+    return (len(parts) == 2 and parts[1].endswith(".yaml")
+            and parts[0] not in SKIP_DIRS and not parts[0].startswith("."))
+
+
+def select_changed(loaded: list[LoadedManifest], ref: str) -> list[LoadedManifest] | None:
+    """Restrict validation to manifests affected by changes since `ref`.
+
+    Affected means: changed (or added) manifests, plus every manifest that
+    imports the same crate at any tag -- directly or transitively -- since a
+    change can move what `crate:default` resolves to. Deleted manifests pull
+    in their crate's importers the same way, so dangling imports are caught.
+
+    Returns None (validate everything) when the diff cannot be computed or
+    touches the validation tooling itself.
+    """
+    try:
+        base = _git("merge-base", ref, "HEAD").strip()
+        changed = set(_git("diff", "--name-only", "--no-renames", base).split())
+        changed |= set(_git("ls-files", "--others", "--exclude-standard").split())
+    except (OSError, subprocess.CalledProcessError) as e:
+        detail = e.stderr.strip() if isinstance(e, subprocess.CalledProcessError) else e
+        print(f"WARNING: cannot diff against '{ref}' ({detail}); validating everything",
+              file=sys.stderr)
+        return None
+    if any(rel.endswith(".py") and "/" not in rel for rel in changed):
+        print("Validation tooling changed; validating everything")
+        return None
+
+    by_rel = {m.rel: m for m in loaded}
+    graph = ImportGraph(loaded)
+    selected: set[str] = set()
+    for rel in sorted(filter(_is_manifest_path, changed)):
+        m = by_rel.get(rel)
+        if m is not None:
+            selected.add(rel)
+            namespace, crate = m.namespace, m.crate
+        else:
+            # Deleted: recover its crate name from the old revision
+            namespace, crate = rel.split("/")[0], rel.split("/")[1][:-5].split("_", 1)[0]
+            try:
+                old = parse_yaml(_git("show", f"{base}:{rel}"))
+                name = old["manifest"]["name"]
+                crate = name.rsplit("/", 1)[-1]
+            except Exception:
+                pass
+        affected = graph.importers_of_crate(namespace, crate)
+        if m is not None and not m.is_symlink:
+            affected.add(rel)
+        selected |= affected | graph.dependents(affected)
+    return [m for m in loaded if m.rel in selected]
+
+
+def print_dependents(loaded: list[LoadedManifest], ref: str) -> int:
+    """List every manifest that depends on `ref`, directly or transitively.
+
+    `ns/crate:default` (or `ns/crate`) means the default pointer: the
+    manifests affected if the crate's latest tag moves. Returns an exit code.
+    """
+    graph = ImportGraph(loaded)
+    found = graph.dependents_of(ref)
+    if found is None:
+        print(f"'{ref}' does not match any manifest", file=sys.stderr)
+        return 1
+    direct = graph.direct_dependents(ref)
+    print(f"{len(found)} manifests depend on {ref} ({graph.resolve(ref)}):")
+    for rel in sorted(found, key=graph.ref):
+        kind = "direct" if rel in direct else "transitive"
+        print(f"  {kind:<10}  {graph.ref(rel):<32}  {rel}")
+    return 0
+
+
 def print_result(result: ValidationResult, tag_results: dict | None = None):
     """Print validation results for a single manifest."""
     print(f"\n{result.filepath}")
@@ -331,43 +354,35 @@ def sort_manifests(files: list[Path]):
     print(f"\nSorted {sorted_count} manifests.")
 
 
-def main():
-    check_tags = "--check-tags" in sys.argv
-    do_sort = "--sort" in sys.argv
+def validate(loaded: list[LoadedManifest], check_tags: bool = False,
+             tag_cache: Path | None = TAG_CACHE,
+             limits: dict[str, int] | None = None,
+             endpoints: dict[str, str] | None = None,
+             batch_tags: bool = False) -> int:
+    """Run Tier 1 (and optionally Tier 2) over loaded manifests and print a report.
 
-    # Discover manifests
-    files = discover_manifest_files(ROOT)
-
-    if do_sort:
-        print(f"Sorting commands in {len(files)} manifests...")
-        sort_manifests(files)
-        return
-
-    print(f"Validating {len(files)} manifests...")
+    `tag_cache` is the registry lookup cache file; None disables it.
+    `limits`, `endpoints` and `batch_tags` are passed through to validate_tags.
+    Returns the total number of errors found.
+    """
+    print(f"Validating {len(loaded)} manifests...")
 
     # Tier 1: Structural validation
-    results: list[ValidationResult] = []
-    all_images: set[str] = set()
+    with profiling.phase("validate: structure"):
+        results: list[ValidationResult] = [validate_structure(m) for m in loaded]
 
-    for filepath in files:
-        r = validate_structure(filepath)
-        results.append(r)
-
-        # Collect images for Tier 2
-        try:
-            with open(filepath) as f:
-                data = yaml.safe_load(f)
-            if data and "manifest" in data:
-                for cmd in data["manifest"].get("commands") or []:
-                    if isinstance(cmd, dict) and cmd.get("docker_image"):
-                        all_images.add(cmd["docker_image"].strip())
-        except Exception:
-            pass
+        # Collect images for Tier 2 from the same parsed documents
+        all_images = collect_images(loaded)
 
     # Tier 2: Registry tag verification
     tag_results = None
     if check_tags:
-        tag_results = validate_tags(all_images)
+        with profiling.phase("validate: image tags"):
+            cache = TagCache.load(tag_cache) if tag_cache else None
+            tag_results = validate_tags(all_images, cache, limits=limits, endpoints=endpoints,
+                                        batch=batch_tags)
+            if cache is not None:
+                cache.save()
 
     # Print results
     total_errors = 0
@@ -401,7 +416,89 @@ def main():
     total_failed = len(results) - total_passed
     print(f"\nValidation complete: {total_passed} passed, {total_failed + tag_errors} errors, {total_warnings} warnings")
 
-    if total_errors > 0:
+    return total_errors
+
+
+def _host_option(value: str) -> tuple[str, str]:
+    """argparse type for HOST=VALUE options."""
+    host, sep, rest = value.partition("=")
+    if not sep or not host or not rest:
+        raise argparse.ArgumentTypeError(f"expected HOST=VALUE, got '{value}'")
+    return host, rest
+
+
+def _host_limit(value: str) -> tuple[str, int]:
+    """argparse type for HOST=N options, N a positive integer."""
+    host, rest = _host_option(value)
+    try:
+        limit = int(rest)
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        raise argparse.ArgumentTypeError(f"expected HOST=N with N a positive integer, got '{value}'")
+    return host, limit
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Validate bulker manifests for hub.bulker.io.")
+    ap.add_argument("--check-tags", action="store_true",
+                    help="also verify that every image tag exists on its registry")
+    ap.add_argument("--sort", action="store_true",
+                    help="sort commands alphabetically in-place")
+    ap.add_argument("--no-tag-cache", action="store_true",
+                    help="ignore and do not update the registry lookup cache")
+    ap.add_argument("--changed-since", metavar="GIT_REF",
+                    help="only validate manifests changed since GIT_REF, plus their importers")
+    ap.add_argument("--dependents", metavar="NS/CRATE:TAG",
+                    help="list the manifests that import NS/CRATE:TAG, directly or "
+                         "transitively, then exit")
+    ap.add_argument("--batch-tags", action="store_true",
+                    help="verify quay.io tags from one tag listing per repository")
+    ap.add_argument("--registry-limit", type=_host_limit, action="append", default=[],
+                    metavar="HOST=N", help="max concurrent requests to a registry host")
+    ap.add_argument("--registry-endpoint", type=_host_option, action="append", default=[],
+                    metavar="HOST=URL", help="send a registry host's requests to URL instead")
+    ap.add_argument("--profile", action="store_true",
+                    help="print per-phase wall/CPU time, YAML parse times and registry latency")
+    ap.add_argument("--timings-json", type=Path, metavar="PATH",
+                    help="write the same profile as JSON to PATH")
+    args = ap.parse_args()
+    profile = profiling.enable("validate_manifests") if args.profile or args.timings_json else None
+    tag_cache = None if args.no_tag_cache else TAG_CACHE
+    limits = dict(args.registry_limit)
+
+    # Discover manifests
+    files = discover_manifest_files(ROOT)
+
+    if args.sort:
+        print(f"Sorting commands in {len(files)} manifests...")
+        sort_manifests(files)
+        return
+
+    with profiling.phase("load"):
+        loaded = load_manifests(ROOT, files)
+    if args.dependents:
+        sys.exit(print_dependents(loaded, args.dependents))
+    if args.changed_since:
+        with profiling.phase("select changed"):
+            subset = select_changed(loaded, args.changed_since)
+        if subset is not None:
+            print(f"{len(subset)} of {len(loaded)} manifests affected by changes "
+                  f"since {args.changed_since}")
+            loaded = subset
+
+    errors = validate(loaded, check_tags=args.check_tags,
+                      tag_cache=tag_cache, limits=limits,
+                      endpoints=dict(args.registry_endpoint), batch_tags=args.batch_tags)
+    if profile is not None:
+        profile.finish()
+        if args.profile:
+            print()
+            profile.print_report()
+        if args.timings_json:
+            profile.write_json(args.timings_json)
+            print(f"Wrote profile to {args.timings_json}")
+    if errors > 0:
         sys.exit(1)
 
 
@@ -0,0 +1,55 @@
+"""Version ordering shared by build_site.py, manifest_graph.py,
+migrate_symlinks.py and update_refgenie_crate.py.
+
+Two orderings live here:
+
+- tag order, for listing a crate's tags newest first: tag names are split
+  on `.`, `_` and `-`, numeric parts compare as numbers and rank below
+  text parts (`1.0.10` > `1.0.9`, and `strict_1.0.0` > `2.0.0`);
+- the latest tag of a crate, which decides the `<crate>.yaml` pointer in
+  docs/, the `default` import target and the bare-name symlink: highest
+  manifest.version wins; ties go to the highest version-like tag name, then
+  to the first tag given.
+
+Parsed keys are cached, so each distinct version string is split once per
+process however many times it is compared.
+"""
+
+import re
+from collections.abc import Iterable, Mapping
+from functools import lru_cache
+
+VERSION_RE = re.compile(r"\d+(\.\d+)*")
+
+
+def is_version_like(s: str) -> bool:
+    """Check if a string looks like a version number (e.g., 1.0.0, 3.21)."""
+    return bool(VERSION_RE.fullmatch(s))
+
+
+def numeric_version(s: str) -> tuple[int, ...] | None:
+    """Parse a version-like string into a tuple of ints, or None."""
+    if not is_version_like(s):
+        return None
+    return tuple(int(part) for part in s.split("."))
+
+
+@lru_cache(maxsize=None)
+def version_key(v: str) -> tuple:
+    """Sort key for a version or tag string; the empty string sorts first."""
+    if not v:
+        return ()
+    return tuple((0, int(p)) if p.isdigit() else (1, p) for p in re.split(r"[._-]", v))
+
+
+def sort_tags(tags: Iterable[str], reverse: bool = True) -> list[str]:
+    """Tag names in version order, newest first unless reverse=False."""
+    return sorted(tags, key=version_key, reverse=reverse)
+
+
+def latest_tag(versions: Mapping[str, str]) -> str | None:
+    """Pick the latest of {tag: manifest version}; None if there are no tags."""
+    if not versions:
+        return None
+    return max(versions, key=lambda tag: (version_key(versions[tag] or ""),
+                                          is_version_like(tag), version_key(tag)))